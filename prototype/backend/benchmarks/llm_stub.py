@@ -0,0 +1,167 @@
+"""Local OpenAI-compatible chat completions server for load tests.
+
+Answers `/v1/chat/completions` like `core.fakes.FakeChatModel` does, but over
+HTTP, so the service runs its real `ChatOpenAI` client, connection pool and
+streaming path against it. Structured outputs (JSON schema or forced tool
+calls) get canned instances of the requested schema, agent turns open a
+session by keyword, everything else gets a short text reply. Each call waits
+`latency` seconds (± `jitter`), `capacity` bounds concurrent generations
+to mimic a provider's concurrency limit, and `error_rate` answers that share
+of requests with a 429 rate-limit error. Run from `prototype/backend`:
+
+    python -m benchmarks.llm_stub --port 8100 --latency 0.5 --capacity 32
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from core.fakes import CANNED, SUMMARY_REPLY, CHAT_REPLY, session_tool
+
+class Settings:
+    latency: float = 0.0
+    jitter: float = 0.0
+    capacity: int = 0
+    error_rate: float = 0.0
+    topic: str = "A.1"
+
+settings = Settings()
+stats: Dict[str, Any] = {"requests": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0, "queued": 0, "busy_seconds": 0.0}
+_ids = itertools.count(1)
+_slots: Optional[asyncio.Semaphore] = None
+
+app = FastAPI()
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _answer(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the assistant message for a chat completions request."""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        name = response_format["json_schema"]["name"]
+        return {"role": "assistant", "content": CANNED[name]().model_dump_json()}
+
+    tool_choice = body.get("tool_choice")
+    if isinstance(tool_choice, dict):
+        name = tool_choice["function"]["name"]
+        return _tool_call(name, CANNED[name]().model_dump_json())
+
+    messages: List[Dict[str, Any]] = body.get("messages", [])
+    if not body.get("tools"):
+        return {"role": "assistant", "content": SUMMARY_REPLY}
+    last = messages[-1] if messages else {}
+    name = session_tool(_text(last.get("content"))) if last.get("role") == "user" else None
+    if name is None:
+        return {"role": "assistant", "content": CHAT_REPLY}
+    return _tool_call(name, json.dumps({"input": settings.topic}))
+
+def _tool_call(name: str, arguments: str) -> Dict[str, Any]:
+    call = {"id": f"call_{next(_ids)}", "type": "function", "function": {"name": name, "arguments": arguments}}
+    return {"role": "assistant", "content": None, "tool_calls": [call]}
+
+def _usage(body: Dict[str, Any], message: Dict[str, Any]) -> Dict[str, int]:
+    prompt = sum(_tokens(_text(m.get("content"))) for m in body.get("messages", []))
+    completion = _tokens(message.get("content") or json.dumps(message.get("tool_calls")))
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+async def _generate() -> None:
+    """Waits out the simulated generation time, holding a capacity slot if configured."""
+    delay = max(0.0, settings.latency * (1 + random.uniform(-settings.jitter, settings.jitter)))
+    stats["queued"] += 1
+    if _slots is not None:
+        await _slots.acquire()
+    stats["queued"] -= 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    start = time.perf_counter()
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        stats["in_flight"] -= 1
+        stats["busy_seconds"] += time.perf_counter() - start
+        if _slots is not None:
+            _slots.release()
+
+def _chunks(completion_id: str, model: str, message: Dict[str, Any], usage: Optional[Dict[str, int]]) -> List[str]:
+    base = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+    delta: Dict[str, Any] = {"role": "assistant"}
+    if message.get("tool_calls"):
+        delta["tool_calls"] = [{"index": 0, **call} for call in message["tool_calls"]]
+        finish = "tool_calls"
+    else:
+        delta["content"] = message["content"]
+        finish = "stop"
+    events = [
+        {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]},
+        {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish}]}
+    ]
+    if usage:
+        events.append({**base, "choices": [], "usage": usage})
+    return [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> Any:
+    body = await request.json()
+    stats["requests"] += 1
+    if random.random() < settings.error_rate:
+        stats["rate_limited"] += 1
+        error = {"error": {"message": "Rate limit reached.", "type": "requests", "code": "rate_limit_exceeded"}}
+        return JSONResponse(error, status_code=429, headers={"retry-after": "0.1"})
+    await _generate()
+
+    message = _answer(body)
+    usage = _usage(body, message)
+    completion_id = f"chatcmpl-{next(_ids)}"
+    model = body.get("model", "stub")
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        chunks = _chunks(completion_id, model, message, usage if include_usage else None)
+        return StreamingResponse(iter(chunks), media_type="text/event-stream")
+
+    return JSONResponse({
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+        "usage": usage
+    })
+
+@app.get("/stats")
+async def get_stats() -> Dict[str, Any]:
+    return {**stats, "latency": settings.latency, "capacity": settings.capacity}
+
+@app.post("/stats/reset")
+async def reset_stats() -> Dict[str, Any]:
+    stats.update(requests=0, rate_limited=0, max_in_flight=stats["in_flight"], busy_seconds=0.0)
+    return stats
+
+def main() -> None:
+    global _slots
+    parser = argparse.ArgumentParser(description="Serve a stub OpenAI-compatible chat model.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter, e.g. 0.2 for ±20%%")
+    parser.add_argument("--capacity", type=int, default=0, help="Concurrent completions before queueing (0: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 429")
+    args = parser.parse_args()
+
+    import uvicorn
+    settings.latency, settings.jitter, settings.capacity = args.latency, args.jitter, args.capacity
+    settings.error_rate = args.error_rate
+    _slots = asyncio.Semaphore(args.capacity) if args.capacity else None
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Concurrent-load test of the FastAPI service.
+
+Drives scripted multi-user conversations against `/chat` (or `/chat/stream`)
+and the polling endpoints `/session-state` and `/dashboard`, at increasing
+numbers of simultaneous learners, and reports latency percentiles,
+throughput and error rates per level. By default it starts the stub LLM
+server (`benchmarks.llm_stub`) and the service itself with uvicorn, so the
+real HTTP client, checkpointer and graph run against a model with known
+latency. Run from `prototype/backend`:
+
+    python -m benchmarks.load --levels 1,4,16,32 --llm-latency 0.5 --llm-capacity 16
+    python -m benchmarks.load --url http://localhost:8000 --levels 1,8   # an already running service
+
+The reported capacity is the highest level whose throughput still grew by
+at least `--saturation` over the previous level.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import httpx
+from core.fakes import DIALOGUE
+
+BACKEND = Path(__file__).resolve().parents[1]
+GLOSSARY = BACKEND.parents[1] / "research" / "data" / "glossary.json"
+
+Sample = Tuple[str, float, bool]
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+async def _request(client: httpx.AsyncClient, samples: List[Sample], name: str, path: str, **kwargs: Any) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.get(path, **kwargs)
+        if name == "chat/stream":
+            async for _ in response.aiter_lines():
+                pass
+        ok = response.status_code < 400 and not (name == "chat/stream" and "event: error" in response.text)
+    except httpx.HTTPError:
+        response, ok = None, False
+    samples.append((name, time.perf_counter() - start, ok))
+    return response
+
+async def learner(client: httpx.AsyncClient, user_id: str, samples: List[Sample], stream: bool, poll: bool, think: float) -> None:
+    """Plays the scripted dialogue as one learner, polling like the frontend does after each turn."""
+    headers = {"X-User-Id": user_id}
+    etag = None
+    for text in DIALOGUE:
+        if stream:
+            await _request(client, samples, "chat/stream", "/chat/stream", params={"user_input": text}, headers=headers)
+        else:
+            await _request(client, samples, "chat", "/chat", params={"user_input": text}, headers=headers)
+        if poll:
+            await _request(client, samples, "session-state", "/session-state", headers=headers)
+            dashboard = await _request(
+                client, samples, "dashboard", "/dashboard",
+                headers={**headers, **({"If-None-Match": etag} if etag else {})}
+            )
+            if dashboard is not None:
+                etag = dashboard.headers.get("etag", etag)
+        if think:
+            await asyncio.sleep(think)
+
+async def _stub_stats(stub_url: Optional[str], reset: bool = False) -> Dict[str, Any]:
+    if not stub_url:
+        return {}
+    async with httpx.AsyncClient(base_url=stub_url) as client:
+        response = await (client.post("/stats/reset") if reset else client.get("/stats"))
+        return response.json()
+
+async def run_level(url: str, users: int, run: str, stub_url: Optional[str], stream: bool, poll: bool, think: float, timeout: float) -> Dict[str, Any]:
+    """Runs `users` learners at once and summarizes their requests."""
+    samples: List[Sample] = []
+    await _stub_stats(stub_url, reset=True)
+    limits = httpx.Limits(max_connections=users * 2, max_keepalive_connections=users * 2)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            learner(client, f"load-{run}-{users}-{i}", samples, stream, poll, think) for i in range(users)
+        ))
+        elapsed = time.perf_counter() - start
+    stub = await _stub_stats(stub_url)
+
+    by_endpoint: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    turns = users * len(DIALOGUE)
+    return {
+        "users": users,
+        "elapsed_s": elapsed,
+        "requests": len(samples),
+        "requests_per_s": len(samples) / elapsed,
+        "turns_per_s": turns / elapsed,
+        "error_rate": sum(1 for s in samples if not s[2]) / max(1, len(samples)),
+        "endpoints": {
+            name: {
+                "count": len(rows),
+                "errors": sum(1 for r in rows if not r[2]),
+                **{f"p{int(q * 100)}_ms": percentile([r[1] for r in rows], q) * 1000 for q in (0.50, 0.95, 0.99)}
+            }
+            for name, rows in sorted(by_endpoint.items())
+        },
+        "llm": {
+            "calls_per_turn": stub["requests"] / turns,
+            "rate_limited": stub["rate_limited"],
+            "peak_in_flight": stub["max_in_flight"],
+            "busy_s": stub["busy_seconds"]
+        } if stub else {}
+    }
+
+def capacity(levels: List[Dict[str, Any]], saturation: float) -> int:
+    """Highest level whose throughput still grew by `saturation` over the previous one, with no errors."""
+    best = levels[0]["users"] if levels and not levels[0]["error_rate"] else 0
+    for previous, current in zip(levels, levels[1:]):
+        if current["error_rate"] or current["turns_per_s"] < previous["turns_per_s"] * (1 + saturation):
+            break
+        best = current["users"]
+    return best
+
+@contextmanager
+def _process(args: List[str], env: Dict[str, str], log: Any) -> Iterator[subprocess.Popen]:
+    process = subprocess.Popen(args, cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def _wait_ready(url: str, path: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=5) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                sys.exit(f"{' '.join(process.args)} exited with code {process.returncode}; see the log file.")
+            try:
+                if (await client.get(path)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    sys.exit(f"{url}{path} did not become ready within {timeout:.0f}s.")
+
+def _service_env(stub_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(LLM_PROVIDER="openai", BASE_URL=f"{stub_url}/v1", OPENAI_API_PROXY="stub")
+    for name, value in {
+        "OPENAI_CHAT_MODEL": "gpt-4o-mini",
+        "OPENAI_EMBED_MODEL": "local",
+        "THREAD": "load",
+        "USER_ID": "load",
+        "GRAPH_PATH": str(GLOSSARY)
+    }.items():
+        env.setdefault(name, value)
+    return env
+
+def _print(levels: List[Dict[str, Any]], best: int) -> None:
+    endpoints = sorted({name for level in levels for name in level["endpoints"]})
+    header = f"{'users':>5} {'req/s':>8} {'turns/s':>8} {'errors':>7}"
+    header += "".join(f" {name + ' p50/p95/p99 ms':>34}" for name in endpoints)
+    header += f" {'llm/turn':>8} {'llm peak':>8}"
+    print(header)
+    for level in levels:
+        row = f"{level['users']:>5} {level['requests_per_s']:>8.1f} {level['turns_per_s']:>8.2f} {level['error_rate']:>7.1%}"
+        for name in endpoints:
+            stats = level["endpoints"].get(name)
+            cell = f"{stats['p50_ms']:.0f}/{stats['p95_ms']:.0f}/{stats['p99_ms']:.0f}" if stats else "-"
+            row += f" {cell:>34}"
+        llm = level["llm"]
+        row += f" {llm['calls_per_turn']:>8.1f} {llm['peak_in_flight']:>8}" if llm else f" {'-':>8} {'-':>8}"
+        print(row)
+    print(f"\ncapacity: {best} concurrent learners" if best else "\ncapacity: not reached at the first level")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the FastAPI service with scripted learners.")
+    parser.add_argument("--url", default=None, help="Target an already running service instead of starting one")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated numbers of simultaneous learners")
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream instead of /chat")
+    parser.add_argument("--no-poll", action="store_true", help="Skip /session-state and /dashboard after each turn")
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds a learner waits between turns")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--saturation", type=float, default=0.1, help="Minimum relative throughput gain per level")
+    parser.add_argument("--port", type=int, default=8010, help="Port of the started service")
+    parser.add_argument("--stub-port", type=int, default=8100, help="Port of the started stub LLM server")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub seconds per completion")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Stub relative latency jitter")
+    parser.add_argument("--llm-capacity", type=int, default=0, help="Stub concurrent completions (0: unlimited)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of stub requests answered with a 429")
+    parser.add_argument("--log", default=os.path.join(tempfile.gettempdir(), "load.log"), help="File receiving the started servers' output")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+    run = str(int(time.time()))
+
+    async def measure(url: str, stub_url: Optional[str]) -> List[Dict[str, Any]]:
+        results = []
+        for users in levels:
+            results.append(await run_level(url, users, run, stub_url, args.stream, not args.no_poll, args.think, args.timeout))
+            if not args.json:
+                print(f"  {users} learners: {results[-1]['turns_per_s']:.2f} turns/s", file=sys.stderr)
+        return results
+
+    async def go() -> List[Dict[str, Any]]:
+        if args.url:
+            return await measure(args.url.rstrip("/"), None)
+
+        stub_url = f"http://127.0.0.1:{args.stub_port}"
+        url = f"http://127.0.0.1:{args.port}"
+        stub_args = [
+            sys.executable, "-m", "benchmarks.llm_stub", "--port", str(args.stub_port),
+            "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter), "--capacity", str(args.llm_capacity),
+            "--error-rate", str(args.llm_error_rate)
+        ]
+        service_args = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"]
+        with open(args.log, "w") as log, \
+                _process(stub_args, dict(os.environ), log) as stub, \
+                _process(service_args, _service_env(stub_url), log) as service:
+            await _wait_ready(stub_url, "/stats", stub)
+            await _wait_ready(url, "/session-state?user_id=load-warmup", service)
+            async with httpx.AsyncClient(base_url=url, timeout=args.timeout) as client:
+                await learner(client, f"load-{run}-warmup", [], args.stream, False, 0)
+            if not (await _stub_stats(stub_url))["requests"]:
+                sys.exit("The service never called the stub LLM (does a .env override BASE_URL?); refusing to load-test it.")
+            return await measure(url, stub_url)
+
+    results = asyncio.run(go())
+    best = capacity(results, args.saturation)
+    if args.json:
+        print(json.dumps({"levels": results, "capacity": best}, indent=2))
+    else:
+        _print(results, best)
+
+if __name__ == "__main__":
+    main()
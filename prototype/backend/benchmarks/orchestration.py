@@ -0,0 +1,179 @@
+"""Offline benchmark of the orchestration graphs.
+
+Runs scripted learner dialogues through the main graph with the fake chat
+model and local embeddings, and reports per-node wall time, per-turn
+latency, throughput and (optionally) memory allocations. Run from
+`prototype/backend`:
+
+    python -m benchmarks.orchestration --dialogues 20 --concurrency 4 --latency 0.05 --memory
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+GLOSSARY = Path(__file__).resolve().parents[3] / "research" / "data" / "glossary.json"
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("OPENAI_EMBED_MODEL", "local")
+os.environ.setdefault("THREAD", "benchmark")
+os.environ.setdefault("USER_ID", "benchmark")
+os.environ.setdefault("GRAPH_PATH", str(GLOSSARY))
+os.environ.setdefault("BASE_URL", "http://localhost")
+os.environ.setdefault("OPENAI_API_PROXY", "offline")
+
+from langchain_core.callbacks import BaseCallbackHandler
+from core.fakes import DIALOGUE
+
+class NodeTimer(BaseCallbackHandler):
+    """Callback handler recording the wall time of every graph node run."""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.interrupts: Dict[str, int] = defaultdict(int)
+        self._started: Dict[UUID, tuple] = {}
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started:
+            self.durations[started[0]].append(time.perf_counter() - started[1])
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started:
+            self.durations[started[0]].append(time.perf_counter() - started[1])
+            self.interrupts[started[0]] += 1
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        "count": len(ordered),
+        "total_ms": sum(ordered) * 1000,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "max_ms": ordered[-1] * 1000
+    }
+
+async def run_dialogue(index: int, timer: NodeTimer, timings: Dict[str, List[float]]) -> None:
+    """Plays the scripted dialogue for one fresh learner."""
+    from services.orchestration import main
+    from services.utilities import invoke_llm, prepare_messages
+    from core.session import build_config
+
+    config = build_config(f"bench-{index}")
+    config["callbacks"].append(timer)
+    for text in DIALOGUE:
+        start = time.perf_counter()
+        await invoke_llm(text, main, config)
+        timings["turn"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await main.aget_state(config, subgraphs=True)
+        timings["get_state(subgraphs=True)"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await prepare_messages({"messages": []}, config)
+        timings["prepare_messages"].append(time.perf_counter() - start)
+
+async def run(dialogues: int, concurrency: int, offset: int = 0) -> Dict[str, Any]:
+    """Runs `dialogues` learners, at most `concurrency` at a time."""
+    timer = NodeTimer()
+    timings: Dict[str, List[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            await run_dialogue(offset + index, timer, timings)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(dialogues)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "dialogues": dialogues,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "dialogues_per_s": dialogues / elapsed,
+        "turns_per_s": dialogues * len(DIALOGUE) / elapsed,
+        "nodes": {node: {**_stats(values), "interrupts": timer.interrupts[node]} for node, values in sorted(timer.durations.items())},
+        "calls": {name: _stats(values) for name, values in timings.items()}
+    }
+
+async def measure_memory(offset: int) -> Dict[str, Any]:
+    """Replays one dialogue under tracemalloc and reports its allocations."""
+    tracemalloc.start(10)
+    before = tracemalloc.take_snapshot()
+    await run_dialogue(offset, NodeTimer(), defaultdict(list))
+    after = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    top = after.compare_to(before, "filename")[:10]
+    return {
+        "retained_kib": sum(stat.size_diff for stat in after.compare_to(before, "filename")) / 1024,
+        "peak_kib": peak / 1024,
+        "top_files": [{"file": str(stat.traceback[0].filename), "size_diff_kib": stat.size_diff / 1024} for stat in top]
+    }
+
+def _print(report: Dict[str, Any]) -> None:
+    print(f"{report['dialogues']} dialogues x {len(DIALOGUE)} turns, concurrency {report['concurrency']}: "
+          f"{report['elapsed_s']:.2f}s, {report['dialogues_per_s']:.2f} dialogues/s, {report['turns_per_s']:.1f} turns/s")
+    for title, rows in (("node", report["nodes"]), ("call", report["calls"])):
+        print(f"\n{title:<28} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total ms':>10}")
+        for name, row in rows.items():
+            print(f"{name:<28} {row['count']:>6} {row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} "
+                  f"{row['p95_ms']:>9.2f} {row['max_ms']:>9.2f} {row['total_ms']:>10.1f}")
+    if "memory" in report:
+        memory = report["memory"]
+        print(f"\nmemory per dialogue: peak {memory['peak_kib']:.0f} KiB, retained {memory['retained_kib']:.0f} KiB")
+        for row in memory["top_files"]:
+            print(f"  {row['size_diff_kib']:>9.1f} KiB  {row['file']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the orchestration graphs with a fake LLM.")
+    parser.add_argument("--dialogues", type=int, default=10, help="Scripted learners to run")
+    parser.add_argument("--concurrency", type=int, default=1, help="Learners run at once")
+    parser.add_argument("--latency", type=float, default=None, help="Fake LLM latency per call in seconds")
+    parser.add_argument("--memory", action="store_true", help="Also trace allocations of one dialogue")
+    parser.add_argument("--no-response-cache", action="store_true", help="Disable the structured response cache")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    import core.config as config
+    if config.LLM_PROVIDER != "fake":
+        sys.exit("LLM_PROVIDER is not 'fake' (check .env); refusing to benchmark against a live model.")
+    if args.latency is not None:
+        config.chat_model.latency = args.latency
+    if args.no_response_cache:
+        config.response_cache.max_entries = 0
+
+    async def go() -> Dict[str, Any]:
+        await config.backends.open()
+        try:
+            await run_dialogue(-1, NodeTimer(), defaultdict(list))  # warm-up: imports, graph and index loading
+            report = await run(args.dialogues, max(1, args.concurrency))
+            if args.memory:
+                report["memory"] = await measure_memory(args.dialogues)
+            return report
+        finally:
+            await config.backends.close()
+
+    report = asyncio.run(go())
+    print(json.dumps(report, indent=2)) if args.json else _print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Import-time budget check.
+
+Imports each entry module in a fresh interpreter and reports how long the
+import took, which shared components of `core.config` it built and which
+model or database client modules it pulled in. Importing a module must not
+build components or load clients (that is the app lifespan's job), and must
+stay within its time budget; any violation exits with status 1, so the
+check can gate CI. Run from `prototype/backend`:
+
+    python -m benchmarks.startup --budget main=2.5 --initialize
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List
+
+GLOSSARY = Path(__file__).resolve().parents[3] / "research" / "data" / "glossary.json"
+BACKEND = Path(__file__).resolve().parents[1]
+
+ENVIRONMENT = {
+    "LLM_PROVIDER": "fake",
+    "OPENAI_EMBED_MODEL": "local",
+    "THREAD": "benchmark",
+    "USER_ID": "benchmark",
+    "GRAPH_PATH": str(GLOSSARY),
+    "BASE_URL": "http://localhost",
+    "OPENAI_API_PROXY": "offline"
+}
+
+BUDGETS = {
+    "core.config": 1.0,
+    "services.utilities": 2.0,
+    "services.orchestration": 3.0,
+    "main": 3.0
+}
+
+CLIENT_MODULES = ["openai", "langchain_openai", "psycopg", "psycopg_pool", "langgraph.checkpoint.postgres"]
+
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+import core.config as cfg
+report = {{"seconds": seconds, "built": cfg.built(), "clients": [m for m in {clients!r} if m in sys.modules]}}
+if {initialize!r}:
+    from main import startup
+    start = time.perf_counter()
+    startup()
+    report["initialize_seconds"] = time.perf_counter() - start
+print(json.dumps(report))
+"""
+
+def probe(module: str, initialize: bool = False) -> Dict[str, Any]:
+    """Imports a module in a fresh interpreter and returns what the import cost.
+
+    Args:
+        module: Dotted module name, importable from `prototype/backend`
+        initialize: Also time building all components and graphs afterwards
+
+    Returns:
+        Import seconds, built components, loaded client modules and (optionally) initialization seconds
+    """
+    code = PROBE.format(module=module, clients=CLIENT_MODULES, initialize=initialize)
+    env = {**os.environ, **{key: os.environ.get(key, value) for key, value in ENVIRONMENT.items()}}
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def check(module: str, report: Dict[str, Any], budget: float) -> List[str]:
+    """Budget violations of one import report."""
+    problems = []
+    if report["seconds"] > budget:
+        problems.append(f"{module}: import took {report['seconds']:.2f}s (budget {budget:.2f}s)")
+    if report["built"]:
+        problems.append(f"{module}: import built {', '.join(report['built'])}")
+    if report["clients"]:
+        problems.append(f"{module}: import loaded {', '.join(report['clients'])}")
+    return problems
+
+def _budgets(values: List[str]) -> Dict[str, float]:
+    budgets = dict(BUDGETS)
+    for value in values:
+        module, _, seconds = value.partition("=")
+        budgets[module] = float(seconds)
+    return budgets
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the import time and side effects of entry modules.")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=SECONDS", help="Import budget, repeatable")
+    parser.add_argument("--initialize", action="store_true", help="Also time building components and graphs after importing main")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    budgets = _budgets(args.budget)
+    reports = {module: probe(module, initialize=args.initialize and module == "main") for module in budgets}
+    problems = [problem for module, report in reports.items() for problem in check(module, report, budgets[module])]
+
+    if args.json:
+        print(json.dumps({"reports": reports, "budgets": budgets, "problems": problems}, indent=2))
+    else:
+        print(f"{'module':<24} {'import s':>9} {'budget s':>9}  built / clients")
+        for module, report in reports.items():
+            side_effects = ", ".join(report["built"] + report["clients"]) or "-"
+            print(f"{module:<24} {report['seconds']:>9.2f} {budgets[module]:>9.2f}  {side_effects}")
+        if "initialize_seconds" in reports.get("main", {}):
+            print(f"\ninitialize (components and graphs): {reports['main']['initialize_seconds']:.2f}s")
+        for problem in problems:
+            print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
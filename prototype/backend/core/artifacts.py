@@ -0,0 +1,174 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+from core.graph import KnowledgeGraph
+from core.response_cache import CONCEPT_ID_REFERENCE
+from core.metrics import file_io
+from prompts.sub_one import planner_
+from prompts.sub_two import mapper_, assessor_
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1
+
+class ArtifactStore:
+    """Versioned, precomputed lesson and assessment skeletons per concept.
+
+    One JSON file per concept holds its base `Plan`, `Evaluations` and a
+    question bank (one `EvalObject` per evaluation title). An artifact's
+    version is a hash of the concept record and the generating prompts, so
+    editing either makes the artifact stale and it is ignored until it is
+    regenerated by `services.artifacts`.
+    """
+
+    def __init__(self, directory: Optional[str], graph: KnowledgeGraph):
+        self.directory = directory
+        self.graph = graph
+        self._lock = threading.Lock()
+        self._artifacts: Optional[Dict[str, Dict[str, Any]]] = None
+        self._labels: Optional[List[tuple]] = None
+        self._versions: Dict[str, str] = {}
+
+    def version(self, concept_id: str) -> Optional[str]:
+        """Returns the version an up-to-date artifact of a concept must carry, or None if unknown."""
+        details = self.graph.get(concept_id)
+        if details is None:
+            return None
+        if concept_id not in self._versions:
+            record = {k: v for k, v in details.items() if k != "status"}
+            source = json.dumps([ARTIFACT_FORMAT, concept_id, record, planner_, mapper_, assessor_], sort_keys=True)
+            self._versions[concept_id] = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        return self._versions[concept_id]
+
+    def _path(self, concept_id: str) -> str:
+        return os.path.join(self.directory, f"{concept_id}.json")
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._artifacts is not None:
+            return self._artifacts
+
+        with self._lock:
+            if self._artifacts is None:
+                artifacts = {}
+                if self.directory and os.path.isdir(self.directory):
+                    for name in os.listdir(self.directory):
+                        if not name.endswith(".json"):
+                            continue
+                        try:
+                            with open(os.path.join(self.directory, name), "r") as f:
+                                artifact = json.load(f)
+                            artifacts[artifact["concept_id"]] = artifact
+                        except Exception as e:
+                            logger.warning(f"Skipping unreadable artifact '{name}': {e}")
+                    logger.info(f"Loaded {len(artifacts)} concept artifacts from {self.directory}")
+                self._artifacts = artifacts
+        return self._artifacts
+
+    def get(self, concept_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Returns the artifact of a concept if it exists and is up to date.
+
+        Args:
+            concept_id: The concept's ID
+
+        Returns:
+            Artifact dict with "plan", "evaluations" and "questions", or None
+        """
+        if not concept_id:
+            return None
+        artifact = self._load().get(concept_id)
+        if artifact is None or artifact.get("version") != self.version(concept_id):
+            return None
+        return artifact
+
+    def missing(self, concept_ids: Optional[List[str]] = None) -> List[str]:
+        """Returns the concepts whose artifact is absent or stale."""
+        return [cid for cid in (concept_ids or self.graph.ids) if self.get(cid) is None]
+
+    def put(self, concept_id: str, plan: Dict[str, Any], evaluations: Dict[str, Any], questions: Dict[str, Any]) -> None:
+        """Writes a concept artifact atomically.
+
+        Args:
+            concept_id: The concept's ID
+            plan: Dumped `Plan`
+            evaluations: Dumped `Evaluations`
+            questions: Dumped `EvalObject` per evaluation title
+
+        Raises:
+            ValueError: If no artifact directory is configured
+        """
+        if not self.directory:
+            raise ValueError("ARTIFACTS_PATH is not configured.")
+
+        artifact = {
+            "concept_id": concept_id,
+            "version": self.version(concept_id),
+            "created": time.time(),
+            "plan": plan,
+            "evaluations": evaluations,
+            "questions": questions
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(concept_id)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(artifact, f, indent=2)
+        os.replace(tmp, path)
+        file_io.inc(target="artifacts", op="write")
+        self._load()[concept_id] = artifact
+
+    def _label_patterns(self) -> List[tuple]:
+        """Label patterns of all concepts, longest label first."""
+        if self._labels is None:
+            labels = [
+                (re.compile(rf"\b{re.escape(details['label'].lower())}\b"), details["label"].lower(), cid)
+                for cid, details in self.graph.concepts.items() if details.get("label")
+            ]
+            self._labels = sorted(labels, key=lambda entry: -len(entry[1]))
+        return self._labels
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Finds the concept a free-text topic is about.
+
+        An explicit concept id wins; otherwise the longest concept label
+        appearing in the text is used. The result tags a session with its
+        main concept; it is not precise enough to stand in for the request
+        (see `match`).
+
+        Args:
+            text: Topic or lesson text
+
+        Returns:
+            The concept's ID, or None if nothing matches
+        """
+        for cid in CONCEPT_ID_REFERENCE.findall(text or ""):
+            if self.graph.get(cid) is not None:
+                return cid
+
+        lowered = (text or "").lower()
+        for pattern, _, cid in self._label_patterns():
+            if pattern.search(lowered):
+                return cid
+        return None
+
+    def match(self, text: str) -> Optional[str]:
+        """Finds the concept a topic names exactly, i.e. whose artifact can replace the request.
+
+        Args:
+            text: Topic text
+
+        Returns:
+            The concept's ID if the text is exactly a concept id or a concept label, otherwise None
+        """
+        topic = " ".join((text or "").split()).rstrip(".")
+        if CONCEPT_ID_REFERENCE.fullmatch(topic) and self.graph.get(topic) is not None:
+            return topic
+        lowered = topic.lower()
+        for _, label, cid in self._label_patterns():
+            if label == lowered:
+                return cid
+        return None
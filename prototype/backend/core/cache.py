@@ -0,0 +1,99 @@
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class PromptCache:
+    """Per-user cache of rendered system prompt sections.
+
+    Each entry is stored with the version it was built from. A lookup with a
+    different version, or after `invalidate`, rebuilds the section; otherwise
+    the cached text is returned without touching the store or the graph.
+    A section whose build overlaps an invalidation is returned but not kept.
+    At most `max_entries` sections are kept; the least recently used are
+    evicted first.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Hashable, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    def get(self, user_id: str, section: str, build: Callable[[], str], version: Hashable = None) -> str:
+        """Returns a cached section, building it if missing or stale.
+
+        Args:
+            user_id: The user the section belongs to
+            section: Section name (e.g. "profile", "knowledge")
+            build: Callable producing the section text
+            version: Token identifying the data the section was built from
+
+        Returns:
+            The section text
+        """
+        key = (user_id, section)
+        entry = self._lookup(key, version)
+        if entry is not None:
+            self.hits[section] += 1
+            return entry[1]
+
+        self.misses[section] += 1
+        generation = self.generation(user_id)
+        text = build()
+        self._store(key, version, text, generation)
+        return text
+
+    async def aget(self, user_id: str, section: str, build: Callable[[], Awaitable[Any]], version: Hashable = None) -> Any:
+        """Async variant of `get` for sections built from async sources such as the store.
+
+        Besides prompt text, it also caches the structured data sections are
+        built from (e.g. the profile snapshot).
+        """
+        key = (user_id, section)
+        entry = self._lookup(key, version)
+        if entry is not None:
+            self.hits[section] += 1
+            return entry[1]
+
+        self.misses[section] += 1
+        generation = self.generation(user_id)
+        text = await build()
+        self._store(key, version, text, generation)
+        return text
+
+    def _lookup(self, key: Tuple[str, str], version: Hashable) -> Optional[Tuple[Hashable, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: Tuple[str, str], version: Hashable, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation(key[0]):
+                return
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, user_id: str) -> int:
+        """Returns a counter bumped by every invalidation for the user."""
+        return self._generations.get(user_id, 0)
+
+    def invalidate(self, user_id: str, section: Optional[str] = None) -> None:
+        """Drops one section (or all sections) cached for a user.
+
+        Args:
+            user_id: The user whose cache entries are stale
+            section: Section name, or None for every section
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id and section in (None, k[1])]:
+                del self._entries[key]
+            self._generations[user_id] = self.generation(user_id) + 1
+
+prompt_cache = PromptCache()
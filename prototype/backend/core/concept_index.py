@@ -0,0 +1,159 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from core.graph import KnowledgeGraph
+from core.metrics import file_io
+
+logger = logging.getLogger(__name__)
+
+class ConceptIndex:
+    """Embedding index over the knowledge graph concepts.
+
+    Each concept's label and content are embedded once and stored as a
+    row-normalized float32 matrix in `{path}.npy`, memory-mapped on load,
+    next to `{path}.json` holding the row ids and a fingerprint of the
+    graph content and embedding model. A stale or missing index is rebuilt
+    on first use. Lookups are a single matrix product followed by a top-k
+    selection and a re-rank that favours concepts whose prerequisite
+    neighbours also match the query.
+    """
+
+    def __init__(
+        self,
+        graph: KnowledgeGraph,
+        embeddings: Any,
+        path: Optional[str],
+        model: Optional[str] = None,
+        neighbour_weight: float = 0.1,
+        batch_size: int = 64
+    ):
+        self.graph = graph
+        self.embeddings = embeddings
+        self.path = path
+        self.model = model
+        self.neighbour_weight = neighbour_weight
+        self.batch_size = batch_size
+        self._lock = asyncio.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._neighbours: List[np.ndarray] = []
+        self._ready = False
+
+    def fingerprint(self) -> str:
+        """Hash of the embedded concept texts and the embedding model."""
+        texts = [[cid, self._text(cid)] for cid in self.graph.ids]
+        return hashlib.sha256(json.dumps([self.model, texts]).encode("utf-8")).hexdigest()[:16]
+
+    def _text(self, concept_id: str) -> str:
+        details = self.graph.get(concept_id)
+        return f"{details.get('label', '')}: {details.get('content', '')}"
+
+    def _read(self, fingerprint: str) -> bool:
+        """Memory-maps the persisted index if it matches the fingerprint."""
+        if not self.path or not os.path.exists(f"{self.path}.npy") or not os.path.exists(f"{self.path}.json"):
+            return False
+        try:
+            with open(f"{self.path}.json", "r") as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") != fingerprint:
+                return False
+            self._matrix = np.load(f"{self.path}.npy", mmap_mode="r")
+            self._ids = meta["ids"]
+            return True
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable concept index '{self.path}': {e}")
+            return False
+
+    def _write(self, fingerprint: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        np.save(f"{self.path}.tmp.npy", self._matrix)
+        os.replace(f"{self.path}.tmp.npy", f"{self.path}.npy")
+        with open(f"{self.path}.json.tmp", "w") as f:
+            json.dump({"fingerprint": fingerprint, "model": self.model, "ids": self._ids}, f)
+        os.replace(f"{self.path}.json.tmp", f"{self.path}.json")
+        file_io.inc(target="concept_index", op="write")
+
+    async def _build(self) -> None:
+        ids = self.graph.ids
+        vectors = []
+        for start in range(0, len(ids), self.batch_size):
+            batch = [self._text(cid) for cid in ids[start:start + self.batch_size]]
+            vectors.extend(await self.embeddings.aembed_documents(batch))
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms == 0, 1, norms)
+        self._ids = list(ids)
+        logger.info(f"Embedded {len(ids)} concepts into the concept index")
+
+    def _link(self) -> None:
+        """Builds the row lookup and the prerequisite-neighbour rows of every concept."""
+        self._rows = {cid: row for row, cid in enumerate(self._ids)}
+        self._neighbours = [
+            np.fromiter(
+                {self._rows[n] for n in self.graph.prerequisites(cid) + self.graph.dependents(cid) if n in self._rows},
+                dtype=np.int64
+            )
+            for cid in self._ids
+        ]
+
+    async def ensure_ready(self) -> None:
+        """Loads the persisted index, or embeds every concept if it is missing or stale."""
+        if self._ready:
+            return
+
+        async with self._lock:
+            if self._ready:
+                return
+            fingerprint = await asyncio.to_thread(self.fingerprint)
+            if not await asyncio.to_thread(self._read, fingerprint):
+                await self._build()
+                if self.path:
+                    await asyncio.to_thread(self._write, fingerprint)
+            self._link()
+            self._ready = True
+
+    def _rank(self, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        pool = min(len(scores), max(k * 4, k))
+        candidates = np.argpartition(-scores, pool - 1)[:pool]
+        ranked = []
+        for row in candidates:
+            neighbours = self._neighbours[row]
+            support = float(scores[neighbours].max()) if neighbours.size else 0.0
+            ranked.append((float(scores[row]) + self.neighbour_weight * max(support, 0.0), int(row)))
+        ranked.sort(reverse=True)
+        return [(self._ids[row], score) for score, row in ranked[:k]]
+
+    def search_vectors(self, queries: np.ndarray, k: int = 5) -> List[List[Tuple[str, float]]]:
+        """Finds the top-k concepts for a batch of query embeddings.
+
+        Args:
+            queries: Array of shape (n, dims)
+            k: Results per query
+
+        Returns:
+            One list of (concept id, score) per query, best first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = (queries / np.where(norms == 0, 1, norms)) @ self._matrix.T
+        k = min(k, len(self._ids))
+        return [self._rank(row, k) for row in scores] if k else [[] for _ in scores]
+
+    async def search(self, queries: List[str], k: int = 5) -> List[List[Tuple[str, float]]]:
+        """Finds the top-k concepts for each free-text query.
+
+        Args:
+            queries: Query texts, embedded in one batch
+            k: Results per query
+
+        Returns:
+            One list of (concept id, score) per query, best first
+        """
+        await self.ensure_ready()
+        vectors = await self.embeddings.aembed_documents(queries)
+        return self.search_vectors(np.asarray(vectors), k)
@@ -1,12 +1,19 @@
+"""Application settings and shared components.
+
+Settings are read from the environment on import. Components (model
+clients, persistence backends, caches, the knowledge graph) are built by
+memoized factories on first attribute access, e.g. `config.llm`, so
+importing a module that only needs settings or the graph never creates
+model clients. The app lifespan calls `initialize()` to build them before
+serving the first request.
+"""
 import os
 import json
 import logging
-from typing import Dict, Any, Optional
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from dotenv import load_dotenv
-from langchain.embeddings import init_embeddings
-from langchain.chat_models import init_chat_model
-from langgraph.store.memory import InMemoryStore
-from langgraph.checkpoint.memory import MemorySaver
+from core.metrics import MetricsCallback, TraceSink
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,6 +27,34 @@ BASE_URL = os.getenv('BASE_URL')
 OPENAI_CHAT_MODEL = os.getenv('OPENAI_CHAT_MODEL')
 OPENAI_EMBED_MODEL = os.getenv('OPENAI_EMBED_MODEL')
 OPENAI_API_PROXY = os.getenv('OPENAI_API_PROXY')
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
+FAKE_LLM_LATENCY = float(os.getenv('FAKE_LLM_LATENCY', '0'))
+PERSISTENCE_BACKEND = os.getenv('PERSISTENCE_BACKEND', 'memory')
+DATABASE_URL = os.getenv('DATABASE_URL')
+DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '10'))
+CHECKPOINT_KEEP = int(os.getenv('CHECKPOINT_KEEP', '20'))
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH')
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', str(7 * 24 * 3600)))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1000'))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0'))
+ARTIFACTS_PATH = os.getenv('ARTIFACTS_PATH')
+EMBED_DIMS = int(os.getenv('EMBED_DIMS', '1536'))
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH')
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+STATUS_JOURNAL_PATH = os.getenv('STATUS_JOURNAL_PATH', os.path.join(DATA_DIR, 'status.journal'))
+STATUS_SNAPSHOT_PATH = os.getenv('STATUS_SNAPSHOT_PATH', os.path.join(DATA_DIR, 'status.snapshot'))
+CONCEPT_INDEX_PATH = os.getenv('CONCEPT_INDEX_PATH', os.path.join(DATA_DIR, 'concepts.index'))
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '8000'))
+TOOL_OUTPUT_TOKENS = int(os.getenv('TOOL_OUTPUT_TOKENS', '1000'))
+MEMORY_DEDUP_THRESHOLD = float(os.getenv('MEMORY_DEDUP_THRESHOLD', '0.92'))
+MEMORY_HALF_LIFE_DAYS = float(os.getenv('MEMORY_HALF_LIFE_DAYS', '30'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+EMBED_MAX_CONCURRENCY = int(os.getenv('EMBED_MAX_CONCURRENCY', '8'))
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', '4'))
+LLM_RETRY_BUDGET = float(os.getenv('LLM_RETRY_BUDGET', '0.2'))
+METRICS_TRACE_PATH = os.getenv('METRICS_TRACE_PATH')
+LLM_PRICES = json.loads(os.getenv('LLM_PRICES', '{}'))
+ARTIFACTS_WARMUP = os.getenv('ARTIFACTS_WARMUP', 'false').lower() in ('1', 'true', 'yes')
 
 if not all([THREAD, USER_ID, GRAPH_PATH, BASE_URL, OPENAI_API_PROXY]):
     missing = [var for var, val in {
@@ -31,40 +66,151 @@ if not all([THREAD, USER_ID, GRAPH_PATH, BASE_URL, OPENAI_API_PROXY]):
     }.items() if not val]
     logger.warning(f"Missing essential environment variables: {', '.join(missing)}")
 
-try:
-    embeddings = init_embeddings(
-        api_key=OPENAI_API_PROXY, 
-        base_url=BASE_URL, 
-        model=OPENAI_EMBED_MODEL
-    )
-    
-    llm = init_chat_model(
-        api_key=OPENAI_API_PROXY, 
-        base_url=BASE_URL, 
-        model=OPENAI_CHAT_MODEL
-    )
-except Exception as e:
-    logger.error(f"Failed to initialize AI models: {str(e)}")
-    raise
+EMBED_MODEL = OPENAI_EMBED_MODEL or ('local' if LLM_PROVIDER == 'fake' else None)
+CHAT_LANE = OPENAI_CHAT_MODEL or LLM_PROVIDER
 
-store = InMemoryStore(index={"embed": embeddings, "dims": 1536, "fields": ["memory", "type"]})
-checkpointer = MemorySaver()
+metrics = MetricsCallback(prices=LLM_PRICES, sink=TraceSink(METRICS_TRACE_PATH))
 
 CONFIG: Dict[str, Any] = {
     'configurable': {
         'thread_id': THREAD, 
         'recursion_limit': 3, 
         'user_id': USER_ID
-    }
+    },
+    'callbacks': [metrics]
+}
+
+def _gate() -> Any:
+    from core.limiter import RequestGate
+    return RequestGate(
+        limits={CHAT_LANE: LLM_MAX_CONCURRENCY, str(EMBED_MODEL): EMBED_MAX_CONCURRENCY}, 
+        default_limit=LLM_MAX_CONCURRENCY, 
+        max_attempts=LLM_MAX_ATTEMPTS, 
+        budget_ratio=LLM_RETRY_BUDGET
+    )
+
+def _embeddings() -> Any:
+    from core.embeddings import build_embeddings
+    try:
+        return build_embeddings(
+            EMBED_MODEL, 
+            api_key=OPENAI_API_PROXY, 
+            base_url=BASE_URL, 
+            dims=EMBED_DIMS, 
+            cache_path=EMBEDDING_CACHE_PATH,
+            gate=get('gate')
+        )
+    except Exception as e:
+        logger.error(f"Failed to initialize the embedding model: {str(e)}")
+        raise
+
+def _chat_model() -> Any:
+    try:
+        if LLM_PROVIDER == 'fake':
+            from core.fakes import FakeChatModel
+            return FakeChatModel(latency=FAKE_LLM_LATENCY)
+        from langchain.chat_models import init_chat_model
+        return init_chat_model(
+            api_key=OPENAI_API_PROXY, 
+            base_url=BASE_URL, 
+            model=OPENAI_CHAT_MODEL,
+            max_retries=0
+        )
+    except Exception as e:
+        logger.error(f"Failed to initialize the chat model: {str(e)}")
+        raise
+
+def _llm() -> Any:
+    from core.limiter import GuardedChatModel
+    return GuardedChatModel(model=get('chat_model'), gate=get('gate'), lane=CHAT_LANE)
+
+def _backends() -> Any:
+    from core.persistence import build_backends
+    return build_backends(
+        PERSISTENCE_BACKEND, 
+        DATABASE_URL, 
+        index={"embed": get('embeddings'), "dims": EMBED_DIMS, "fields": ["memory"]}, 
+        pool_size=DATABASE_POOL_SIZE
+    )
+
+def _store() -> Any:
+    from core.metrics import instrument_store
+    return instrument_store(get('backends').store)
+
+def _response_cache() -> Any:
+    from core.response_cache import ResponseCache
+    return ResponseCache(
+        path=RESPONSE_CACHE_PATH, 
+        ttl=RESPONSE_CACHE_TTL, 
+        max_entries=RESPONSE_CACHE_SIZE, 
+        embeddings=get('embeddings'), 
+        similarity=RESPONSE_CACHE_SIMILARITY
+    )
+
+def _graph() -> Any:
+    from core.graph import KnowledgeGraph
+    return KnowledgeGraph(GRAPH_PATH)
+
+def _knowledge() -> Any:
+    from core.journal import StatusJournal
+    from core.knowledge import KnowledgeStates
+    return KnowledgeStates(get('graph'), StatusJournal(STATUS_JOURNAL_PATH, STATUS_SNAPSHOT_PATH))
+
+def _artifacts() -> Any:
+    from core.artifacts import ArtifactStore
+    return ArtifactStore(ARTIFACTS_PATH, get('graph'))
+
+def _concept_index() -> Any:
+    from core.concept_index import ConceptIndex
+    return ConceptIndex(get('graph'), get('embeddings'), CONCEPT_INDEX_PATH, model=OPENAI_EMBED_MODEL)
+
+FACTORIES: Dict[str, Callable[[], Any]] = {
+    'gate': _gate,
+    'embeddings': _embeddings,
+    'chat_model': _chat_model,
+    'llm': _llm,
+    'backends': _backends,
+    'store': _store,
+    'checkpointer': lambda: get('backends').checkpointer,
+    'response_cache': _response_cache,
+    'graph': _graph,
+    'knowledge': _knowledge,
+    'artifacts': _artifacts,
+    'concept_index': _concept_index
 }
 
-graph_data: Optional[Dict[str, Any]] = None
-try:
-    if os.path.exists(GRAPH_PATH):
-        with open(GRAPH_PATH, "r") as f:
-            graph_data = json.load(f)
-        logger.info(f"Successfully loaded graph data from {GRAPH_PATH}")
-    else:
-        logger.error(f"Graph file not found at {GRAPH_PATH}")
-except Exception as e:
-    logger.error(f"Error loading graph data: {str(e)}")
\ No newline at end of file
+_instances: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+def get(name: str) -> Any:
+    """Returns a shared component, building it (and what it depends on) on first use.
+
+    Args:
+        name: Component name, a key of `FACTORIES`
+
+    Returns:
+        The component instance
+
+    Raises:
+        KeyError: If no component has that name
+    """
+    if name in _instances:
+        return _instances[name]
+    with _lock:
+        if name not in _instances:
+            _instances[name] = FACTORIES[name]()
+        return _instances[name]
+
+def initialize(names: Optional[Iterable[str]] = None) -> None:
+    """Builds the given components (default: all), e.g. from the app lifespan."""
+    for name in names or FACTORIES:
+        get(name)
+
+def built() -> List[str]:
+    """Names of the components built so far."""
+    return list(_instances)
+
+def __getattr__(name: str) -> Any:
+    if name in FACTORIES:
+        return get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
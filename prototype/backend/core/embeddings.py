@@ -0,0 +1,199 @@
+import re
+import math
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from core.metrics import file_io
+from core.limiter import RequestGate, current_user, fingerprint
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+class HashingEmbeddings(Embeddings):
+    """Offline embedding model based on signed feature hashing.
+
+    Unigrams and bigrams of the lower-cased text are hashed into `dims`
+    buckets and the vector is L2-normalized. It needs no network or model
+    download, so tests and local runs work without an API key; similarity
+    is lexical rather than semantic.
+    """
+
+    def __init__(self, dims: int = 1536):
+        self.dims = dims
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dims
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dims] += 1.0 if digest >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class CachedEmbeddings(Embeddings):
+    """Embedding service that batches, deduplicates and caches vectors.
+
+    Vectors are keyed by a hash of the model name and the text, so each
+    distinct text is embedded once: repeated texts within a call are sent
+    once, known texts come from an in-memory LRU or the optional SQLite
+    cache, and the rest goes to the wrapped model in chunks of `batch_size`,
+    through the optional `RequestGate` on the async path.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: Optional[str] = None,
+        path: Optional[str] = None,
+        batch_size: int = 128,
+        max_memory: int = 10000,
+        gate: Optional[RequestGate] = None
+    ):
+        self.embeddings = embeddings
+        self.model = model or type(embeddings).__name__
+        self.path = path
+        self.batch_size = batch_size
+        self.max_memory = max_memory
+        self.gate = gate
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.path and self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        return self._db
+
+    def key(self, text: str) -> str:
+        """Content hash identifying a text's vector for this model."""
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: array) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, array]:
+        """Returns the cached vectors among `keys`."""
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            missing = [key for key in keys if key not in found]
+            db = self._connect()
+            for start in range(0, len(missing) if db is not None else 0, 500):
+                chunk = missing[start:start + 500]
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob)
+                    self._remember(key, found[key])
+            return found
+
+    def _store(self, vectors: Dict[str, array]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            db = self._connect()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in vectors.items()]
+                )
+                db.commit()
+                file_io.inc(target="embedding_cache", op="write")
+
+    def _plan(self, texts: List[str]) -> tuple:
+        keys = [self.key(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        pending = {key: text for key, text in zip(keys, texts) if key not in found}
+        self.hits += len(texts) - sum(1 for key in keys if key in pending)
+        self.misses += len(pending)
+        return keys, found, pending
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = self._plan(texts)
+        items = list(pending.items())
+        computed = {}
+        for start in range(0, len(items), self.batch_size):
+            chunk = items[start:start + self.batch_size]
+            vectors = self.embeddings.embed_documents([text for _, text in chunk])
+            computed.update({key: array("f", vector) for (key, _), vector in zip(chunk, vectors)})
+        if computed:
+            self._store(computed)
+        found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, pending = await asyncio.to_thread(self._plan, texts)
+        items = list(pending.items())
+        computed = {}
+        for start in range(0, len(items), self.batch_size):
+            chunk = items[start:start + self.batch_size]
+            vectors = await self._aembed([text for _, text in chunk])
+            computed.update({key: array("f", vector) for (key, _), vector in zip(chunk, vectors)})
+        if computed:
+            await asyncio.to_thread(self._store, computed)
+        found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        if self.gate is None:
+            return await self.embeddings.aembed_documents(texts)
+        return await self.gate.run(
+            self.model, lambda: self.embeddings.aembed_documents(texts), user=current_user(), key=fingerprint(texts)
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+def build_embeddings(
+    model: Optional[str],
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    dims: int = 1536,
+    cache_path: Optional[str] = None,
+    gate: Optional[RequestGate] = None
+) -> CachedEmbeddings:
+    """Creates the embedding service for a model name.
+
+    Args:
+        model: "local" (or "local:<anything>") for `HashingEmbeddings`, otherwise an `init_embeddings` model string
+        api_key: Provider API key
+        base_url: Provider base URL
+        dims: Vector size of the local model
+        cache_path: Optional SQLite file persisting computed vectors
+        gate: Optional concurrency/retry gate for requests to the model
+
+    Returns:
+        Caching embedding service wrapping the model
+    """
+    if model and model.split(":")[0] == "local":
+        base = HashingEmbeddings(dims)
+    else:
+        from langchain.embeddings import init_embeddings
+        base = init_embeddings(api_key=api_key, base_url=base_url, model=model)
+    return CachedEmbeddings(base, model=model, path=cache_path, gate=gate)
@@ -0,0 +1,113 @@
+import json
+import time
+import asyncio
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Type
+from pydantic import BaseModel
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from schemas.sub_one import Plan, Step, LearningObject, Act, Conclusion
+from schemas.sub_two import Evaluations, Eval, EvalObject, ActE, Report
+
+CANNED: Dict[str, Callable[[], BaseModel]] = {
+    "Plan": lambda: Plan(steps=[
+        Step(title="Warm-up", description="Introduce the topic.", learning_objective="Recognize the concept."),
+        Step(title="Main lesson", description="Explain the concept in depth.", learning_objective="Apply the concept.")
+    ]),
+    "LearningObject": lambda: LearningObject(title="Lesson", content="A short lesson about the requested concept."),
+    "Act": lambda: Act(action=Conclusion(conclusion="The session covered the concept."), action_type="conclusion"),
+    "Conclusion": lambda: Conclusion(conclusion="The session covered the concept."),
+    "Evaluations": lambda: Evaluations(evals=[
+        Eval(title="Recall", description="Check the definition."),
+        Eval(title="Application", description="Apply the concept to an example.")
+    ]),
+    "EvalObject": lambda: EvalObject(title="Question", content="Explain the concept in your own words.", evaluation_criteria=["accuracy"]),
+    "ActE": lambda: ActE(action=Report(report="The learner answered every question; " + "details follow. " * 3), action_type="report"),
+    "Report": lambda: Report(report="The learner answered every question; " + "details follow. " * 3),
+}
+
+DIALOGUE = ["hi there", "teach me about A.1", "ok", "ok", "test me on it", "first answer", "second answer", "thanks"]
+"""Learner turns that walk the scripted agent through chat, a lesson and an assessment."""
+
+SUMMARY_REPLY = "A concise summary of the conversation so far."
+CHAT_REPLY = "Happy to help with machine learning concepts."
+
+_call_ids = itertools.count(1)
+
+def session_tool(text: str) -> Optional[str]:
+    """Name of the session tool a scripted agent turn calls for a learner message, if any."""
+    text = text.lower()
+    if any(word in text for word in ("teach", "learn")):
+        return "LearningSession"
+    if any(word in text for word in ("test", "assess")):
+        return "AssessmentSession"
+    return None
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model for offline runs and benchmarks.
+
+    Once tools are bound, agent turns are scripted by keyword: a human
+    message containing "teach" or "learn" opens a `LearningSession`, one
+    containing "test" or "assess" opens an `AssessmentSession`, anything
+    else (and every call without tools) gets a short text reply.
+    Structured outputs return canned instances of the requested schema.
+    Every call waits `latency` seconds to stand in for the network.
+    """
+
+    latency: float = 0.0
+    topic: str = "A.1"
+    tools_bound: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        text = last.content if isinstance(last, HumanMessage) and isinstance(last.content, str) else ""
+        if not self.tools_bound:
+            return AIMessage(content=SUMMARY_REPLY)
+        name = session_tool(text)
+        if name is None:
+            return AIMessage(content=CHAT_REPLY)
+
+        call_id = f"call_{next(_call_ids)}"
+        args = {"input": self.topic}
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": call_id}],
+            additional_kwargs={"tool_calls": [
+                {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+            ]}
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self.model_copy(update={"tools_bound": True})
+
+    def with_structured_output(self, schema: Type[BaseModel], **kwargs: Any) -> Runnable:
+        build = CANNED[schema.__name__]
+
+        def invoke(_: Any) -> BaseModel:
+            if self.latency:
+                time.sleep(self.latency)
+            return build()
+
+        async def ainvoke(_: Any) -> BaseModel:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return build()
+
+        return RunnableLambda(invoke, afunc=ainvoke, name=f"Fake{schema.__name__}")
+
@@ -0,0 +1,287 @@
+import os
+import json
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Any, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+class KnowledgeGraph:
+    """Process-wide, indexed view of the knowledge graph JSON file.
+
+    The file is parsed once on first access and treated as immutable shared
+    content. Lookups by id, by ordinal, by section and along prerequisite
+    adjacency (both directions) are served from in-memory indexes, and
+    transitive reachability is precomputed as one integer bitset per concept
+    so closure and learning-path queries need no graph walk. The file is
+    not reloaded, so caches built from the graph need no invalidation.
+    Learner statuses live in `core.knowledge.KnowledgeStates`, which
+    versions them per user; statuses stored in the file are ignored.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.error: Optional[str] = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._data: Dict[str, Any] = {}
+        self._ids: List[str] = []
+        self._ordinals: Dict[str, int] = {}
+        self._by_section: Dict[str, List[str]] = {}
+        self._prerequisites: Dict[str, List[str]] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._ancestors: List[int] = []
+        self._external: List[int] = []
+        self._component: List[int] = []
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def _load(self) -> None:
+        """Parses the graph file and rebuilds every index."""
+        self._data, self.error = {}, None
+
+        if not self.path or not os.path.exists(self.path):
+            self.error = f"Error: File '{self.path}' does not exist."
+        else:
+            try:
+                with open(self.path, "r") as f:
+                    self._data = json.load(f)
+            except json.JSONDecodeError as jde:
+                self.error = f"Error reading JSON from '{self.path}': {jde}"
+            except Exception as e:
+                self.error = f"Error opening '{self.path}': {e}"
+
+        if not self.error and "concepts" not in self._data:
+            self.error = "Error: 'concepts' key not found in the JSON data."
+
+        if self.error:
+            logger.error(self.error)
+        else:
+            logger.info(f"Successfully loaded graph data from {self.path}")
+
+        self._index()
+        self._loaded = True
+
+    def _index(self) -> None:
+        by_section = defaultdict(list)
+        prerequisites = {}
+        dependents = defaultdict(list)
+
+        concepts = self._data.get("concepts", {})
+        for cid, details in concepts.items():
+            by_section[details.get("section")].append(cid)
+            prerequisites[cid] = list(dict.fromkeys(details.get("prerequisites", [])))
+            for pid in prerequisites[cid]:
+                dependents[pid].append(cid)
+
+        self._ids = list(concepts)
+        self._ordinals = {cid: i for i, cid in enumerate(self._ids)}
+        self._by_section = dict(by_section)
+        self._prerequisites = prerequisites
+        self._dependents = dict(dependents)
+        self._reachability()
+
+    def _reachability(self) -> None:
+        """Precomputes ancestor bitsets over the prerequisite graph.
+
+        The prerequisite lists contain cycles, so concepts are first grouped
+        into strongly connected components (Tarjan). Tarjan emits components
+        prerequisites-first, which gives both a topological rank for the
+        condensed graph and an order in which closures can be built by OR-ing
+        already finished prerequisite bitsets.
+        """
+        n = len(self._ids)
+        edges = [
+            [self._ordinals[p] for p in self._prerequisites[cid] if p in self._ordinals]
+            for cid in self._ids
+        ]
+
+        index = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, i = work.pop()
+                if i == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                if i < len(edges[node]):
+                    work.append((node, i + 1))
+                    child = edges[node][i]
+                    if index[child] == -1:
+                        work.append((child, 0))
+                    elif on_stack[child]:
+                        low[node] = min(low[node], index[child])
+                    continue
+                if low[node] == index[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+        component = [0] * n
+        ancestors = [0] * n
+        external = [0] * n
+        for rank, members in enumerate(components):
+            for member in members:
+                component[member] = rank
+            closure = 0
+            for member in members:
+                for p in edges[member]:
+                    closure |= 1 << p
+                    if component[p] != rank:
+                        closure |= ancestors[p]
+            for member in members:
+                external[member] = sum(1 << p for p in set(edges[member]) if component[p] != rank)
+                ancestors[member] = closure & ~(1 << member)
+
+        self._component = component
+        self._ancestors = ancestors
+        self._external = external
+
+    @property
+    def data(self) -> Optional[Dict[str, Any]]:
+        """The raw graph document, or None if it could not be loaded."""
+        self._ensure_loaded()
+        return None if self.error else self._data
+
+    @property
+    def concepts(self) -> Dict[str, Dict[str, Any]]:
+        """Mapping of concept id to concept record."""
+        self._ensure_loaded()
+        return self._data.get("concepts", {})
+
+    @property
+    def ids(self) -> List[str]:
+        """Concept ids in ordinal order."""
+        self._ensure_loaded()
+        return self._ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def ordinal(self, concept_id: str) -> Optional[int]:
+        """Returns the dense integer position of a concept, or None if unknown."""
+        self._ensure_loaded()
+        return self._ordinals.get(concept_id)
+
+    def get(self, concept_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the concept record for an id, or None if unknown."""
+        return self.concepts.get(concept_id)
+
+    def section(self, section_letter: str) -> List[str]:
+        """Returns the ids of all concepts in a section."""
+        self._ensure_loaded()
+        return list(self._by_section.get(section_letter, []))
+
+    def prerequisites(self, concept_id: str) -> List[str]:
+        """Returns the direct prerequisite ids of a concept."""
+        self._ensure_loaded()
+        return list(self._prerequisites.get(concept_id, []))
+
+    def dependents(self, concept_id: str) -> List[str]:
+        """Returns the ids of concepts that list this concept as a prerequisite."""
+        self._ensure_loaded()
+        return list(self._dependents.get(concept_id, []))
+
+    def _mask(self, concept_ids: Iterable[str]) -> int:
+        mask = 0
+        for cid in concept_ids:
+            ordinal = self._ordinals.get(cid)
+            if ordinal is not None:
+                mask |= 1 << ordinal
+        return mask
+
+    def _unmask(self, mask: int) -> List[int]:
+        ordinals = []
+        while mask:
+            low = mask & -mask
+            ordinals.append(low.bit_length() - 1)
+            mask ^= low
+        return ordinals
+
+    def _distances(self, ordinal: int) -> Dict[int, int]:
+        """Breadth-first hop counts from a concept along its prerequisites."""
+        distances = {ordinal: 0}
+        queue = deque([ordinal])
+        while queue:
+            node = queue.popleft()
+            for p in self._prerequisites[self._ids[node]]:
+                o = self._ordinals.get(p)
+                if o is not None and o not in distances:
+                    distances[o] = distances[node] + 1
+                    queue.append(o)
+        return distances
+
+    def ancestors(self, concept_id: str) -> List[str]:
+        """Returns every direct and indirect prerequisite of a concept, in learning order."""
+        return self.learning_path(concept_id, known=(concept_id,))
+
+    def learning_path(self, concept_id: str, known: Iterable[str] = ()) -> List[str]:
+        """Returns the concepts to study before (and including) a target, in learning order.
+
+        Concepts are ordered by the topological rank of their prerequisite
+        component; inside a cycle, concepts further from the target come first.
+
+        Args:
+            concept_id: The target concept
+            known: Concept ids to leave out (e.g. already mastered)
+
+        Returns:
+            Ordered list of concept ids ending with the target, or an empty list if unknown
+        """
+        self._ensure_loaded()
+        ordinal = self._ordinals.get(concept_id)
+        if ordinal is None:
+            return []
+
+        mask = (self._ancestors[ordinal] | (1 << ordinal)) & ~self._mask(known)
+        distances = self._distances(ordinal)
+        ordinals = sorted(
+            self._unmask(mask),
+            key=lambda o: (self._component[o], -distances.get(o, 0), o)
+        )
+        return [self._ids[o] for o in ordinals]
+
+    def frontier(self, known: Iterable[str], within: Optional[Iterable[str]] = None) -> List[str]:
+        """Returns concepts that are not yet known but whose prerequisites all are.
+
+        Prerequisites that sit in the same cycle as a concept are treated as
+        co-requisites and do not block it.
+
+        Args:
+            known: Concept ids the learner has mastered
+            within: Optional ids to restrict the candidates to
+
+        Returns:
+            Learnable concept ids in ordinal order
+        """
+        self._ensure_loaded()
+        known_mask = self._mask(known)
+        candidates = self._mask(within) if within is not None else (1 << len(self._ids)) - 1
+        return [
+            self._ids[o]
+            for o in self._unmask(candidates & ~known_mask)
+            if not self._external[o] & ~known_mask
+        ]
@@ -0,0 +1,286 @@
+import os
+import json
+import fcntl
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from core.metrics import file_io
+
+logger = logging.getLogger(__name__)
+
+Span = Tuple[int, int]  # byte offset and length of one line
+
+class StatusJournal:
+    """Append-only log of per-user concept status changes with periodic snapshots.
+
+    Every status change is appended as one JSON line, so an update costs
+    O(1) regardless of graph size. Once `compact_every` entries have been
+    written, the entries are folded into the snapshot file (one JSON line
+    per user, rewritten via a temporary file and an atomic rename) and the
+    journal is replaced by an empty one.
+
+    Statuses are not kept in memory: the journal only indexes where each
+    user's snapshot line and journal entries are, and `load` reads a user's
+    statuses on demand. Both files are read through descriptors opened when
+    they were indexed, so a compaction that replaces them cannot invalidate
+    the index mid-read.
+
+    Several worker processes may share the files. Appends, compaction and
+    reads of new entries hold an exclusive lock on `{path}.lock`, and each
+    process catches up on entries the others appended (`sync`) before it
+    reads or writes. A compaction by another process is noticed by the
+    journal file's inode changing and the files are indexed again.
+
+    Recovery indexes the snapshot and the journal on top of it. A torn last
+    line left by a crash mid-append is discarded.
+    """
+
+    def __init__(self, path: str, snapshot_path: str, compact_every: int = 500, fsync: bool = True):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.entries = 0
+        self._lock = threading.Lock()
+        self._snapshot: Dict[str, Span] = {}
+        self._journal: Dict[str, List[Span]] = {}
+        self._fd: Optional[int] = None
+        self._read_fd: Optional[int] = None
+        self._snapshot_fd: Optional[int] = None
+        self._lock_fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._loaded = False
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Holds the thread lock and the exclusive inter-process file lock."""
+        with self._lock:
+            if self._lock_fd is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self._inode = os.fstat(self._fd).st_ino
+            if self._read_fd is None:
+                self._read_fd = os.open(self.path, os.O_RDONLY)
+        return self._fd
+
+    def _close(self) -> None:
+        for name in ("_fd", "_read_fd", "_snapshot_fd"):
+            fd = getattr(self, name)
+            if fd is not None:
+                os.close(fd)
+                setattr(self, name, None)
+
+    def _stat(self) -> Optional[os.stat_result]:
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def _read_tail(self) -> Set[str]:
+        """Indexes the complete entries after the read offset; the file lock must be held.
+
+        Returns:
+            IDs of the users whose statuses changed
+        """
+        if self._read_fd is None:
+            return set()
+        size = os.fstat(self._read_fd).st_size
+        raw = os.pread(self._read_fd, max(size - self._offset, 0), self._offset)
+
+        complete = raw[:raw.rfind(b"\n") + 1]
+        if len(complete) != len(raw):
+            # appends hold the lock, so an unterminated line here was left by a crash
+            logger.warning(f"Discarding torn entry at the end of status journal '{self.path}'")
+            os.truncate(self.path, self._offset + len(complete))
+
+        users = set()
+        offset = self._offset
+        for line in complete.splitlines(keepends=True):
+            try:
+                user = json.loads(line)["user"]
+            except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                logger.warning(f"Skipping corrupt entry in status journal '{self.path}'")
+            else:
+                self._journal.setdefault(user, []).append((offset, len(line)))
+                users.add(user)
+                self.entries += 1
+            offset += len(line)
+        self._offset = offset
+        return users
+
+    def _index_snapshot(self) -> None:
+        """Indexes the snapshot file, one line per user."""
+        self._snapshot = {}
+        try:
+            self._snapshot_fd = os.open(self.snapshot_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        offset = 0
+        with os.fdopen(os.dup(self._snapshot_fd), "rb") as f:
+            for line in f:
+                try:
+                    self._snapshot[json.loads(line)["user"]] = (offset, len(line))
+                except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                    logger.error(f"Skipping unreadable line in status snapshot '{self.snapshot_path}'")
+                offset += len(line)
+
+    def _replay(self) -> None:
+        self._close()
+        self._index_snapshot()
+        self._journal = {}
+        self._offset = 0
+        self.entries = 0
+        self._inode = None
+        if self._stat() is not None:
+            self._read_fd = os.open(self.path, os.O_RDONLY)
+            self._inode = os.fstat(self._read_fd).st_ino
+        self._read_tail()
+        self._loaded = True
+
+    def _sync(self) -> Optional[Set[str]]:
+        stat = self._stat()
+        if not self._loaded or (stat.st_ino if stat else None) != self._inode:
+            self._replay()
+            return None
+        return self._read_tail()
+
+    def _load(self, user_id: str) -> Dict[str, str]:
+        statuses: Dict[str, str] = {}
+        span = self._snapshot.get(user_id)
+        if span is not None:
+            statuses.update(json.loads(os.pread(self._snapshot_fd, span[1], span[0]))["statuses"])
+        for offset, length in self._journal.get(user_id, []):
+            record = json.loads(os.pread(self._read_fd, length, offset))
+            statuses[record["id"]] = record["status"]
+        return statuses
+
+    def replay(self) -> None:
+        """Indexes the snapshot and the journal from scratch."""
+        with self._locked():
+            self._replay()
+
+    def sync(self) -> Optional[Set[str]]:
+        """Catches up on entries other processes appended since the last read.
+
+        Checking costs one `stat` call when nothing changed.
+
+        Returns:
+            IDs of the users whose statuses changed, or None if the files
+            were indexed again (first use, or a compaction by another process)
+        """
+        if self._loaded:
+            stat = self._stat()
+            if ((stat.st_ino, stat.st_size) if stat else (None, 0)) == (self._inode, self._offset):
+                return set()
+        with self._locked():
+            return self._sync()
+
+    def load(self, user_id: str) -> Dict[str, str]:
+        """Reads a user's statuses as of the last sync.
+
+        Args:
+            user_id: The learner to read
+
+        Returns:
+            Mapping of concept id to its latest status
+        """
+        with self._lock:
+            if not self._loaded:
+                return {}
+            return self._load(user_id)
+
+    def append(self, user_id: str, concept_id: str, status: str) -> Optional[Set[str]]:
+        """Durably appends a single status change, after catching up on other processes' entries.
+
+        Args:
+            user_id: The learner whose status changed
+            concept_id: The ID of the updated concept
+            status: The new status
+
+        Returns:
+            What `sync` returns for the entries caught up on before appending
+        """
+        line = (json.dumps({"user": user_id, "id": concept_id, "status": status, "ts": time.time()}) + "\n").encode("utf-8")
+        with self._locked():
+            changed = self._sync()
+            fd = self._open()
+            os.write(fd, line)
+            if self.fsync:
+                os.fsync(fd)
+            self._journal.setdefault(user_id, []).append((self._offset, len(line)))
+            self._offset += len(line)
+            self.entries += 1
+        file_io.inc(target="journal", op="append")
+        return changed
+
+    def should_compact(self) -> bool:
+        """Whether the journal has grown past the compaction threshold."""
+        return self.entries >= self.compact_every
+
+    def compact(self) -> None:
+        """Folds the journal into the snapshot and starts an empty journal.
+
+        Entries of other processes are read first, so the snapshot is
+        complete. Only the users with journal entries are decoded; the
+        other snapshot lines are copied as they are. The snapshot is
+        written before the journal is replaced, so a crash at any point
+        leaves a state that replays to the same statuses.
+        """
+        with self._locked():
+            self._sync()
+            changed = {user_id: self._load(user_id) for user_id in self._journal}
+            snapshot: Dict[str, Span] = {}
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                for user_id, (offset, length) in self._snapshot.items():
+                    statuses = changed.pop(user_id, None)
+                    line = os.pread(self._snapshot_fd, length, offset) if statuses is None else self._line(user_id, statuses)
+                    snapshot[user_id] = (f.tell(), len(line))
+                    f.write(line)
+                for user_id, statuses in changed.items():
+                    line = self._line(user_id, statuses)
+                    snapshot[user_id] = (f.tell(), len(line))
+                    f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w"):
+                pass
+            os.replace(tmp_path, self.path)
+            self._close()
+            self._snapshot_fd = os.open(self.snapshot_path, os.O_RDONLY)
+            self._snapshot = snapshot
+            self._journal = {}
+            self._open()
+            self._offset = 0
+            self.entries = 0
+
+        file_io.inc(target="journal", op="compact")
+        logger.info(f"Compacted status journal into '{self.snapshot_path}'")
+
+    @staticmethod
+    def _line(user_id: str, statuses: Dict[str, str]) -> bytes:
+        return (json.dumps({"user": user_id, "statuses": statuses}) + "\n").encode("utf-8")
+
+    def close(self) -> None:
+        """Closes the journal, snapshot and lock file handles."""
+        with self._lock:
+            self._close()
+            self._loaded = False
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
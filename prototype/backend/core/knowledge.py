@@ -0,0 +1,110 @@
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from core.graph import KnowledgeGraph
+from core.journal import StatusJournal
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("", "unlearned", "awareness", "mastery")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+class KnowledgeStates:
+    """Per-user concept statuses over a shared, immutable `KnowledgeGraph`.
+
+    Each active learner gets a `bytearray` with one status code per concept
+    ordinal. Tables are built on first access from the user's statuses in
+    the `StatusJournal` (a new learner starts with every concept unknown),
+    and only the `max_tables` most recently used are kept, so memory grows
+    with active users x concepts in bytes. Every change is appended to the
+    journal. Before serving, the journal is synced, so changes made by
+    other worker processes rebuild the affected tables.
+    """
+
+    def __init__(self, graph: KnowledgeGraph, journal: StatusJournal, max_tables: int = 10000):
+        self.graph = graph
+        self.journal = journal
+        self.max_tables = max_tables
+        self._lock = threading.RLock()
+        # table and version per user; versions come from one counter, so a
+        # rebuilt table never reuses the version of an evicted one
+        self._tables: "OrderedDict[str, Tuple[bytearray, int]]" = OrderedDict()
+        self._counter = itertools.count(1)
+
+    def _invalidate(self, users: Optional[Set[str]]) -> None:
+        """Drops the tables of users whose statuses changed (all tables if `users` is None)."""
+        if users is None:
+            self._tables.clear()
+        for user_id in users or ():
+            self._tables.pop(user_id, None)
+
+    def _entry(self, user_id: str) -> Tuple[bytearray, int]:
+        with self._lock:
+            self._invalidate(self.journal.sync())
+            entry = self._tables.get(user_id)
+            if entry is None:
+                table = bytearray(len(self.graph))
+                for cid, status in self.journal.load(user_id).items():
+                    ordinal = self.graph.ordinal(cid)
+                    if ordinal is not None and status in STATUS_CODES:
+                        table[ordinal] = STATUS_CODES[status]
+                entry = self._tables[user_id] = (table, next(self._counter))
+                while len(self._tables) > self.max_tables:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(user_id)
+            return entry
+
+    def _table(self, user_id: str) -> bytearray:
+        return self._entry(user_id)[0]
+
+    def version(self, user_id: str) -> int:
+        """Returns a token that changes whenever the user's statuses change."""
+        return self._entry(user_id)[1]
+
+    def status(self, user_id: str, concept_id: str) -> str:
+        """Returns the user's status for a concept ('' if unset or unknown)."""
+        ordinal = self.graph.ordinal(concept_id)
+        return "" if ordinal is None else STATUSES[self._table(user_id)[ordinal]]
+
+    def statuses(self, user_id: str) -> Dict[str, str]:
+        """Returns a mapping of concept id to status for concepts with a status."""
+        ids = self.graph.ids
+        return {ids[i]: STATUSES[code] for i, code in enumerate(self._table(user_id)) if code}
+
+    def set_status(self, user_id: str, concept_id: str, new_status: str) -> str:
+        """Updates a user's status for a concept and appends it to the journal.
+
+        Args:
+            user_id: The learner to update
+            concept_id: The ID of the concept to update
+            new_status: The new status value
+
+        Returns:
+            The previous status ('undefined' if none was set)
+
+        Raises:
+            KeyError: If the concept does not exist
+            OSError: If the journal cannot be written
+        """
+        ordinal = self.graph.ordinal(concept_id)
+        if ordinal is None:
+            raise KeyError(concept_id)
+
+        with self._lock:
+            table = self._table(user_id)
+            current_status = STATUSES[table[ordinal]] or "undefined"
+            if current_status == new_status:
+                return current_status
+
+            self._invalidate(self.journal.append(user_id, concept_id, new_status))
+            table = self._table(user_id)
+            table[ordinal] = STATUS_CODES[new_status]
+            self._tables[user_id] = (table, next(self._counter))
+
+            if self.journal.should_compact():
+                self.journal.compact()
+
+            return current_status
@@ -0,0 +1,314 @@
+import json
+import random
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+from pydantic import ConfigDict
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableSequence, ensure_config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError", "TimeoutError", "ConnectionError"}
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a provider error is transient (rate limit, timeout, 5xx, dropped connection)."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in RETRYABLE_STATUS or any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class FairSemaphore:
+    """Concurrency limit that hands free slots to waiting users in turn.
+
+    Waiters queue per user and a released slot goes to the user who has
+    waited longest since their last grant, so a learner with a burst of
+    calls cannot starve the others.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, user: str) -> None:
+        if self.active < self.limit and not self._queues:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # granted while being cancelled: pass the slot on
+            else:
+                queue = self._queues.get(user)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._queues[user]
+            raise
+
+    def release(self) -> None:
+        while self._queues:
+            user, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            if not future.done():
+                future.set_result(None)  # the slot moves to the waiter
+                return
+        self.active -= 1
+
+class RetryBudget:
+    """Token bucket bounding retries to a share of recent requests.
+
+    Every request deposits `ratio` tokens and every retry spends one, so
+    under a provider outage retries add at most `ratio` extra load instead
+    of multiplying it.
+    """
+
+    def __init__(self, ratio: float = 0.2, minimum: float = 10.0):
+        self.ratio = ratio
+        self.capacity = minimum
+        self.tokens = minimum
+
+    def deposit(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class RequestGate:
+    """Shared concurrency, coalescing and retry policy for model API calls.
+
+    Calls are grouped into lanes (one per model). Each lane has a fair
+    concurrency limit; identical requests in flight in the same lane share
+    one call; transient failures are retried with full-jitter exponential
+    backoff (or the provider's Retry-After) while the lane's retry budget
+    lasts.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = 16,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        budget_ratio: float = 0.2
+    ):
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self._lanes: Dict[str, Tuple[Any, FairSemaphore, RetryBudget]] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.calls: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.exhausted: Dict[str, int] = {}
+
+    def _lane(self, lane: str) -> Tuple[FairSemaphore, RetryBudget]:
+        loop = asyncio.get_running_loop()
+        entry = self._lanes.get(lane)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, FairSemaphore(self.limits.get(lane, self.default_limit)), RetryBudget(self.budget_ratio))
+            self._lanes[lane] = entry
+        return entry[1], entry[2]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-lane call, coalescing, retry, budget and queue counters."""
+        lanes = set(self.calls) | set(self._lanes)
+        return {lane: {
+            "calls": self.calls.get(lane, 0),
+            "coalesced": self.coalesced.get(lane, 0),
+            "retries": self.retries.get(lane, 0),
+            "budget_exhausted": self.exhausted.get(lane, 0),
+            "active": self._lanes[lane][1].active if lane in self._lanes else 0,
+            "waiting": self._lanes[lane][1].waiting if lane in self._lanes else 0
+        } for lane in sorted(lanes)}
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        return _retry_after(error) or random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _retrying(self, lane: str, user: str, call: Callable[[], Awaitable[T]]) -> T:
+        semaphore, budget = self._lane(lane)
+        budget.deposit()
+        self.calls[lane] = self.calls.get(lane, 0) + 1
+        attempt = 0
+        while True:
+            await semaphore.acquire(user)
+            try:
+                return await call()
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                if not budget.withdraw():
+                    self.exhausted[lane] = self.exhausted.get(lane, 0) + 1
+                    raise
+                delay = self._backoff(attempt, e)
+                self.retries[lane] = self.retries.get(lane, 0) + 1
+                logger.warning(f"{lane} call failed ({type(e).__name__}); retry {attempt} in {delay:.2f}s")
+            finally:
+                semaphore.release()
+            await asyncio.sleep(delay)
+
+    async def run(self, lane: str, call: Callable[[], Awaitable[T]], user: Optional[str] = None, key: Optional[str] = None) -> T:
+        """Runs a model call under the lane's limits.
+
+        Args:
+            lane: Lane name, usually the model name
+            call: Coroutine function performing the request
+            user: Identity used for fair queueing (defaults to one shared queue)
+            key: Request fingerprint; concurrent calls with the same key share one result
+
+        Returns:
+            The call's result
+        """
+        if key is None:
+            return await self._retrying(lane, user or "", call)
+
+        shared = self._inflight.get((lane, key))
+        if shared is not None and shared.get_loop() is asyncio.get_running_loop():
+            self.coalesced[lane] = self.coalesced.get(lane, 0) + 1
+            return await asyncio.shield(shared)
+
+        future = asyncio.ensure_future(self._retrying(lane, user or "", call))
+        self._inflight[(lane, key)] = future
+        future.add_done_callback(lambda _: self._inflight.pop((lane, key), None))
+        return await asyncio.shield(future)
+
+    async def stream(self, lane: str, start: Callable[[], AsyncIterator[T]], user: Optional[str] = None) -> AsyncIterator[T]:
+        """Streams a model call under the lane's limits.
+
+        A failure is retried only before the first chunk; streams are never coalesced.
+        """
+        semaphore, budget = self._lane(lane)
+        budget.deposit()
+        self.calls[lane] = self.calls.get(lane, 0) + 1
+        attempt = 0
+        while True:
+            started = False
+            await semaphore.acquire(user or "")
+            try:
+                async for chunk in start():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                attempt += 1
+                if started or not is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                if not budget.withdraw():
+                    self.exhausted[lane] = self.exhausted.get(lane, 0) + 1
+                    raise
+                delay = self._backoff(attempt, e)
+                self.retries[lane] = self.retries.get(lane, 0) + 1
+                logger.warning(f"{lane} stream failed ({type(e).__name__}); retry {attempt} in {delay:.2f}s")
+            finally:
+                semaphore.release()
+            await asyncio.sleep(delay)
+
+def current_user() -> Optional[str]:
+    """The learner of the runnable currently executing, from its config."""
+    configurable = ensure_config().get("configurable", {})
+    return configurable.get("user_id") or configurable.get("thread_id")
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of a request's messages and parameters, used as a coalescing key."""
+    return hashlib.sha256(json.dumps(parts, default=str, sort_keys=True).encode("utf-8")).hexdigest()
+
+class GuardedChatModel(BaseChatModel):
+    """Chat model that sends every request of the wrapped model through a `RequestGate`.
+
+    Tool binding and structured output are delegated to the wrapped model,
+    so provider-specific request formats are kept, and the resulting
+    bindings are re-pointed at this wrapper. Callbacks, tracing metadata and
+    streaming decisions follow the wrapped model.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: BaseChatModel
+    gate: RequestGate
+    lane: str = "chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any) -> Any:
+        return self.model._get_ls_params(stop=stop, **kwargs)
+
+    def _should_stream(self, *, async_api: bool, run_manager: Any = None, **kwargs: Any) -> bool:
+        return self.model._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = fingerprint([m.model_dump() for m in messages], stop, kwargs)
+        result = await self.gate.run(
+            self.lane,
+            lambda: self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            user=current_user(),
+            key=key
+        )
+        return result.model_copy(deep=True)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in self.gate.stream(
+            self.lane,
+            lambda: self.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs),
+            user=current_user()
+        ):
+            yield chunk
+
+    def _rebind(self, runnable: Any) -> Any:
+        """Re-points a binding (or the head of a sequence) of the wrapped model at this wrapper."""
+        if isinstance(runnable, BaseChatModel):
+            return self.model_copy(update={"model": runnable})
+        if isinstance(runnable, RunnableBinding) and runnable.bound is self.model:
+            return RunnableBinding(bound=self, kwargs=runnable.kwargs, config=runnable.config)
+        if isinstance(runnable, RunnableSequence):
+            head = self._rebind(runnable.first)
+            if head is not runnable.first:
+                return RunnableSequence(head, *runnable.middle, runnable.last)
+        return runnable
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Runnable:
+        return self._rebind(self.model.bind_tools(tools, **kwargs))
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        return self._rebind(self.model.with_structured_output(schema, **kwargs))
@@ -0,0 +1,287 @@
+import json
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.store.base import BaseStore
+
+logger = logging.getLogger(__name__)
+
+TOOL_ERROR_PREFIXES = ("error", "configuration error", "an error occurred")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter with labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % format(bound, "g")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative:g}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative:g}")
+        return lines
+
+class Registry:
+    """Holds metrics and collector callbacks and renders them for `/metrics`.
+
+    Collectors expose counters that other components already keep (cache
+    hit/miss tallies, decision paths) as `(name, help, labels, value)`
+    samples at scrape time, so those components need no metrics code.
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, collect: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]) -> None:
+        """Registers a callback yielding (name, help, labels, value) counter samples."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        samples: Dict[str, Tuple[str, List[str]]] = {}
+        for collect in self._collectors:
+            try:
+                for name, help, labels, value in collect():
+                    names = sorted(labels)
+                    samples.setdefault(name, (help, []))[1].append(
+                        f"{name}{_labels(names, [labels[n] for n in names])} {value:g}"
+                    )
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        for name, (help, values) in samples.items():
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} counter", *values])
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+node_seconds = registry.histogram("agent_node_seconds", "Wall time of graph node runs.", ("graph", "node", "outcome"))
+tool_seconds = registry.histogram("agent_tool_seconds", "Wall time of tool calls.", ("tool", "outcome"))
+llm_seconds = registry.histogram("llm_call_seconds", "Wall time of chat model calls.", ("model",))
+llm_tokens = registry.counter("llm_tokens_total", "Chat model tokens.", ("model", "kind"))
+llm_cost = registry.counter("llm_cost_usd_total", "Estimated chat model cost from LLM_PRICES.", ("model",))
+store_ops = registry.counter("store_operations_total", "Long-term store operations.", ("op",))
+file_io = registry.counter("file_io_total", "Writes to local state files.", ("target", "op"))
+
+class CountingStore(BaseStore):
+    """Store proxy counting every operation sent through `batch`/`abatch`.
+
+    All `BaseStore` methods are built on those two calls, so wrapping them
+    covers gets, puts, searches and namespace listings alike. Backend-specific
+    attributes are delegated to the wrapped store.
+    """
+
+    def __init__(self, store: BaseStore):
+        self.store = store
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+    def batch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        for op in ops:
+            store_ops.inc(op=type(op).__name__)
+        return self.store.batch(ops)
+
+    async def abatch(self, ops: Iterable[Any]) -> List[Any]:
+        ops = list(ops)
+        for op in ops:
+            store_ops.inc(op=type(op).__name__)
+        return await self.store.abatch(ops)
+
+def instrument_store(store: BaseStore) -> CountingStore:
+    """Wraps a store so its operations show up in `store_operations_total`."""
+    return CountingStore(store)
+
+class TraceSink:
+    """Appends one JSON line per recorded node, tool and LLM run.
+
+    The file is opened on the first event and kept open (line-buffered)
+    until `close`.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, event: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+    def close(self) -> None:
+        """Closes the trace file; a later event reopens it."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class MetricsCallback(BaseCallbackHandler):
+    """Callback handler feeding node, tool and LLM runs into the metrics registry.
+
+    Node runs are recognized by LangGraph's `langgraph_node` metadata; the
+    graph label is the parent session node for subgraph runs ("main" for
+    the root graph). Token usage is read from the model's usage metadata.
+    The handlers only do in-memory bookkeeping, so they run inline on the
+    event loop instead of being dispatched to the default executor.
+    """
+
+    run_inline = True
+
+    def __init__(self, prices: Optional[Dict[str, Sequence[float]]] = None, sink: Optional[TraceSink] = None):
+        self.prices = prices or {}
+        self.sink = sink or TraceSink(None)
+        self._runs: Dict[UUID, Tuple[str, Dict[str, str], float]] = {}
+
+    def _finish(self, run_id: UUID, outcome: str, **extra: Any) -> Optional[Tuple[str, Dict[str, str], float]]:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        kind, labels, started = run
+        elapsed = time.perf_counter() - started
+        self.sink.write({"ts": time.time(), "type": kind, **labels, "outcome": outcome, "seconds": round(elapsed, 6), **extra})
+        return kind, labels, elapsed
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            namespace = metadata.get("langgraph_checkpoint_ns", "")
+            graph = namespace.split(":")[0] if "|" in namespace else "main"
+            labels = {"graph": graph, "node": node, "thread_id": str(metadata.get("thread_id", ""))}
+            self._runs[run_id] = ("node", labels, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record_node(run_id, "ok")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record_node(run_id, "interrupt" if type(error).__name__ == "GraphInterrupt" else "error")
+
+    def _record_node(self, run_id: UUID, outcome: str) -> None:
+        finished = self._finish(run_id, outcome)
+        if finished:
+            _, labels, elapsed = finished
+            node_seconds.observe(elapsed, graph=labels["graph"], node=labels["node"], outcome=outcome)
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        labels = {"tool": name, "thread_id": str((metadata or {}).get("thread_id", ""))}
+        self._runs[run_id] = ("tool", labels, time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        content = getattr(output, "content", output)
+        failed = isinstance(content, str) and content.lower().startswith(TOOL_ERROR_PREFIXES)
+        self._record_tool(run_id, "error" if failed else "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record_tool(run_id, "error")
+
+    def _record_tool(self, run_id: UUID, outcome: str) -> None:
+        finished = self._finish(run_id, outcome)
+        if finished:
+            _, labels, elapsed = finished
+            tool_seconds.observe(elapsed, tool=labels["tool"], outcome=outcome)
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or params.get("model_name") or params.get("model") or params.get("_type") or "unknown"
+        labels = {"model": model, "thread_id": str(metadata.get("thread_id", ""))}
+        self._runs[run_id] = ("llm", labels, time.perf_counter())
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        prompt = completion = 0
+        for generations in getattr(response, "generations", []):
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+
+        finished = self._finish(run_id, "ok", prompt_tokens=prompt, completion_tokens=completion)
+        if finished:
+            _, labels, elapsed = finished
+            model = labels["model"]
+            llm_seconds.observe(elapsed, model=model)
+            llm_tokens.inc(prompt, model=model, kind="prompt")
+            llm_tokens.inc(completion, model=model, kind="completion")
+            if model in self.prices:
+                prompt_price, completion_price = self.prices[model]
+                llm_cost.inc((prompt * prompt_price + completion * completion_price) / 1000, model=model)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        finished = self._finish(run_id, "error")
+        if finished:
+            llm_seconds.observe(finished[2], model=finished[1]["model"])
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from langgraph.store.base import BaseStore, PutOp
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BACKENDS = frozenset({"memory", "sqlite", "postgres"})
+
+# the saver and the store use separate connections to one file: let readers
+# run alongside the writer and make writers wait for the lock instead of failing
+_SQLITE_PRAGMAS = ["PRAGMA journal_mode=WAL", "PRAGMA busy_timeout=5000"]
+
+_SQLITE_PRUNE = [
+    """DELETE FROM writes WHERE thread_id = ? AND (checkpoint_ns, checkpoint_id) IN (
+        SELECT checkpoint_ns, checkpoint_id FROM (
+            SELECT checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+                PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints WHERE thread_id = ?) WHERE rn > ?)""",
+    """DELETE FROM checkpoints WHERE thread_id = ? AND (checkpoint_ns, checkpoint_id) IN (
+        SELECT checkpoint_ns, checkpoint_id FROM (
+            SELECT checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+                PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints WHERE thread_id = ?) WHERE rn > ?)""",
+]
+
+_POSTGRES_PRUNE = [
+    """DELETE FROM checkpoint_writes WHERE thread_id = %(thread_id)s AND (checkpoint_ns, checkpoint_id) IN (
+        SELECT checkpoint_ns, checkpoint_id FROM (
+            SELECT checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+                PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints WHERE thread_id = %(thread_id)s) ranked WHERE rn > %(keep)s)""",
+    """DELETE FROM checkpoints WHERE thread_id = %(thread_id)s AND (checkpoint_ns, checkpoint_id) IN (
+        SELECT checkpoint_ns, checkpoint_id FROM (
+            SELECT checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+                PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints WHERE thread_id = %(thread_id)s) ranked WHERE rn > %(keep)s)""",
+    """DELETE FROM checkpoint_blobs b WHERE b.thread_id = %(thread_id)s AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+          AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version)""",
+]
+
+class Backends:
+    """Checkpointer and store pair for one persistence backend.
+
+    Durable backends hold connections that must be opened inside the running
+    event loop; `open` and `close` are called from the app lifespan.
+    """
+
+    def __init__(self, kind: str, checkpointer: BaseCheckpointSaver, store: BaseStore, resources: Optional[List[Any]] = None):
+        self.kind = kind
+        self.checkpointer = checkpointer
+        self.store = store
+        self._resources = resources or []
+
+    async def open(self) -> None:
+        """Opens connections and creates the backend tables if needed.
+
+        If any step fails, the connections opened so far are closed again
+        (their worker threads would otherwise keep the process alive) and
+        the error is raised.
+        """
+        if self.kind == "memory":
+            return
+        try:
+            for resource in self._resources:
+                if self.kind == "postgres":
+                    await resource.open()
+                else:
+                    await resource
+                    for pragma in _SQLITE_PRAGMAS:
+                        await resource.execute(pragma)
+            await self.checkpointer.setup()
+            await self.store.setup()
+        except Exception:
+            logger.error(f"Could not open the {self.kind} persistence backend")
+            await self.close()
+            raise
+        logger.info(f"Opened {self.kind} persistence backend")
+
+    async def close(self) -> None:
+        """Closes every connection held by the backend."""
+        for resource in self._resources:
+            try:
+                await resource.close()
+            except Exception as e:
+                logger.warning(f"Error closing {self.kind} connection: {e}")
+
+def build_backends(kind: str, url: Optional[str], index: Optional[Dict[str, Any]] = None, pool_size: int = 10) -> Backends:
+    """Creates the checkpointer and store for a persistence backend.
+
+    Args:
+        kind: One of "memory", "sqlite" or "postgres"
+        url: SQLite file path or Postgres connection string (unused for "memory")
+        index: Store embedding index configuration
+        pool_size: Maximum Postgres pool connections
+
+    Returns:
+        Backends instance; durable backends still need `open()`
+
+    Raises:
+        ValueError: If the backend is unknown or its URL is missing
+    """
+    if kind not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Invalid persistence backend: '{kind}'. Valid backends are: {', '.join(sorted(SUPPORTED_BACKENDS))}.")
+
+    if kind == "memory":
+        from langgraph.store.memory import InMemoryStore
+        from langgraph.checkpoint.memory import MemorySaver
+        return Backends(kind, MemorySaver(), InMemoryStore(index=index))
+
+    if not url:
+        raise ValueError(f"DATABASE_URL is required for the '{kind}' persistence backend.")
+
+    if kind == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        from langgraph.store.sqlite.aio import AsyncSqliteStore
+
+        checkpoint_conn = aiosqlite.connect(url)
+        store_conn = aiosqlite.connect(url, isolation_level=None)  # the store issues its own BEGIN/COMMIT
+        return Backends(
+            kind,
+            AsyncSqliteSaver(checkpoint_conn),
+            AsyncSqliteStore(store_conn, index=index),
+            [checkpoint_conn, store_conn]
+        )
+
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from langgraph.store.postgres.aio import AsyncPostgresStore
+
+    pool = AsyncConnectionPool(
+        conninfo=url,
+        max_size=pool_size,
+        open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}
+    )
+    return Backends(kind, AsyncPostgresSaver(pool), AsyncPostgresStore(pool, index=index), [pool])
+
+class StoreWriteBatcher:
+    """Coalesces concurrent store writes into one `abatch` call.
+
+    Writes issued within `delay` seconds of each other (e.g. parallel
+    `store_memory` tool calls of one agent turn) are sent together, so an
+    indexed store embeds all their texts in a single embedding request.
+    Of several writes to the same item in one batch, the last one wins.
+    """
+
+    def __init__(self, store: BaseStore, delay: float = 0.01, max_batch: int = 64):
+        self.store = store
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending: List[Tuple[PutOp, asyncio.Future]] = []
+        self._sending: List[PutOp] = []
+        self._flush: Optional[asyncio.Task] = None
+
+    def pending(self, namespace: tuple) -> List[PutOp]:
+        """Writes to a namespace that are queued or being sent, i.e. not yet readable from the store."""
+        return [op for op in self._sending + [op for op, _ in self._pending] if op.namespace == namespace]
+
+    def enqueue(self, namespace: tuple, key: str, value: Dict[str, Any], index: Any = None) -> asyncio.Future:
+        """Queues a write without waiting for it.
+
+        Args:
+            namespace: Item namespace
+            key: Item key
+            value: Item value
+            index: Fields to embed, False to skip embedding, or None for the store default
+
+        Returns:
+            Future resolved when the write's batch has been stored (or failed)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((PutOp(namespace, key, value, index), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush = asyncio.create_task(self._write())
+        elif self._flush is None or self._flush.done():
+            self._flush = asyncio.create_task(self._write(self.delay))
+        return future
+
+    async def put(self, namespace: tuple, key: str, value: Dict[str, Any], index: Any = None) -> None:
+        """Queues a write and waits until its batch has been stored.
+
+        Raises:
+            Exception: Whatever the store raised for the batch
+        """
+        await self.enqueue(namespace, key, value, index)
+
+    async def _write(self, delay: float = 0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        ops = list({(op.namespace, op.key): op for op, _ in batch}.values())
+        self._sending.extend(ops)
+        try:
+            await self.store.abatch(ops)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            sent = {id(op) for op in ops}
+            self._sending = [op for op in self._sending if id(op) not in sent]
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+def _prune_memory(checkpointer: BaseCheckpointSaver, thread_id: str, keep: int) -> None:
+    """Prunes an in-memory saver, then drops the channel blobs no remaining checkpoint references."""
+    storage = checkpointer.storage.get(thread_id, {})
+    pruned = False
+    for ns, checkpoints in storage.items():
+        for checkpoint_id in sorted(checkpoints, reverse=True)[keep:]:
+            del checkpoints[checkpoint_id]
+            checkpointer.writes.pop((thread_id, ns, checkpoint_id), None)
+            pruned = True
+    if not pruned:
+        return
+
+    referenced = set()
+    for ns, checkpoints in storage.items():
+        for checkpoint, _, _ in checkpoints.values():
+            versions = checkpointer.serde.loads_typed(checkpoint)["channel_versions"]
+            referenced.update((thread_id, ns, channel, version) for channel, version in versions.items())
+    for key in [k for k in checkpointer.blobs if k[0] == thread_id and k not in referenced]:
+        del checkpointer.blobs[key]
+
+async def prune_checkpoints(checkpointer: BaseCheckpointSaver, thread_id: str, keep: int) -> None:
+    """Deletes all but the newest checkpoints of a thread, per checkpoint namespace.
+
+    Args:
+        checkpointer: Checkpoint saver to prune
+        thread_id: The conversation thread
+        keep: Number of checkpoints to keep in each namespace (root graph and subgraphs)
+    """
+    if keep <= 0:
+        return
+
+    name = type(checkpointer).__name__
+    if name in ("InMemorySaver", "MemorySaver"):
+        _prune_memory(checkpointer, thread_id, keep)
+    elif name == "AsyncSqliteSaver":
+        async with checkpointer.lock:
+            for statement in _SQLITE_PRUNE:
+                await checkpointer.conn.execute(statement, (thread_id, thread_id, keep))
+            await checkpointer.conn.commit()
+    elif name == "AsyncPostgresSaver":
+        async with checkpointer.conn.connection() as conn:
+            for statement in _POSTGRES_PRUNE:
+                await conn.execute(statement, {"thread_id": thread_id, "keep": keep})
+    else:
+        logger.warning(f"Checkpoint pruning is not supported for {name}")
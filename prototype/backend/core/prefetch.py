@@ -0,0 +1,98 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """Speculative generation of the next item of a session.
+
+    While a learner reads the current learning object (or answers the
+    current question) the subgraph is suspended on an interrupt. A node can
+    `schedule` the item it expects to produce next as an asyncio task; on
+    resume it calls `take` with the item it actually needs and gets the
+    prefetched result only if the expectation still holds. Each thread keeps
+    at most one pending prefetch per kind. Prefetches of abandoned threads
+    are dropped after `ttl` seconds, and at most `max_entries` are kept
+    overall, evicting the oldest first.
+    """
+
+    def __init__(self, ttl: float = 1800, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pending: "OrderedDict[Tuple[str, str], Tuple[str, asyncio.Task, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _evict(self) -> None:
+        """Drops expired prefetches, then the oldest ones beyond `max_entries`."""
+        cutoff = time.monotonic() - self.ttl
+        while self._pending:
+            pending, (_, task, created) = next(iter(self._pending.items()))
+            if created >= cutoff and len(self._pending) <= self.max_entries:
+                break
+            del self._pending[pending]
+            self._cancel(task)
+            self.evicted += 1
+
+    def schedule(self, thread_id: str, kind: str, key: str, factory: Callable[[], Awaitable[Any]]) -> None:
+        """Starts generating an item in the background, replacing any earlier prefetch.
+
+        Args:
+            thread_id: The conversation thread
+            kind: Item kind (e.g. "learning_object", "evaluation_object")
+            key: Identity of the expected item (e.g. the serialized plan step)
+            factory: Coroutine function producing the item
+        """
+        self.discard(thread_id, kind)
+        self._pending[(thread_id, kind)] = (key, asyncio.create_task(factory()), time.monotonic())
+        self._evict()
+
+    async def take(self, thread_id: str, kind: str, key: str) -> Optional[Any]:
+        """Returns the prefetched item if it was generated for the same key.
+
+        Args:
+            thread_id: The conversation thread
+            kind: Item kind
+            key: Identity of the item that is needed now
+
+        Returns:
+            The prefetched item, or None on a mismatch or failed prefetch
+        """
+        self._evict()
+        entry = self._pending.pop((thread_id, kind), None)
+        if entry is None:
+            return None
+
+        expected, task, _ = entry
+        if expected != key or task.get_loop() is not asyncio.get_running_loop():
+            self._cancel(task)
+            self.misses += 1
+            return None
+
+        try:
+            result = await task
+        except Exception as e:
+            logger.warning(f"Prefetch of {kind} for thread '{thread_id}' failed: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def discard(self, thread_id: str, kind: Optional[str] = None) -> None:
+        """Cancels pending prefetches of a thread (of one kind, or all)."""
+        for pending in [k for k in self._pending if k[0] == thread_id and kind in (None, k[1])]:
+            _, task, _ = self._pending.pop(pending)
+            self._cancel(task)
+
+    @staticmethod
+    def _cancel(task: asyncio.Task) -> None:
+        try:
+            task.cancel()
+        except RuntimeError:
+            pass  # the task's event loop is already closed
+
+prefetcher = Prefetcher()
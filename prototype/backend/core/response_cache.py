@@ -0,0 +1,280 @@
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple, Type
+import numpy as np
+from pydantic import BaseModel
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+from core.metrics import file_io
+
+logger = logging.getLogger(__name__)
+
+CONCEPT_ID_REFERENCE = re.compile(r'\b[A-Z]\.\d+\b')
+
+def _prompt_text(inputs: Any) -> str:
+    """Flattens chain inputs into the text that determines the response."""
+    if isinstance(inputs, dict) and "messages" in inputs:
+        parts = []
+        for message in inputs["messages"]:
+            content = message[1] if isinstance(message, tuple) else getattr(message, "content", message)
+            parts.append(str(content))
+        return "\n".join(parts)
+    if isinstance(inputs, dict):
+        return json.dumps(inputs, sort_keys=True, default=str)
+    return str(inputs)
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def _unit(vector: Any) -> np.ndarray:
+    """Returns a vector as float32 scaled to unit length, so cosine similarity is a dot product."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class _Entry:
+    __slots__ = ("namespace", "concepts", "created", "payload", "vector")
+
+    def __init__(self, namespace: str, concepts: str, created: float, payload: str, vector: Optional[np.ndarray]):
+        self.namespace = namespace
+        self.concepts = concepts
+        self.created = created
+        self.payload = payload
+        self.vector = vector
+
+class ResponseCache:
+    """LRU/TTL cache for structured LLM outputs, optionally persisted to SQLite.
+
+    Entries are keyed on the chain name, the normalized prompt and the concept
+    ids referenced in it. When an embedding model and a similarity threshold
+    are configured, an exact miss falls back to the most similar cached
+    prompt of the same chain that references exactly the same concepts.
+    Chains whose prompts are personalized are wrapped with the learner in
+    their namespace, so a similar prompt of another learner never matches.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+        embeddings: Any = None,
+        similarity: float = 0.0
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+        self.similarity = similarity
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._expired: List[str] = []
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._loaded = False
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.path and self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, namespace TEXT, concepts TEXT, created REAL, payload TEXT, vector BLOB)"
+            )
+        return self._db
+
+    def _load(self) -> None:
+        """Reads persisted entries, oldest first, dropping expired ones."""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            db = self._connect()
+            if db is None:
+                return
+            cutoff = time.time() - self.ttl
+            db.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+            rows = db.execute(
+                "SELECT key, namespace, concepts, created, payload, vector FROM responses ORDER BY created"
+            ).fetchall()
+            for key, namespace, concepts, created, payload, vector in rows[-self.max_entries:]:
+                self._entries[key] = _Entry(namespace, concepts, created, payload, _unit(np.frombuffer(vector, dtype=np.float32)) if vector else None)
+            db.commit()
+            logger.info(f"Loaded {len(self._entries)} cached responses from {self.path}")
+
+    @staticmethod
+    def key(namespace: str, prompt: str) -> Tuple[str, str]:
+        """Computes the cache key and the sorted concept ids for a prompt.
+
+        Args:
+            namespace: Chain name
+            prompt: Raw prompt text
+
+        Returns:
+            Tuple of (key, comma-separated concept ids)
+        """
+        concepts = ",".join(sorted(set(CONCEPT_ID_REFERENCE.findall(prompt))))
+        digest = hashlib.sha256(f"{namespace}\x00{concepts}\x00{_normalize(prompt)}".encode("utf-8")).hexdigest()
+        return digest, concepts
+
+    def _fresh(self, entry: _Entry) -> bool:
+        return time.time() - entry.created < self.ttl
+
+    def _remove(self, keys: List[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+        db = self._connect()
+        if db is not None and keys:
+            db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in keys])
+            db.commit()
+            file_io.inc(target="response_cache", op="delete")
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        """Returns a fresh entry; an expired one is dropped from memory and queued for `_purge`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._fresh(entry):
+                del self._entries[key]
+                self._expired.append(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _purge(self) -> None:
+        """Deletes the persisted copies of expired entries; blocking, so run in a thread."""
+        with self._lock:
+            expired, self._expired = self._expired, []
+            self._remove(expired)
+
+    def _nearest(self, namespace: str, concepts: str, vector: np.ndarray) -> Optional[str]:
+        """Returns the key of the most similar fresh prompt with the same namespace and concepts."""
+        with self._lock:
+            candidates = [
+                (key, entry.vector) for key, entry in self._entries.items()
+                if entry.namespace == namespace and entry.concepts == concepts
+                and entry.vector is not None and self._fresh(entry)
+            ]
+        if not candidates:
+            return None
+        scores = np.stack([candidate for _, candidate in candidates]) @ vector
+        best = int(np.argmax(scores))
+        return candidates[best][0] if scores[best] >= self.similarity else None
+
+    async def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        if not self.embeddings or self.similarity <= 0:
+            return None
+        try:
+            return _unit(await self.embeddings.aembed_query(_normalize(prompt)))
+        except Exception as e:
+            logger.warning(f"Response cache embedding failed: {e}")
+            return None
+
+    async def aget(self, namespace: str, schema: Type[BaseModel], prompt: str) -> Tuple[Optional[BaseModel], Optional[np.ndarray]]:
+        """Looks up a cached response.
+
+        Args:
+            namespace: Chain name
+            schema: Pydantic model the response is parsed into
+            prompt: Raw prompt text
+
+        Returns:
+            Tuple of (cached response or None, prompt embedding if one was computed)
+        """
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+
+        key, concepts = self.key(namespace, prompt)
+        entry = self._lookup(key)
+        vector = None
+
+        if entry is None:
+            vector = await self._embed(prompt)
+            nearest = self._nearest(namespace, concepts, vector) if vector is not None else None
+            entry = self._lookup(nearest) if nearest else None
+
+        if self._expired:
+            await asyncio.to_thread(self._purge)
+
+        if entry is None:
+            self.misses += 1
+            return None, vector
+
+        self.hits += 1
+        return schema.model_validate_json(entry.payload), vector
+
+    async def aset(self, namespace: str, prompt: str, value: BaseModel, vector: Optional[np.ndarray] = None) -> None:
+        """Stores a response, evicting the least recently used entries beyond capacity.
+
+        Args:
+            namespace: Chain name
+            prompt: Raw prompt text
+            value: Structured response
+            vector: Prompt embedding from `aget`, if any
+        """
+        key, concepts = self.key(namespace, prompt)
+        entry = _Entry(namespace, concepts, time.time(), value.model_dump_json(), vector)
+
+        def write() -> None:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                overflow = list(self._entries)[:max(0, len(self._entries) - self.max_entries)]
+                self._remove(overflow)
+                db = self._connect()
+                if db is not None:
+                    db.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, namespace, concepts, entry.created, entry.payload, vector.tobytes() if vector is not None else None)
+                    )
+                    db.commit()
+                    file_io.inc(target="response_cache", op="write")
+
+        await asyncio.to_thread(write)
+
+    def wrap(self, namespace: str, runnable: Runnable, schema: Type[BaseModel], personalized: bool = False) -> "CachedRunnable":
+        """Puts the cache in front of a structured-output chain.
+
+        Args:
+            namespace: Chain name
+            runnable: The structured-output chain
+            schema: Pydantic model the chain returns
+            personalized: Whether prompts carry learner data; entries are then kept per learner
+        """
+        return CachedRunnable(self, namespace, runnable, schema, personalized)
+
+class CachedRunnable(Runnable):
+    """Runnable serving a structured-output chain through a `ResponseCache`."""
+
+    def __init__(self, cache: ResponseCache, namespace: str, runnable: Runnable, schema: Type[BaseModel], personalized: bool = False):
+        self.cache = cache
+        self.namespace = namespace
+        self.runnable = runnable
+        self.schema = schema
+        self.personalized = personalized
+
+    def _namespace(self, config: Optional[RunnableConfig]) -> str:
+        """The chain name, plus the current learner for personalized chains."""
+        user_id = ensure_config(config).get("configurable", {}).get("user_id") if self.personalized else None
+        return f"{self.namespace}:{user_id}" if user_id else self.namespace
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.runnable.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        prompt, namespace = _prompt_text(input), self._namespace(config)
+        cached, vector = await self.cache.aget(namespace, self.schema, prompt)
+        if cached is not None:
+            return cached
+
+        result = await self.runnable.ainvoke(input, config, **kwargs)
+        if isinstance(result, BaseModel):
+            await self.cache.aset(namespace, prompt, result, vector)
+        return result
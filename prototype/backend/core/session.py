@@ -0,0 +1,57 @@
+import re
+from typing import Dict, Any, Optional
+from fastapi import Cookie, Header, HTTPException, Query
+from core.config import CONFIG
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.:@-]{1,128}$')
+
+def build_config(user_id: Optional[str] = None, thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """Builds a graph configuration for one learner and conversation thread.
+
+    Args:
+        user_id: The learner's ID; falls back to the configured USER_ID
+        thread_id: The conversation thread; falls back to the user's ID, or THREAD if neither is given
+
+    Returns:
+        Configuration dictionary in the shape of `CONFIG`
+
+    Raises:
+        ValueError: If an ID contains unsupported characters
+    """
+    defaults = CONFIG["configurable"]
+    if user_id is None:
+        user_id, thread_id = defaults["user_id"], thread_id or defaults["thread_id"]
+    thread_id = thread_id or user_id
+
+    for name, value in (("user_id", user_id), ("thread_id", thread_id)):
+        if value is not None and not SESSION_ID_PATTERN.match(value):
+            raise ValueError(f"Invalid {name}: '{value}'.")
+
+    return {'configurable': {**defaults, 'thread_id': thread_id, 'user_id': user_id}, 'callbacks': list(CONFIG['callbacks'])}
+
+def session_config(
+    user_id: Optional[str] = Query(None, description="Learner ID"),
+    thread_id: Optional[str] = Query(None, description="Conversation thread ID"),
+    x_user_id: Optional[str] = Header(None),
+    x_thread_id: Optional[str] = Header(None),
+    user_cookie: Optional[str] = Cookie(None, alias="user_id"),
+    thread_cookie: Optional[str] = Cookie(None, alias="thread_id"),
+) -> Dict[str, Any]:
+    """FastAPI dependency resolving the session identity of a request.
+
+    The `X-User-Id`/`X-Thread-Id` headers take precedence over the `user_id`/`thread_id`
+    cookies, which take precedence over query parameters.
+
+    Returns:
+        Configuration dictionary for the request's learner and thread
+
+    Raises:
+        HTTPException: If an ID contains unsupported characters
+    """
+    try:
+        return build_config(
+            x_user_id or user_cookie or user_id,
+            x_thread_id or thread_cookie or thread_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,8 +1,41 @@
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware 
-from routers import chat, plan, profile
+import core.config as cfg
+import services.orchestration as orchestration
+from core.config import ARTIFACTS_WARMUP
+from services.artifacts import build_artifacts
+from routers import chat, plan, profile, dashboard, metrics
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+def startup() -> None:
+    """Builds the shared components and compiles the graphs before the first request."""
+    start = time.perf_counter()
+    cfg.initialize()
+    orchestration.build()
+    logger.info(f"Initialized models, stores and graphs in {time.perf_counter() - start:.2f}s")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initializes the app and opens the persistence backend on startup, and closes it on shutdown.
+
+    With ARTIFACTS_WARMUP set, missing concept artifacts are generated in the
+    background while the app already serves requests.
+    """
+    startup()
+    await cfg.backends.open()
+    warmup = asyncio.create_task(build_artifacts()) if ARTIFACTS_WARMUP and cfg.artifacts.directory else None
+    yield
+    if warmup:
+        warmup.cancel()
+    await cfg.backends.close()
+    cfg.metrics.sink.close()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:3000"]
 
@@ -16,4 +49,6 @@ app.add_middleware(
 
 app.include_router(chat.router)
 app.include_router(plan.router)
-app.include_router(profile.router)
\ No newline at end of file
+app.include_router(profile.router)
+app.include_router(dashboard.router)
+app.include_router(metrics.router)
\ No newline at end of file
@@ -5,9 +5,9 @@ Use available tools proactively to enhance the user experience.
 
 **Tools:**
 - Profile: `store_profile` (add data), `retrieve_profile` (get data), `delete_profile` (remove entry)
-- Knowledge: `retrieve_sections` (get concepts by section), `retrieve_concept` (get concept details), `get_prerequisites` (find dependencies)
+- Knowledge: `search_concepts` (find concepts matching a free-text question), `retrieve_sections` (get concepts by section), `retrieve_concept` (concept summary; `include_content` for the full text), `get_prerequisites` (find dependencies), `plan_learning_path` (full prerequisite route and next learnable concepts in one call)
 - Tracking: `update_concept_status` (set mastery/unlearned/awareness status)
-- Sessions: `LearningSession(input)` (teach topic), `AssessmentSession(input)` (evaluate understanding)
+- Sessions: `LearningSession(input)` (teach topic), `AssessmentSession(input)` (evaluate understanding), `get_lesson` (full text of a lesson by the ID a learning session returned)
 """
 
 knowledge_space = """
@@ -47,4 +47,15 @@ guidelines = """
 Keep dialogue engaging and informative. Format math properly ($$...$$) for React-based display.
 Always retrieve concept data before recommending specific topics.
 Ask for name, goals and other profile details if not provided.
+"""
+
+summarizer_ = """
+Condense the conversation between a learner and a Machine Learning tutor into a short summary (max 200 words).
+Keep the learner's goals, preferences, concepts covered, statuses changed and open questions. Drop greetings and raw tool output.
+
+Summary so far:
+{summary}
+
+New conversation turns:
+{transcript}
 """
\ No newline at end of file
@@ -21,4 +21,13 @@ Completed Step: {past_steps}
 Take one action:
 a. If both plan steps are completed: Provide a succinct conclusion summarizing key points
 b. Otherwise: Return only the remaining step (do not repeat completed steps)
+"""
+
+concluder_ = """
+You are a Learning Experience Designer for Machine Learning.
+
+Topic: {input}
+Completed Steps: {past_steps}
+
+All plan steps are completed. Provide a succinct conclusion summarizing key points.
 """
\ No newline at end of file
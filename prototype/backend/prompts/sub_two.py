@@ -22,4 +22,15 @@ Completed Evaluations: {past_evals}
 Take one action:
 a. If both evaluations are completed: Provide a report summarizing performance
 b. Otherwise: Return only the remaining uncompleted evaluation
+"""
+
+reporter_ = """
+You are a Machine Learning Assessment Designer.
+
+Lesson: {input}
+Completed Evaluations: {past_evals}
+Questions: {questions}
+Answers: {answer}
+
+All evaluations are completed. Provide a report summarizing performance.
 """
\ No newline at end of file
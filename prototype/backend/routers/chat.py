@@ -1,44 +1,81 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import Dict
-from core.config import CONFIG
-from services.orchestration import main
-from services.utilities import invoke_llm
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator
+import core.config as cfg
+import services.orchestration as orchestration
+from core.config import CHECKPOINT_KEEP
+from core.persistence import prune_checkpoints
+from core.session import session_config
+from services.utilities import invoke_llm, stream_llm, next_node
 
 router = APIRouter()
 
 @router.get("/session-state")
-async def get_session_state(config = CONFIG) -> Dict[str, str]:
+async def get_session_state(config: Dict[str, Any] = Depends(session_config)) -> Dict[str, str]:
     """Get the current session state from the graph.
     
+    Args:
+        config: Session configuration resolved from the request
+        
     Returns:
         Dict containing the next state to be processed.
     """
     try:
-        state = main.get_state(config)
-        
-        if not state.next:
-            return {"next": ""}
-            
-        if isinstance(state.next, tuple) and len(state.next) == 1:
-            return {"next": state.next[0]}
-            
-        return {"next": str(state.next)}
+        state = await orchestration.main.aget_state(config)
+        return {"next": next_node(state)}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get session state: {str(e)}")
 
 @router.get("/chat")
-async def get_response(user_input: str = Query(..., description="User's message input")) -> Dict[str, str]:
+async def get_response(
+    background_tasks: BackgroundTasks,
+    user_input: str = Query(..., description="User's message input"),
+    config: Dict[str, Any] = Depends(session_config)
+) -> Dict[str, str]:
     """Process user input and return AI response.
     
     Args:
+        background_tasks: Tasks run after the response is sent
         user_input: The user's message to process
+        config: Session configuration resolved from the request
         
     Returns:
         Dict containing the AI response
     """
     try:
-        response, _ = invoke_llm(user_input, main)
+        response, _ = await invoke_llm(user_input, orchestration.main, config)
+        background_tasks.add_task(prune_checkpoints, cfg.checkpointer, config["configurable"]["thread_id"], CHECKPOINT_KEEP)
         return {"response": response}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get chat response: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get chat response: {str(e)}")
+
+@router.get("/chat/stream")
+async def stream_response(
+    user_input: str = Query(..., description="User's message input"),
+    config: Dict[str, Any] = Depends(session_config)
+) -> StreamingResponse:
+    """Process user input and stream node transitions and content tokens as Server-Sent Events.
+    
+    Args:
+        user_input: The user's message to process
+        config: Session configuration resolved from the request
+        
+    Returns:
+        A text/event-stream response; each event's data is a JSON object
+    """
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in stream_llm(user_input, orchestration.main, config):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            await prune_checkpoints(cfg.checkpointer, config["configurable"]["thread_id"], CHECKPOINT_KEEP)
+        except Exception as e:
+            detail = {"type": "error", "detail": f"Failed to stream chat response: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(detail)}\n\n"
+
+    return StreamingResponse(
+        events(), 
+        media_type="text/event-stream", 
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
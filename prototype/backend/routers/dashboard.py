@@ -0,0 +1,63 @@
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from typing import Dict, Any
+from core.session import session_config
+import services.orchestration as orchestration
+from services.utilities import profile, extract_items, next_node, knowledge_version
+from tools.memory import profile_version
+
+router = APIRouter()
+
+def _state_version(state: Any, profile_stamp: str, statuses_version: int) -> str:
+    """Builds an ETag from everything the dashboard is derived from.
+    
+    Args:
+        state: The state object from the graph, including subgraph tasks
+        profile_stamp: The learner's profile stamp
+        statuses_version: Version of the learner's concept statuses
+        
+    Returns:
+        Quoted ETag value
+    """
+    checkpoints = [state.config["configurable"].get("checkpoint_id")] + [
+        task.state.config["configurable"].get("checkpoint_id")
+        for task in state.tasks
+        if getattr(task.state, "config", None)
+    ]
+    parts = checkpoints + [profile_stamp, statuses_version]
+    digest = hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+@router.get("/dashboard")
+async def get_dashboard(request: Request, config: Dict[str, Any] = Depends(session_config)) -> Response:
+    """Endpoint returning session state, profile, learning plan and assessment plan in one response.
+    
+    The graph state is resolved once. Responses carry an ETag; a request whose
+    `If-None-Match` matches gets an empty 304 without the payload being rebuilt.
+    
+    Args:
+        config: Session configuration resolved from the request
+        
+    Returns:
+        JSON response with "next", "profile", "plan" and "evaluations", or 304 if unchanged
+    """
+    try:
+        state = await orchestration.main.aget_state(config=config, subgraphs=True)
+        user_id = config["configurable"]["user_id"]
+        etag = _state_version(state, await profile_version(user_id), await knowledge_version(user_id))
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        payload = {
+            "version": etag.strip('"'),
+            "next": next_node(state),
+            "profile": await profile(config=config),
+            "plan": extract_items(state, 'plan'),
+            "evaluations": extract_items(state, 'evaluations'),
+        }
+        return JSONResponse(payload, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build dashboard: {str(e)}")
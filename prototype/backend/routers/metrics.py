@@ -0,0 +1,50 @@
+from typing import Iterable, Tuple, Dict
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from core.cache import prompt_cache
+from core.prefetch import prefetcher
+from core.metrics import registry
+import core.config as cfg
+from services.orchestration import decision_paths
+
+router = APIRouter()
+
+Sample = Tuple[str, str, Dict[str, str], float]
+
+def _cache_samples() -> Iterable[Sample]:
+    """Hit/miss tallies the caches already keep, read at scrape time."""
+    help = "Cache lookups by outcome."
+    caches = [(cfg.get(name), name) for name in ("response_cache", "embeddings") if name in cfg.built()]
+    for cache, source in caches + [(prefetcher, "prefetch")]:
+        yield "cache_lookups_total", help, {"cache": source, "result": "hit"}, cache.hits
+        yield "cache_lookups_total", help, {"cache": source, "result": "miss"}, cache.misses
+    for section, count in prompt_cache.hits.items():
+        yield "cache_lookups_total", help, {"cache": f"prompt:{section}", "result": "hit"}, count
+    for section, count in prompt_cache.misses.items():
+        yield "cache_lookups_total", help, {"cache": f"prompt:{section}", "result": "miss"}, count
+
+def _decision_samples() -> Iterable[Sample]:
+    """How learning and assessment loops decided to continue or finish."""
+    for path, count in decision_paths.items():
+        yield "session_decisions_total", "Session loop decisions by path.", {"path": path}, count
+
+def _gate_samples() -> Iterable[Sample]:
+    """Model call counters of the request gate, per lane."""
+    if "gate" not in cfg.built():
+        return
+    for lane, counts in cfg.gate.stats().items():
+        for name in ("calls", "coalesced", "retries", "budget_exhausted"):
+            yield f"model_{name}_total", f"Model API {name.replace('_', ' ')} by lane.", {"lane": lane}, counts[name]
+
+registry.collector(_cache_samples)
+registry.collector(_gate_samples)
+registry.collector(_decision_samples)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Endpoint exposing node, tool, LLM, cache and I/O metrics in the Prometheus text format.
+
+    Returns:
+        Plain-text exposition of all registered metrics
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
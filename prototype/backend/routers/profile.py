@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
 from services.utilities import profile
-from core.config import CONFIG, store
+from core.session import session_config
 from typing import Dict, Any
 
 router = APIRouter()
 
 @router.get("/profile")
-def get_profile(request: Request) -> Dict[str, Any]:
+async def get_profile(request: Request, config: Dict[str, Any] = Depends(session_config)) -> Dict[str, Any]:
     """Endpoint to retrieve the user profile information.
     
+    Args:
+        config: Session configuration resolved from the request
+        
     Returns:
         Dictionary containing the user profile data
     """
     try:
-        user_profile = profile(config=CONFIG, store=store)
+        user_profile = await profile(config=config)
         return {"profile": user_profile}
     except Exception as e:
         # Handle errors gracefully
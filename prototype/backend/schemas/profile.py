@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+
+PROFILE_LABELS: Dict[str, str] = {
+    "name": "Name",
+    "interests": "Interests",
+    "preferences": "Preferences",
+    "goals": "Goals"
+}
+
+class ProfileEntry(BaseModel):
+    """A single stored profile attribute."""
+    id: str = Field(
+        ...,
+        description="Store key of the profile entry."
+    )
+    content: str = Field(
+        ...,
+        description="The stored attribute value."
+    )
+
+class ProfileSnapshot(BaseModel):
+    """All profile attributes of a user, grouped by profile type."""
+    user_id: str = Field(
+        ...,
+        description="The user the profile belongs to."
+    )
+    entries: Dict[str, List[ProfileEntry]] = Field(
+        default_factory=lambda: {p_type: [] for p_type in PROFILE_LABELS},
+        description="Entries by recency-weighted rank, capped per profile type."
+    )
+
+    def text(self, profile_type: str) -> str:
+        """Joins the contents stored for one profile type."""
+        return " ".join(entry.content for entry in self.entries.get(profile_type, []))
+
+    def lines(self, order: List[str], prefix: str = "") -> str:
+        """Formats one "Label: contents" line per profile type, in the given order."""
+        return "\n".join(f"{prefix}{PROFILE_LABELS[p_type]}: {self.text(p_type)}" for p_type in order)
@@ -1,7 +1,12 @@
-from typing import Annotated, TypedDict, Sequence
+from typing import Annotated, TypedDict, Sequence, Dict, Any, Optional
 from langgraph.graph.message import add_messages, BaseMessage
 
+def merge_lessons(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Adds new lessons to the ones kept so far, by lesson id."""
+    return {**(left or {}), **(right or {})}
+
 class AgentState(TypedDict):
     """Defines the state structure for the agent in the learning system."""
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    lesson: str
\ No newline at end of file
+    lesson: Dict[str, Any]  # compact record of the last learning session
+    lessons: Annotated[Dict[str, Dict[str, Any]], merge_lessons]  # every lesson of the thread, by id, for `get_lesson`
@@ -75,4 +75,5 @@ class PlanExecute(TypedDict):
     plan: List[str]
     past_steps: Annotated[List[Tuple], operator.add]
     lo: str  # learning objective
-    conclusion: str
\ No newline at end of file
+    conclusion: str
+    concept: str  # concept id the session is about, if resolved
\ No newline at end of file
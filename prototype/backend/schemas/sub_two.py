@@ -76,4 +76,5 @@ class EvalExecute(TypedDict):
     past_evals: Annotated[List[Tuple], operator.add]
     eo: Annotated[List[Tuple], operator.add]
     answer: Annotated[List[Tuple], operator.add]
-    report: str
\ No newline at end of file
+    report: str
+    concept: str  # concept id whose precomputed assessment matches the lesson, if any
\ No newline at end of file
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import argparse
+from typing import List, Optional
+
+import core.config as cfg
+import services.orchestration as orchestration
+
+logger = logging.getLogger(__name__)
+
+async def generate_artifact(concept_id: str) -> None:
+    """Generates and stores the base plan, evaluations and question bank of a concept.
+
+    Args:
+        concept_id: The concept's ID
+    """
+    details = cfg.graph.get(concept_id)
+    topic = f"{concept_id} {details['label']}: {details.get('content', '')}"
+
+    plan = await orchestration.planner.ainvoke({"messages": [("user", topic)]})
+    evaluations = await orchestration.mapper.ainvoke({"messages": [("user", topic)]})
+
+    questions = {}
+    eval_str = "\n".join(f"{i}. {e}" for i, e in enumerate(evaluations.evals, start=1))
+    for i, current_eval in enumerate(evaluations.evals, start=1):
+        prompt = f"""Given this learning session content {topic}\n\n, and evaluation plan:\n{eval_str}
+                     You are tasked with executing evaluation {i}: {current_eval}.
+                     Questions / tasks must directly align with the learning session content."""
+        questions[current_eval.title] = (await orchestration.assessment.ainvoke({"messages": [("user", prompt)]})).model_dump()
+
+    await asyncio.to_thread(cfg.artifacts.put, concept_id, plan.model_dump(), evaluations.model_dump(), questions)
+
+async def build_artifacts(concept_ids: Optional[List[str]] = None, concurrency: int = 4, force: bool = False) -> List[str]:
+    """Generates artifacts for every concept that lacks an up-to-date one.
+
+    Args:
+        concept_ids: Concepts to build (defaults to the whole graph)
+        concurrency: Maximum concepts generated at once
+        force: Rebuild artifacts that are already up to date
+
+    Returns:
+        IDs of the concepts whose artifact was written
+    """
+    pending = list(concept_ids or cfg.graph.ids) if force else cfg.artifacts.missing(concept_ids)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    built = []
+
+    async def build(concept_id: str) -> None:
+        async with semaphore:
+            try:
+                await generate_artifact(concept_id)
+                built.append(concept_id)
+            except Exception as e:
+                logger.error(f"Failed to build artifact for '{concept_id}': {e}")
+
+    logger.info(f"Building {len(pending)} concept artifacts")
+    await asyncio.gather(*(build(cid) for cid in pending))
+    logger.info(f"Built {len(built)}/{len(pending)} concept artifacts")
+    return built
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute lesson and assessment artifacts per concept.")
+    parser.add_argument("concepts", nargs="*", help="Concept IDs to build (default: every concept)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concepts generated at once")
+    parser.add_argument("--force", action="store_true", help="Rebuild up-to-date artifacts")
+    args = parser.parse_args()
+
+    if not cfg.artifacts.directory:
+        parser.error("ARTIFACTS_PATH is not configured.")
+    unknown = [cid for cid in args.concepts if cfg.graph.get(cid) is None]
+    if unknown:
+        parser.error(f"Unknown concept IDs: {', '.join(unknown)}")
+
+    asyncio.run(build_artifacts(args.concepts or None, args.concurrency, args.force))
+
+if __name__ == "__main__":
+    main()
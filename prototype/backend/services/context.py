@@ -0,0 +1,203 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from prompts.base import summarizer_
+import core.config as cfg
+from core.config import OPENAI_CHAT_MODEL, CONTEXT_TOKEN_BUDGET, TOOL_OUTPUT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD = 4
+TRUNCATION_NOTE_TOKENS = 16
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]) -> Any:
+    """Returns the tiktoken encoding for a model, or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    name = (model or "").split(":")[-1]
+    try:
+        try:
+            return tiktoken.encoding_for_model(name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; count approximately when offline.
+        logger.warning(f"Tokenizer unavailable for '{name}', approximating token counts: {e}")
+        return None
+
+def count_tokens(text: str, model: Optional[str] = OPENAI_CHAT_MODEL) -> int:
+    """Counts the tokens of a text, approximating 4 characters per token without tiktoken."""
+    encoding = _encoding(model)
+    return len(encoding.encode(text, disallowed_special=())) if encoding else (len(text) + 3) // 4
+
+def truncate_tokens(text: str, limit: int, model: Optional[str] = OPENAI_CHAT_MODEL) -> str:
+    """Cuts a text down to at most `limit` tokens, noting how much was dropped."""
+    encoding = _encoding(model)
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= limit:
+            return text
+        return encoding.decode(tokens[:limit]) + f"\n[... {len(tokens) - limit} more tokens truncated]"
+    if len(text) <= limit * 4:
+        return text
+    return text[:limit * 4] + f"\n[... {(len(text) - limit * 4) // 4} more tokens truncated]"
+
+def _text(message: BaseMessage) -> str:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    calls = getattr(message, "tool_calls", None)
+    return content + (json.dumps(calls, default=str) if calls else "")
+
+def message_tokens(message: BaseMessage) -> int:
+    """Counts the tokens a message contributes to a prompt, including tool call arguments."""
+    return count_tokens(_text(message)) + MESSAGE_OVERHEAD
+
+class ContextWindow:
+    """Keeps the conversation sent to the agent model within a token budget.
+
+    Tool results larger than `tool_output_tokens` are truncated. When the
+    recent turns no longer fit, the oldest turns are folded into a rolling
+    summary, cached per thread, and the kept window is shrunk to half the
+    budget so the summary only has to be extended now and then. The kept
+    window always starts on a human turn, so tool calls stay paired with
+    their results; if that turn alone exceeds the budget, its largest
+    messages are truncated. Compressed messages and their token counts are
+    cached by message id, so a turn only tokenizes the messages that are new.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, tool_output_tokens: int = TOOL_OUTPUT_TOKENS, max_cached: int = 50000):
+        self.budget = budget
+        self.tool_output_tokens = tool_output_tokens
+        self.max_cached = max_cached
+        self._summarizer: Optional[Any] = None
+        self._lock = threading.Lock()
+        self._summaries: Dict[str, Tuple[int, Optional[str], str, int]] = {}
+        self._prepared: "OrderedDict[Tuple[str, int], Tuple[BaseMessage, int]]" = OrderedDict()
+
+    @property
+    def summarizer(self) -> Any:
+        """The summary model, created on first use so importing this module needs no model client."""
+        if self._summarizer is None:
+            self._summarizer = cfg.llm.with_config(tags=[TAG_NOSTREAM], run_name="context_summary")
+        return self._summarizer
+
+    def compress(self, message: BaseMessage, limit: Optional[int] = None) -> BaseMessage:
+        """Truncates an oversized tool result; other messages are returned unchanged."""
+        limit = limit or self.tool_output_tokens
+        if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+            return message
+        truncated = truncate_tokens(message.content, limit)
+        return message if truncated is message.content else message.model_copy(update={"content": truncated})
+
+    def _prepare(self, message: BaseMessage) -> Tuple[BaseMessage, int]:
+        """Returns a message compressed for the window and its token count, cached by message id."""
+        if message.id is None:
+            compressed = self.compress(message)
+            return compressed, message_tokens(compressed)
+        key = (message.id, len(message.content))  # an edited message keeps its id
+        with self._lock:
+            prepared = self._prepared.get(key)
+            if prepared is not None:
+                self._prepared.move_to_end(key)
+                return prepared
+        compressed = self.compress(message)
+        prepared = (compressed, message_tokens(compressed))
+        with self._lock:
+            self._prepared[key] = prepared
+            while len(self._prepared) > self.max_cached:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def _shrink(self, window: List[BaseMessage], tokens: List[int], limit: int) -> List[BaseMessage]:
+        """Truncates the largest messages of a window until it fits `limit`."""
+        excess = sum(tokens) - limit
+        for i in sorted(range(len(window)), key=lambda i: -tokens[i]):
+            if excess <= 0:
+                break
+            message = window[i]
+            if not isinstance(message.content, str) or not message.content:
+                continue
+            keep = max(count_tokens(message.content) - excess - TRUNCATION_NOTE_TOKENS, 0)
+            window[i] = message.model_copy(update={"content": truncate_tokens(message.content, keep)})
+            excess -= tokens[i] - message_tokens(window[i])
+        return window
+
+    def _cut(self, messages: Sequence[BaseMessage], tokens: Sequence[int], start: int, limit: int) -> int:
+        """Returns the first index of the newest human-led suffix of `messages[start:]` that fits `limit`."""
+        total, cut = 0, len(messages)
+        for i in range(len(messages) - 1, start - 1, -1):
+            total += tokens[i]
+            if total > limit:
+                break
+            if isinstance(messages[i], HumanMessage):
+                cut = i
+        if cut == len(messages):
+            cut = next((i for i in range(len(messages) - 1, start - 1, -1) if isinstance(messages[i], HumanMessage)), start)
+        return max(cut, start)
+
+    async def _summarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        transcript = "\n".join(
+            f"{message.type}: {_text(self.compress(message, self.tool_output_tokens // 4))}" for message in messages
+        )
+        prompt = summarizer_.format(summary=summary or "(none)", transcript=transcript)
+        try:
+            response = await self.summarizer.ainvoke([HumanMessage(prompt)])
+            return response.content if isinstance(response.content, str) else str(response.content)
+        except Exception as e:
+            logger.warning(f"Context summarization failed: {e}")
+            return summary
+
+    async def fit(self, thread_id: str, messages: Sequence[BaseMessage], reserved: int = 0) -> List[BaseMessage]:
+        """Selects and compresses the messages to send to the model.
+
+        Args:
+            thread_id: The conversation thread, keying the rolling summary
+            messages: Full message history of the thread
+            reserved: Tokens already used by the system prompt
+
+        Returns:
+            Messages within the budget, led by a summary message if older turns were folded
+        """
+        prepared = [self._prepare(message) for message in messages]
+        messages = [message for message, _ in prepared]
+        tokens = [count for _, count in prepared]
+        limit = max(self.budget - reserved, 0)
+
+        with self._lock:
+            count, last_id, summary, summary_tokens = self._summaries.get(thread_id, (0, None, "", 0))
+        if count > len(messages) or (count and messages[count - 1].id != last_id):
+            count, summary, summary_tokens = 0, "", 0
+
+        if summary_tokens + sum(tokens[count:]) > limit:
+            cut = self._cut(messages, tokens, count, limit // 2)
+            if cut > count:
+                summary = await self._summarize(summary, messages[count:cut])
+                summary_tokens = count_tokens(summary)
+                count = cut
+                with self._lock:
+                    self._summaries[thread_id] = (count, messages[count - 1].id, summary, summary_tokens)
+                logger.info(f"Folded {count} messages of thread '{thread_id}' into the context summary")
+
+        window = list(messages[count:])
+        if summary_tokens + sum(tokens[count:]) > limit:
+            logger.warning(f"Latest turn of thread '{thread_id}' exceeds the context budget; truncating it")
+            window = self._shrink(window, tokens[count:], max(limit - summary_tokens, 0))
+        if summary:
+            window.insert(0, SystemMessage(f"Summary of the earlier conversation:\n{summary}"))
+        return window
+
+    def reset(self, thread_id: str) -> None:
+        """Drops the rolling summary of a thread."""
+        with self._lock:
+            self._summaries.pop(thread_id, None)
+
+context_window = ContextWindow()
@@ -1,24 +1,31 @@
 import os
 import json
-from typing import Dict, Any, List
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
 
 from dotenv import load_dotenv
 from langchain_core.runnables import RunnableConfig
-from langchain_core.messages import SystemMessage, trim_messages
+from langchain_core.messages import SystemMessage
 from langchain.prompts import ChatPromptTemplate
 from langgraph.prebuilt import ToolNode
 from langgraph.types import Command, interrupt
-from langgraph.graph import START, END, StateGraph, MessagesState
+from langgraph.graph import START, END, StateGraph
 
 from services.utilities import prepare_messages, profile, knowledge_state
-from prompts.sub_two import mapper_, assessor_, remaper_
-from prompts.sub_one import replaner_, planner_, learner_
-from core.config import llm, checkpointer
+from services.context import context_window, message_tokens
+from prompts.sub_two import mapper_, assessor_, remaper_, reporter_
+from prompts.sub_one import replaner_, planner_, learner_, concluder_
+import core.config as cfg
+from core.prefetch import prefetcher
 from schemas.state import AgentState
 from schemas.sub_one import PlanExecute, Plan, LearningObject, Conclusion, Act, LearningSession
 from schemas.sub_two import EvalExecute, Evaluations, EvalObject, Report, ActE, AssessmentSession
 from tools.memory import store_memory, retrieve_memory, delete_memory
-from tools.retreival import retrieve_sections, retrieve_node, update_status, retrieve_prerequisites
+from tools.retreival import retrieve_sections, retrieve_node, get_lesson, update_status, retrieve_prerequisites, plan_learning_path, search_concepts
+
+logger = logging.getLogger(__name__)
 
 load_dotenv(dotenv_path='.env', override=True)
 
@@ -27,67 +34,92 @@ if langsmith_api:
     os.environ["LANGCHAIN_TRACING_V2"] = "true"
     os.environ["LANGCHAIN_PROJECT"] = "Agent Two"
 
-planner = ChatPromptTemplate.from_messages([
-    ("system", planner_), 
-    ("placeholder", "{messages}")
-]) | llm.with_structured_output(Plan)
-
-object = ChatPromptTemplate.from_messages([
-    ("system", learner_), 
-    ("placeholder", "{messages}")
-]) | llm.with_structured_output(LearningObject)
+decision_paths = Counter()
 
-replanner = ChatPromptTemplate.from_template(replaner_) | llm.with_structured_output(Act)
+def _remaining(planned: List[Any], done: List[Any]) -> Optional[List[Any]]:
+    """Returns the planned items not done yet, or None if the two lists do not line up.
 
-mapper = ChatPromptTemplate.from_messages([
-    ("system", mapper_),
-    ("placeholder", "{messages}")
-]) | llm.with_structured_output(Evaluations)
-
-assessment = ChatPromptTemplate.from_messages([
-    ("system", assessor_), 
-    ("placeholder", "{messages}")
-]) | llm.with_structured_output(EvalObject)
+    The subgraphs always complete the first planned item, so when it is the
+    last completed item the remainder is known without asking the LLM.
+    """
+    if not planned or not done or str(planned[0]) != str(done[-1]):
+        return None
+    completed = {str(item) for item in done}
+    return [item for item in planned[1:] if str(item) not in completed]
+
+def _record(path: str) -> None:
+    """Counts a replan/remap decision; the totals are exported on /metrics."""
+    decision_paths[path] += 1
+    logger.debug(f"Session decision via {path}")
+
+def _learning_prompt(plan: List[Any], past_steps: List[Any]) -> str:
+    """Builds the learning object prompt for the first step of a plan."""
+    current_step = plan[0]
+    plan_str = "\n".join(
+        f"{i+1}. {step.title}\nDescription: {step.description}\nLearning Objective: {step.learning_objective}\n"
+        for i, step in enumerate(plan))
 
-remapper = ChatPromptTemplate.from_template(remaper_) | llm.with_structured_output(ActE)
+    if past_steps:
+        previous_steps_str = ". ".join([f'{i+1}. {desc}' for i, desc in enumerate(past_steps)])
+        return f"""You are a Learning Experience Designer.
+                     Given this plan:\n{plan_str}\n
+                     And, having already covered introduction: {previous_steps_str}\n
+                     Your task is to teach: {current_step}."""
+    return f"""You are a Learning Experience Designer.
+                     Given this learning plan:\n{plan_str}\n
+                     Your task is to provide an introduction / a warm up: {current_step}, anticipating the main lesson."""
 
-def execute_step(state: PlanExecute) -> Dict[str, Any]:
+async def execute_step(state: PlanExecute, config: RunnableConfig) -> Dict[str, Any]:
     """Execute a learning step from the plan.
+
+    Uses the learning object prefetched for this step if there is one, and
+    starts prefetching the next step's object while the learner reads.
     
     Args:
         state: Current execution state
+        config: Runtime configuration
         
     Returns:
         Updated state with learning object
     """
     plan = state["plan"]
     current_step = plan[0]
-    plan_str = "\n".join(
-        f"{i+1}. {step.title}\nDescription: {step.description}\nLearning Objective: {step.learning_objective}\n"
-        for i, step in enumerate(plan))
+    thread_id = config["configurable"]["thread_id"]
     
-    user_info = profile()
+    user_info = await profile(config)
 
     personalize = f"""Content is presented to: {user_info}. 
-                      Who's current knowledge state is: {knowledge_state()}
+                      Who's current knowledge state is: {await knowledge_state(config)}
                       """
 
-    if state["past_steps"]:
-        previous_steps_str = ". ".join([f'{i+1}. {desc}' for i, desc in enumerate(state["past_steps"])])
-        prompt = f"""You are a Learning Experience Designer.
-                     Given this plan:\n{plan_str}\n
-                     And, having already covered introduction: {previous_steps_str}\n
-                     Your task is to teach: {current_step}."""
-    else:
-        prompt = f"""You are a Learning Experience Designer.
-                     Given this learning plan:\n{plan_str}\n
-                     Your task is to provide an introduction / a warm up: {current_step}, anticipating the main lesson."""
-
-    result = object.invoke({"messages": [("user", prompt + personalize)]})
+    result = await prefetcher.take(thread_id, "learning_object", str(current_step))
+    if result is None:
+        prompt = _learning_prompt(plan, state["past_steps"])
+        result = await object.ainvoke({"messages": [("user", prompt + personalize)]})
+
+    if len(plan) > 1:
+        prompt = _learning_prompt(plan[1:], state["past_steps"] + [current_step])
+        prefetcher.schedule(
+            thread_id, "learning_object", str(plan[1]),
+            lambda: object.ainvoke({"messages": [("user", prompt + personalize)]})
+        )
     return {"past_steps": [current_step], "lo": result}
 
-def plan_step(state: PlanExecute) -> Dict[str, List]:
+def _reference_plan(concept: str, plan: Dict[str, Any]) -> str:
+    """Renders a concept's precomputed plan as context for the planner."""
+    steps = "\n".join(
+        f"{i}. {step['title']}: {step['learning_objective']}" for i, step in enumerate(plan["steps"], start=1))
+    return f"""Reference plan for the related concept {concept}:\n{steps}\n
+               Use it as a starting point only; plan for the request above."""
+
+async def plan_step(state: PlanExecute) -> Dict[str, List]:
     """Create a learning plan based on user input.
+
+    When the input names a concept exactly (its id or its label), the
+    concept's precomputed plan is used as is; the steps are personalized
+    later, when each learning object is generated. Otherwise the planner
+    runs on the request, with the precomputed plan of the concept the
+    request mentions as context.
     
     Args:
         state: Current execution state
@@ -95,21 +127,51 @@ def plan_step(state: PlanExecute) -> Dict[str, List]:
     Returns:
         Updated state with plan steps
     """
-    plan = planner.invoke({"messages": [("user", state["input"])]})
-    return {"plan": plan.steps}
-
-def replan_step(state: PlanExecute) -> Dict[str, Any]:
-    """Replan learning steps or create conclusion.
+    exact = state.get("concept") or cfg.artifacts.match(state["input"])
+    concept = exact or cfg.artifacts.resolve(state["input"])
+    resolved = {"concept": concept} if concept else {}
+    artifact = cfg.artifacts.get(concept)
+    if artifact and exact:
+        return {"plan": Plan.model_validate(artifact["plan"]).steps, **resolved}
+
+    messages = [("user", state["input"])]
+    if artifact:
+        messages.append(("user", _reference_plan(concept, artifact["plan"])))
+    plan = await planner.ainvoke({"messages": messages})
+    return {"plan": plan.steps, **resolved}
+
+async def replan_step(state: PlanExecute, config: RunnableConfig) -> Dict[str, Any]:
+    """Continue with the remaining plan steps or create a conclusion.
+
+    When the completed steps line up with the plan the decision is made
+    without the LLM: remaining steps are kept as they are, and only the
+    conclusion is generated. The full replanner is the fallback.
     
     Args:
         state: Current execution state
+        config: Runtime configuration
         
     Returns:
         Updated state with new plan or conclusion
     """
-    output = replanner.invoke(state)
     prefix = "Learning content that was introduced to the user."
-    return {"conclusion": prefix + output.action.conclusion} if isinstance(output.action, Conclusion) else {"plan": output.action.steps}
+    remaining = _remaining(state.get("plan"), state["past_steps"])
+
+    if remaining:
+        _record("replan.continue")
+        return {"plan": remaining}
+
+    if remaining is not None:
+        _record("replan.conclude")
+        action = await concluder.ainvoke({"input": state["input"], "past_steps": state["past_steps"]})
+    else:
+        _record("replan.llm")
+        action = (await replanner.ainvoke(state)).action
+
+    if isinstance(action, Conclusion):
+        prefetcher.discard(config["configurable"]["thread_id"], "learning_object")
+        return {"conclusion": prefix + action.conclusion}
+    return {"plan": action.steps}
 
 def disclose(state: PlanExecute) -> Command:
     """Determine if interruption is needed.
@@ -145,28 +207,47 @@ learningflow.add_edge("learning_object", "disclosure")
 learningflow.add_edge("disclosure", "replan")
 learningflow.add_conditional_edges("replan", should_end, ["learning_object", END])
 
-learningapp = learningflow.compile()
+def _evaluation_prompt(content: str, evaluations: List[Any]) -> str:
+    """Builds the evaluation object prompt for the first evaluation of a plan."""
+    eval_str = "\n".join(f"{i+1}. {eval}" for i, eval in enumerate(evaluations, start=1))
+    return f"""Given this learning session content {content}\n\n, and evaluation plan:\n{eval_str}
+                 You are tasked with executing evaluation {1}: {evaluations[0]}.
+                 Questions / tasks must directly align with the learning session content."""
 
-def execute_eval(state: EvalExecute) -> Dict[str, Any]:
+async def execute_eval(state: EvalExecute, config: RunnableConfig) -> Dict[str, Any]:
     """Execute an evaluation step.
+
+    Banked and prefetched questions are used when available; the next
+    question is prefetched while the learner answers this one.
     
     Args:
         state: Current evaluation state
+        config: Runtime configuration
         
     Returns:
         Updated state with evaluation object
     """
     evaluations = state["evaluations"]
     current_eval = evaluations[0]
-    eval_str = "\n".join(f"{i+1}. {eval}" for i, eval in enumerate(evaluations, start=1))
-    prompt = f"""Given this learning session content {state['input']}\n\n, and evaluation plan:\n{eval_str}
-                 You are tasked with executing evaluation {1}: {current_eval}.
-                 Questions / tasks must directly align with the learning session content."""
-    result = assessment.invoke({"messages": [("user", prompt)]})
+    thread_id = config["configurable"]["thread_id"]
+    artifact = cfg.artifacts.get(state.get("concept"))
+    bank = artifact["questions"] if artifact else {}
+
+    banked = bank.get(current_eval.title)
+    result = EvalObject.model_validate(banked) if banked else await prefetcher.take(thread_id, "evaluation_object", str(current_eval))
+    if result is None:
+        result = await assessment.ainvoke({"messages": [("user", _evaluation_prompt(state['input'], evaluations))]})
+
+    if len(evaluations) > 1 and evaluations[1].title not in bank:
+        prompt = _evaluation_prompt(state['input'], evaluations[1:])
+        prefetcher.schedule(
+            thread_id, "evaluation_object", str(evaluations[1]),
+            lambda: assessment.ainvoke({"messages": [("user", prompt)]})
+        )
     return {"past_evals": [current_eval], "eo": [result]}
 
-def plan_eval(state: EvalExecute) -> Dict[str, List]:
-    """Create an evaluation plan.
+async def plan_eval(state: EvalExecute) -> Dict[str, List]:
+    """Create an evaluation plan, preferring the precomputed one of a banked concept.
     
     Args:
         state: Current evaluation state
@@ -174,25 +255,53 @@ def plan_eval(state: EvalExecute) -> Dict[str, List]:
     Returns:
         Updated state with evaluation plan
     """
-    evaluations = mapper.invoke({"messages": [("user", state["input"])]})
+    artifact = cfg.artifacts.get(state.get("concept"))
+    if artifact:
+        return {"evaluations": Evaluations.model_validate(artifact["evaluations"]).evals}
+    evaluations = await mapper.ainvoke({"messages": [("user", state["input"])]})
     return {"evaluations": evaluations.evals}
 
-def remap_eval(state: EvalExecute) -> Dict[str, Any]:
-    """Process evaluation results and create report or new evaluations.
+async def remap_eval(state: EvalExecute, config: RunnableConfig) -> Dict[str, Any]:
+    """Continue with the remaining evaluations or create a report.
+
+    Like `replan_step`, the remaining evaluations are derived without the
+    LLM when they line up with the completed ones; the full remapper is the
+    fallback.
     
     Args:
         state: Current evaluation state
+        config: Runtime configuration
         
     Returns:
         Updated state with report or new evaluations
     """
-    output = remapper.invoke(state)
     formatted_list = []
     for i, eval_obj in enumerate(state['eo'], 1):
         content = eval_obj.content.strip()
         formatted_list.append(f"{i}. {content}")
     prompt = f"Questions: {str(formatted_list)} | Answers: {str(state['answer'])}"
-    return {"report": output.action.report + prompt} if isinstance(output.action, Report) else {"evaluations": output.action.evals}
+    remaining = _remaining(state.get("evaluations"), state["past_evals"])
+
+    if remaining:
+        _record("remap.continue")
+        return {"evaluations": remaining}
+
+    if remaining is not None:
+        _record("remap.report")
+        action = await reporter.ainvoke({
+            "input": state["input"],
+            "past_evals": state["past_evals"],
+            "questions": formatted_list,
+            "answer": state["answer"]
+        })
+    else:
+        _record("remap.llm")
+        action = (await remapper.ainvoke(state)).action
+
+    if isinstance(action, Report):
+        prefetcher.discard(config["configurable"]["thread_id"], "evaluation_object")
+        return {"report": action.report + prompt}
+    return {"evaluations": action.evals}
 
 def assess(state: EvalExecute) -> Dict[str, List]:
     """Get user answer for assessment.
@@ -231,25 +340,24 @@ evaluationflow.add_edge("assessment", "remap")
 
 evaluationflow.add_conditional_edges("remap", should_end_eval, ["evaluation_object", END])
 
-assessmentapp = evaluationflow.compile()
-
 tools = [
     store_memory, 
     retrieve_memory, 
     delete_memory, 
     retrieve_sections, 
     retrieve_node, 
+    get_lesson,
     update_status, 
-    retrieve_prerequisites
+    retrieve_prerequisites,
+    plan_learning_path,
+    search_concepts
 ]
  
 tool_node = ToolNode(tools)
 
-model = llm.bind_tools(tools + [LearningSession] + [AssessmentSession])
-
 tools_by_name = {tool.name: tool for tool in tools}
 
-def call_model(state: AgentState, config: RunnableConfig) -> Dict[str, List]:
+async def call_model(state: AgentState, config: RunnableConfig) -> Dict[str, List]:
     """Process user messages and generate model response.
     
     Args:
@@ -259,49 +367,89 @@ def call_model(state: AgentState, config: RunnableConfig) -> Dict[str, List]:
     Returns:
         Updated state with model response
     """
-    messages = trim_messages(
+    system_prompt = SystemMessage((await prepare_messages({"messages": []}, config))[0]["content"])
+    messages = await context_window.fit(
+        config["configurable"]["thread_id"], 
         state['messages'], 
-        strategy="last", 
-        token_counter=len, 
-        max_tokens=15, 
-        start_on="human", 
-        end_on=("human", "tool"), 
-        include_system=True
+        reserved=message_tokens(system_prompt)
     )
-    system_prompt = SystemMessage(prepare_messages({"messages": []})[0]["content"])
-    response = model.invoke([system_prompt] + messages, config)
+    response = await model.ainvoke([system_prompt] + messages, config)
     return {"messages": [response]}
 
-def learning_loop(state: AgentState) -> Dict[str, Any]:
+async def learning_loop(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Execute the learning session loop.
+
+    The tool result only references the session (lesson and concept id,
+    titles and the conclusion); the lesson text is kept in `lesson` for the
+    assessment and in `lessons` for `get_lesson`.
     
     Args:
         state: Current agent state
+        config: Runtime configuration
         
     Returns:
         Updated state with learning response
     """
     tool_call_id = state["messages"][-1].tool_calls[0]["id"]
     topic = state["messages"][-1]
-    response = learningapp.invoke({
+    response = await learningapp.ainvoke({
         "input": json.loads(topic.additional_kwargs['tool_calls'][0]['function']['arguments'])["input"]
-    })
-    tool_message = [{"tool_call_id": tool_call_id, "type": "tool", "content": response}]
-    return {"messages": tool_message, "lesson": response}
-
-def assessment_loop(state: AgentState) -> Dict[str, List]:
+    }, config)
+    lesson_id = f"L{len(state.get('lessons') or {}) + 1}"
+    lesson = {
+        "concept": response.get("concept"),
+        "title": response["lo"].title,
+        "content": response["lo"].content,
+        "steps": [step.title for step in response.get("past_steps", [])],
+        "conclusion": response.get("conclusion", "")
+    }
+    summary = {"lesson": lesson_id, **{key: lesson[key] for key in ("concept", "title", "steps", "conclusion")}}
+    tool_message = [{"tool_call_id": tool_call_id, "type": "tool", "content": json.dumps({"session": "learning", **summary})}]
+    return {"messages": tool_message, "lesson": lesson, "lessons": {lesson_id: lesson}}
+
+def _banked_concept(lesson: Dict[str, Any], requested: str) -> Optional[str]:
+    """Returns the concept whose precomputed assessment fits what is assessed, or None.
+
+    The question bank is built from the concept's base plan, so it is used
+    only when the delivered lesson followed that plan step by step or, with
+    no lesson yet, when the request names the concept exactly.
+    """
+    if not lesson:
+        return cfg.artifacts.match(requested)
+    artifact = cfg.artifacts.get(lesson.get("concept"))
+    if artifact is None:
+        return None
+    planned = [step["title"] for step in artifact["plan"]["steps"]]
+    return lesson["concept"] if lesson.get("steps") == planned else None
+
+async def assessment_loop(state: AgentState, config: RunnableConfig) -> Dict[str, List]:
     """Execute the assessment session loop.
+
+    Assesses the last lesson, or the requested topic if nothing was taught
+    yet. Banked questions are used only if they cover what was taught. The
+    tool result carries the question titles and the report only.
     
     Args:
         state: Current agent state
+        config: Runtime configuration
         
     Returns:
         Updated state with assessment response
     """
     tool_call_id = state["messages"][-1].tool_calls[0]["id"]
-    topic = state["lesson"]['lo'].content
-    response = assessmentapp.invoke({"input": str(topic)})
-    tool_message = [{"tool_call_id": tool_call_id, "type": "tool", "content": response}]
+    requested = state["messages"][-1].tool_calls[0]["args"].get("input", "")
+    lesson = state.get("lesson") or {}
+    topic = lesson.get("content") or requested
+    concept = lesson.get("concept") or cfg.artifacts.resolve(requested)
+    banked = _banked_concept(lesson, requested)
+    response = await assessmentapp.ainvoke({"input": str(topic), **({"concept": banked} if banked else {})}, config)
+    summary = {
+        "session": "assessment",
+        "concept": concept,
+        "questions": [eo.title for eo in response.get("eo", [])],
+        "report": response.get("report", "")
+    }
+    tool_message = [{"tool_call_id": tool_call_id, "type": "tool", "content": json.dumps(summary)}]
     return {"messages": tool_message}
 
 def should_continue(state: AgentState) -> str:
@@ -324,7 +472,7 @@ def should_continue(state: AgentState) -> str:
     else:
         return "tools"
 
-mainflow = StateGraph(MessagesState)
+mainflow = StateGraph(AgentState)
 
 mainflow.add_node("agent", call_model)
 mainflow.add_node("tools", tool_node)
@@ -337,4 +485,61 @@ mainflow.add_edge("tools", "agent")
 mainflow.add_edge("learning session", "agent")
 mainflow.add_edge("evaluation session", "agent")
 
-main = mainflow.compile(checkpointer=checkpointer)
\ No newline at end of file
+BUILT = (
+    "planner", "object", "replanner", "concluder", "mapper", "assessment", "remapper", "reporter",
+    "model", "learningapp", "assessmentapp", "main"
+)
+_build_lock = threading.Lock()
+
+def build() -> None:
+    """Builds the LLM chains and compiles the three graphs, once.
+
+    Nothing here runs at import time: the app lifespan calls `build` on
+    startup, and any other access to a built attribute (e.g.
+    `orchestration.main`) triggers it.
+    """
+    global planner, object, replanner, concluder, mapper, assessment, remapper, reporter
+    global model, learningapp, assessmentapp, main
+    with _build_lock:
+        if "main" in globals():
+            return
+        response_cache, llm = cfg.response_cache, cfg.llm
+
+        planner = response_cache.wrap("planner", ChatPromptTemplate.from_messages([
+            ("system", planner_), 
+            ("placeholder", "{messages}")
+        ]) | llm.with_structured_output(Plan), Plan)
+
+        object = response_cache.wrap("object", ChatPromptTemplate.from_messages([
+            ("system", learner_), 
+            ("placeholder", "{messages}")
+        ]) | llm.with_structured_output(LearningObject), LearningObject, personalized=True)
+
+        replanner = ChatPromptTemplate.from_template(replaner_) | llm.with_structured_output(Act)
+
+        concluder = ChatPromptTemplate.from_template(concluder_) | llm.with_structured_output(Conclusion)
+
+        mapper = response_cache.wrap("mapper", ChatPromptTemplate.from_messages([
+            ("system", mapper_),
+            ("placeholder", "{messages}")
+        ]) | llm.with_structured_output(Evaluations), Evaluations)
+
+        assessment = response_cache.wrap("assessment", ChatPromptTemplate.from_messages([
+            ("system", assessor_), 
+            ("placeholder", "{messages}")
+        ]) | llm.with_structured_output(EvalObject), EvalObject)
+
+        remapper = ChatPromptTemplate.from_template(remaper_) | llm.with_structured_output(ActE)
+
+        reporter = ChatPromptTemplate.from_template(reporter_) | llm.with_structured_output(Report)
+
+        model = llm.bind_tools(tools + [LearningSession] + [AssessmentSession])
+        learningapp = learningflow.compile()
+        assessmentapp = evaluationflow.compile()
+        main = mainflow.compile(checkpointer=cfg.checkpointer, store=cfg.store)  # the store is injected into the memory tools
+
+def __getattr__(name: str) -> Any:
+    if name in BUILT:
+        build()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
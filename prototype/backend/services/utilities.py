@@ -1,148 +1,199 @@
-import os
-import json
-from typing import Dict, List, Any, Tuple
+import asyncio
+from typing import Dict, List, Any, Tuple, AsyncIterator
+from langchain_core.utils.json import parse_partial_json
 from langgraph.types import Command
-from core.config import CONFIG, store, GRAPH_PATH
+import core.config as cfg
+from core.config import CONFIG
+from core.cache import prompt_cache
+from tools.memory import get_profile_snapshot, profile_version
 from prompts.base import persona, knowledge_space, protocol, memory, guidelines
 
-def knowledge_state(path: str = GRAPH_PATH) -> str:
-    """Reads the knowledge graph and returns a formatted string of concepts with their status.
-    
-    Args:
-        path: Path to the knowledge graph JSON file
-        
-    Returns:
-        Formatted string containing concepts and their status
-    """
-    if not os.path.exists(path):
-        return f"Error: File '{path}' does not exist."
+# subgraph nodes whose model call returns a structured output, i.e. JSON
+# (as message content or tool call arguments) rather than text for the user
+STRUCTURED_NODES = frozenset({"planner", "learning_object", "replan", "mapper", "evaluation_object", "remap"})
+# of these, the nodes whose `content` field is the lesson or question text
+STREAMED_CONTENT_NODES = frozenset({"learning_object", "evaluation_object"})
 
-    try:
-        with open(path, "r") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as jde:
-        return f"Error reading JSON from '{path}': {jde}"
-    except Exception as e:
-        return f"Error opening '{path}': {e}"
-
-    if "concepts" not in data:
-        return "Error: 'concepts' key not found in the JSON data."
-
-    concepts_with_status = [
-        {
-            "ID": cid,
-            "Label": details.get("label", "N/A"),
-            "Status": details.get("status", "N/A")
-        }
-        for cid, details in data["concepts"].items()
-        if details.get("status")
-    ]
+def _knowledge_section(user_id: str) -> str:
+    """Formats the concepts a user has a status for."""
+    if cfg.graph.data is None:
+        return cfg.graph.error
 
-    if not concepts_with_status:
+    statuses = cfg.knowledge.statuses(user_id)
+    if not statuses:
         return "No concepts with a non-empty status found."
     
-    concepts_with_status.sort(key=lambda x: x["ID"])
     formatted_lines = [
-        f"Concept ID: {c['ID']} Label: {c['Label'].title()} status is {c['Status']}" 
-        for c in concepts_with_status
+        f"Concept ID: {cid} Label: {cfg.graph.get(cid).get('label', 'N/A').title()} status is {statuses[cid]}" 
+        for cid in sorted(statuses)
     ]
     
     return "\n".join(formatted_lines)
 
-def prepare_messages(state: Dict[str, Any], config: Dict = CONFIG, store: Any = store) -> List[Dict[str, str]]:
+async def _profile_section(user_id: str, store: Any = None) -> str:
+    """Formats the user's profile memories as prompt bullet points."""
+    snapshot = await get_profile_snapshot(user_id, store)
+    return snapshot.lines(["name", "interests", "preferences", "goals"], prefix="* ")
+
+async def knowledge_version(user_id: str) -> int:
+    """Returns the version of a user's statuses, read off the event loop (it syncs the status journal)."""
+    return await asyncio.to_thread(cfg.knowledge.version, user_id)
+
+async def knowledge_state(config: Dict = CONFIG) -> str:
+    """Returns a formatted string of concepts with the user's status for each.
+    
+    The text is cached per user and rebuilt only after a status update.
+    
+    Args:
+        config: Application configuration
+        
+    Returns:
+        Formatted string containing concepts and their status
+    """
+    user_id = config["configurable"]["user_id"]
+    return await prompt_cache.aget(
+        user_id, "knowledge", 
+        lambda: asyncio.to_thread(_knowledge_section, user_id), 
+        version=await knowledge_version(user_id)
+    )
+
+async def prepare_messages(state: Dict[str, Any], config: Dict = CONFIG, store: Any = None) -> List[Dict[str, str]]:
     """Prepare system and user messages for LLM interaction.
     
+    The system prompt is served from the per-user prompt cache. The profile
+    section is rebuilt only when the profile stamp changes, and the
+    knowledge section only after a status update.
+    
     Args:
         state: Current conversation state
         config: Application configuration
-        store: Data storage instance
+        store: Data storage instance; defaults to the shared store
         
     Returns:
         List of message dictionaries
     """
     user_id = config["configurable"]["user_id"]
-    namespace = (user_id, "profile")
-    profile_types = {
-        "name": "Name", 
-        "interests": "Interests", 
-        "preferences": "Preferences", 
-        "goals": "Goals"
-    }
+    stamp = await profile_version(user_id, store)
 
-    # Build profile lines efficiently
-    profile_lines = []
-    for p_type, label in profile_types.items():
-        memories = store.search(namespace, filter={'type': p_type}, limit=5)
-        memory_text = ' '.join(m.value['memory'] for m in memories)
-        profile_lines.append(f"* {label}: {memory_text}")
-    
-    user_profile = "\n".join(profile_lines)
-    
-    # Construct system message with all context
-    system_message = {
-        "role": "system",
-        "content": (
+    async def build_system_prompt() -> str:
+        user_profile = await prompt_cache.aget(user_id, "profile", lambda: _profile_section(user_id, store), version=stamp)
+        return (
             f"{persona}\n\n"
             f"**User's Profile:**\n{user_profile}\n\n"
-            f"**User's Current Knowledge State:**\n{knowledge_state()}\n\n"
+            f"**User's Current Knowledge State:**\n{await knowledge_state(config)}\n\n"
             f"{knowledge_space}\n\n"
             f"**Interaction Protocol:**\n{protocol}\n\n"
             f"**Profile Management Instructions:**\n{memory}\n\n"
             f"**Guidelines:**\n{guidelines}\n\n"
         )
+
+    system_message = {
+        "role": "system",
+        "content": await prompt_cache.aget(
+            user_id, "system", 
+            build_system_prompt, 
+            version=(stamp, await knowledge_version(user_id))
+        )
     }
     
     return [system_message] + state["messages"]
 
-def profile(config: Dict = CONFIG, store: Any = store) -> str:
+async def profile(config: Dict = CONFIG, store: Any = None) -> str:
     """Get formatted user profile information.
     
+    The text is cached per user until the profile stamp changes.
+    
     Args:
         config: Application configuration
-        store: Data storage instance
+        store: Data storage instance; defaults to the shared store
         
     Returns:
         Formatted user profile as string
     """
     user_id = config["configurable"]["user_id"]
-    namespace = (user_id, "profile")
-    profile_types = {
-        "name": "Name", 
-        "goals": "Goals", 
-        "interests": "Interests", 
-        "preferences": "Preferences"
-    }
 
-    profile_lines = []
-    for p_type, label in profile_types.items():
-        memories = store.search(namespace, filter={'type': p_type}, limit=5)
-        memory_text = ' '.join(m.value['memory'] for m in memories)
-        profile_lines.append(f"{label}: {memory_text}")
+    async def build_profile() -> str:
+        snapshot = await get_profile_snapshot(user_id, store)
+        return snapshot.lines(["name", "goals", "interests", "preferences"])
+
+    return await prompt_cache.aget(user_id, "profile_view", build_profile, version=await profile_version(user_id, store))
+
+def extract_items(state: Any, key: str) -> List[Dict[str, str]]:
+    """Extract plan or evaluation items from the active session subgraph with error handling.
     
-    return "\n".join(profile_lines)
+    Args:
+        state: The state object from the graph
+        key: The key to extract from state values
+        
+    Returns:
+        List of dictionaries with item details
+    """
+    try:
+        items = state.tasks[0].state.values[key]
+        result = []
+        
+        for item in items:
+            item_dict = {"title": item.title, "description": item.description}
+            # Add learning_objective if it exists (only for plans)
+            if hasattr(item, "learning_objective"):
+                item_dict["learning_objective"] = item.learning_objective
+            result.append(item_dict)
+            
+        return result
+    except (IndexError, KeyError, AttributeError):
+        return []
 
-def invoke_llm(input_string: str, main: Any, config: Dict = CONFIG) -> Tuple[str, Any]:
-    """Invoke the LLM with user input and handle different states.
+def next_node(state: Any) -> str:
+    """Name the node the main graph is paused at.
     
     Args:
-        input_string: User input text
-        main: Main graph instance
-        config: Application configuration
+        state: The state object from the graph
         
     Returns:
-        Tuple of (response content, full response)
+        The next node name, or an empty string if the graph is idle
     """
-    state = main.get_state(config)
-    payload = {"messages": [{"role": "user", "content": input_string}]}
+    if not state.next:
+        return ""
+        
+    if isinstance(state.next, tuple) and len(state.next) == 1:
+        return state.next[0]
+        
+    return str(state.next)
 
+def _graph_input(state: Any, input_string: str) -> Any:
+    """Builds the graph input for a user message: a resume command inside a session, a new message otherwise.
+    
+    Args:
+        state: Current snapshot of the main graph
+        input_string: User input text
+        
+    Returns:
+        Command or message payload
+        
+    Raises:
+        ValueError: If the graph is paused at an unexpected node
+    """
     if state.next in [('learning session',), ('evaluation session',)]:
-        command = Command(resume=input_string)
-        response = main.invoke(command, config=config, subgraphs=True)
+        return Command(resume=input_string)
     elif not state.next:
-        response = main.invoke(payload, config=config, subgraphs=True)
+        return {"messages": [{"role": "user", "content": input_string}]}
     else:
         raise ValueError(f"Unexpected state.next value: {state.next}")
 
+async def invoke_llm(input_string: str, main: Any, config: Dict = CONFIG) -> Tuple[str, Any]:
+    """Invoke the LLM with user input and handle different states.
+    
+    Args:
+        input_string: User input text
+        main: Main graph instance
+        config: Application configuration
+        
+    Returns:
+        Tuple of (response content, full response)
+    """
+    state = await main.aget_state(config)
+    response = await main.ainvoke(_graph_input(state, input_string), config=config, subgraphs=True)
+
     response_content = "No valid content found in the response."
     
     response_data = response[1] if len(response) > 1 and isinstance(response[1], dict) else {}
@@ -155,4 +206,63 @@ def invoke_llm(input_string: str, main: Any, config: Dict = CONFIG) -> Tuple[str
     elif 'eo' in response_data:
         response_content = getattr(response_data['eo'][-1], 'content', response_content)
 
-    return response_content, response
\ No newline at end of file
+    return response_content, response
+
+async def stream_llm(input_string: str, main: Any, config: Dict = CONFIG) -> AsyncIterator[Dict[str, Any]]:
+    """Stream node transitions and content tokens for a user message.
+    
+    Runs the main graph with `astream(..., subgraphs=True)` in "updates" and
+    "messages" modes. Structured-output chains emit JSON, either as message
+    content or as tool call arguments depending on the provider's method:
+    for lesson and evaluation objects the partial JSON is parsed
+    incrementally and only the new characters of its `content` field are
+    emitted; the output of the other structured nodes is not streamed.
+    
+    Args:
+        input_string: User input text
+        main: Main graph instance
+        config: Application configuration
+        
+    Yields:
+        Event dictionaries with a "type" of "node", "token", "interrupt" or "done"
+    """
+    state = await main.aget_state(config)
+    arguments: Dict[str, str] = {}
+    emitted: Dict[str, int] = {}
+
+    async for namespace, mode, chunk in main.astream(
+        _graph_input(state, input_string), 
+        config=config, 
+        stream_mode=["updates", "messages"], 
+        subgraphs=True
+    ):
+        if mode == "updates":
+            for node, update in chunk.items():
+                if node == "__interrupt__":
+                    yield {"type": "interrupt", "namespace": list(namespace)}
+                else:
+                    yield {"type": "node", "node": node, "namespace": list(namespace)}
+            continue
+
+        message, metadata = chunk
+        node = metadata.get("langgraph_node")
+        text = message.content if isinstance(message.content, str) else ""
+        tool_arguments = "".join(c.get("args") or "" for c in getattr(message, "tool_call_chunks", None) or [])
+
+        if node in STRUCTURED_NODES or (not text and tool_arguments):
+            if node not in STREAMED_CONTENT_NODES:
+                continue
+            key = f"{'|'.join(namespace)}:{message.id}"
+            arguments[key] = arguments.get(key, "") + text + tool_arguments
+            parsed = parse_partial_json(arguments[key]) if arguments[key].lstrip().startswith("{") else None
+            content = parsed.get("content") if isinstance(parsed, dict) else None
+            text = ""
+            if isinstance(content, str):
+                text = content[emitted.get(key, 0):]
+                emitted[key] = len(content)
+
+        if text:
+            yield {"type": "token", "node": node, "namespace": list(namespace), "content": text}
+
+    state = await main.aget_state(config)
+    yield {"type": "done", "next": state.next[0] if len(state.next) == 1 else ""}
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# modules are imported the way the app imports them, relative to prototype/backend
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Any, List
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from services.context import ContextWindow, message_tokens
+
+class StubSummarizer:
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, messages: List[BaseMessage], *args: Any, **kwargs: Any) -> AIMessage:
+        self.calls += 1
+        return AIMessage(f"summary {self.calls}")
+
+def _window(budget: int, tool_output_tokens: int = 1000) -> ContextWindow:
+    window = ContextWindow(budget=budget, tool_output_tokens=tool_output_tokens)
+    window._summarizer = StubSummarizer()
+    return window
+
+def _turns(count: int, words: int = 40) -> List[BaseMessage]:
+    messages = []
+    for i in range(count):
+        messages.append(HumanMessage(f"question {i} " + "word " * words, id=f"h{i}"))
+        messages.append(AIMessage("", id=f"a{i}", tool_calls=[{"name": "retrieve_node", "args": {"concept_id": "A.1"}, "id": f"c{i}"}]))
+        messages.append(ToolMessage("node " * words, tool_call_id=f"c{i}", id=f"t{i}"))
+        messages.append(AIMessage(f"answer {i} " + "word " * words, id=f"r{i}"))
+    return messages
+
+def _fit(window: ContextWindow, messages: List[BaseMessage], reserved: int = 0) -> List[BaseMessage]:
+    return asyncio.run(window.fit("t", messages, reserved))
+
+def _tokens(messages: List[BaseMessage]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+def test_history_within_budget_is_kept_whole():
+    window, messages = _window(10000), _turns(3)
+    assert _fit(window, messages) == messages
+    assert window.summarizer.calls == 0
+
+def test_old_turns_are_folded_into_a_summary():
+    window, messages = _window(1000), _turns(8)
+    fitted = _fit(window, messages)
+    assert isinstance(fitted[0], SystemMessage) and "summary 1" in fitted[0].content
+    assert isinstance(fitted[1], HumanMessage)  # tool calls stay paired with their results
+    assert fitted[-1] is messages[-1]
+    assert _tokens(fitted) <= 500  # the kept window is shrunk to half the budget
+
+def test_summary_is_extended_only_when_needed():
+    window, messages = _window(1000), _turns(8)
+    _fit(window, messages)
+    _fit(window, _turns(9))
+    assert window.summarizer.calls == 1  # the other half of the budget absorbs the next turns
+    _fit(window, _turns(12))
+    assert window.summarizer.calls == 2
+
+def test_reserved_tokens_shrink_the_budget():
+    window, messages = _window(1000), _turns(4)
+    assert _fit(window, messages) == messages
+    assert _tokens(_fit(_window(1000), messages, reserved=700)) <= 300
+
+def test_oversized_tool_output_is_truncated():
+    window = _window(10000, tool_output_tokens=20)
+    messages = [HumanMessage("hi", id="h"), ToolMessage("node " * 500, tool_call_id="c", id="t")]
+    fitted = _fit(window, messages)
+    assert "more tokens truncated" in fitted[1].content
+    assert message_tokens(fitted[1]) < 60
+
+def test_an_oversized_latest_turn_is_truncated_to_the_budget():
+    window = _window(200)
+    fitted = _fit(window, [HumanMessage("word " * 2000, id="h")])
+    assert len(fitted) == 1 and _tokens(fitted) <= 200
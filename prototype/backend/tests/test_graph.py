@@ -0,0 +1,40 @@
+import json
+import pytest
+from core.graph import KnowledgeGraph
+
+# A <- B <- {C <-> D} <- E, where C and D form a prerequisite cycle
+CONCEPTS = {
+    "A": {"label": "a", "prerequisites": []},
+    "B": {"label": "b", "prerequisites": ["A"]},
+    "C": {"label": "c", "prerequisites": ["B", "D"]},
+    "D": {"label": "d", "prerequisites": ["C"]},
+    "E": {"label": "e", "prerequisites": ["C", "missing"]},
+}
+
+@pytest.fixture
+def graph(tmp_path) -> KnowledgeGraph:
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps({"concepts": CONCEPTS}))
+    return KnowledgeGraph(str(path))
+
+def test_ancestor_closure_is_transitive_and_ordered(graph):
+    assert graph.ancestors("A") == []
+    assert graph.ancestors("B") == ["A"]
+    assert graph.ancestors("E") == ["A", "B", "D", "C"]
+
+def test_ancestors_inside_a_cycle_include_the_other_members(graph):
+    assert graph.ancestors("C") == ["A", "B", "D"]
+    assert graph.ancestors("D") == ["A", "B", "C"]
+
+def test_learning_path_leaves_out_known_concepts(graph):
+    assert graph.learning_path("E", known=["A", "D"]) == ["B", "C", "E"]
+    assert graph.learning_path("unknown") == []
+
+def test_frontier_treats_cycle_members_as_corequisites(graph):
+    assert graph.frontier([]) == ["A", "D"]
+    assert graph.frontier(["A"]) == ["B", "D"]
+    assert graph.frontier(["A", "B"]) == ["C", "D"]
+    assert graph.frontier(["A", "B", "C", "D"]) == ["E"]
+
+def test_frontier_within_restricts_candidates(graph):
+    assert graph.frontier(["A", "B"], within=["C", "E"]) == ["C"]
@@ -0,0 +1,85 @@
+import json
+from core.journal import StatusJournal
+
+def _journal(tmp_path, **kwargs) -> StatusJournal:
+    return StatusJournal(str(tmp_path / "status.journal"), str(tmp_path / "status.snapshot"), fsync=False, **kwargs)
+
+def _replayed(tmp_path, *users: str) -> dict:
+    journal = _journal(tmp_path)
+    journal.replay()
+    return {user: journal.load(user) for user in users}
+
+def test_replay_applies_entries_in_order(tmp_path):
+    journal = _journal(tmp_path)
+    journal.append("u1", "A1", "awareness")
+    journal.append("u1", "A1", "mastery")
+    journal.append("u2", "B1", "unlearned")
+    journal.close()
+
+    assert _replayed(tmp_path, "u1", "u2", "u3") == {"u1": {"A1": "mastery"}, "u2": {"B1": "unlearned"}, "u3": {}}
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    journal = _journal(tmp_path, compact_every=3)
+    journal.append("u2", "B1", "awareness")
+    journal.compact()
+    for i in range(3):
+        journal.append("u1", f"A{i}", "mastery")
+    assert journal.should_compact()
+
+    journal.compact()
+    assert not journal.should_compact()
+    assert (tmp_path / "status.journal").read_bytes() == b""
+    lines = [json.loads(line) for line in (tmp_path / "status.snapshot").read_text().splitlines()]
+    assert lines == [
+        {"user": "u2", "statuses": {"B1": "awareness"}},
+        {"user": "u1", "statuses": {"A0": "mastery", "A1": "mastery", "A2": "mastery"}}
+    ]
+
+    journal.append("u1", "A0", "awareness")
+    assert journal.load("u1") == {"A0": "awareness", "A1": "mastery", "A2": "mastery"}
+    journal.close()
+    assert _replayed(tmp_path, "u1", "u2") == {"u1": {"A0": "awareness", "A1": "mastery", "A2": "mastery"}, "u2": {"B1": "awareness"}}
+
+def test_compaction_by_another_instance_is_picked_up(tmp_path):
+    writer, reader = _journal(tmp_path), _journal(tmp_path)
+    writer.append("u1", "A1", "awareness")
+    assert reader.sync() is None  # first use indexes everything
+    assert reader.load("u1") == {"A1": "awareness"}
+
+    writer.append("u1", "A2", "mastery")
+    assert reader.sync() == {"u1"}
+
+    writer.compact()
+    writer.append("u1", "A1", "mastery")
+    assert reader.sync() is None  # new journal file: indexed again from the snapshot
+    assert reader.load("u1") == {"A1": "mastery", "A2": "mastery"}
+    assert reader.sync() == set()
+
+def test_reads_stay_consistent_until_the_next_sync(tmp_path):
+    writer, reader = _journal(tmp_path), _journal(tmp_path)
+    writer.append("u1", "A1", "awareness")
+    reader.sync()
+    writer.compact()
+    writer.append("u1", "A1", "mastery")
+    writer.compact()
+    assert reader.load("u1") == {"A1": "awareness"}  # the replaced files are still readable
+    reader.sync()
+    assert reader.load("u1") == {"A1": "mastery"}
+
+def test_torn_last_line_is_discarded_and_truncated(tmp_path):
+    journal = _journal(tmp_path)
+    journal.append("u1", "A1", "mastery")
+    journal.close()
+    path = tmp_path / "status.journal"
+    intact = path.read_bytes()
+    with open(path, "ab") as f:
+        f.write(b'{"user": "u1", "id": "A2", "sta')
+
+    recovered = _journal(tmp_path)
+    recovered.replay()
+    assert recovered.load("u1") == {"A1": "mastery"}
+    assert path.read_bytes() == intact
+
+    recovered.append("u1", "A2", "awareness")
+    recovered.close()
+    assert _replayed(tmp_path, "u1") == {"u1": {"A1": "mastery", "A2": "awareness"}}
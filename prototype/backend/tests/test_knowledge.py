@@ -0,0 +1,69 @@
+import json
+import asyncio
+import pytest
+import core.config as cfg
+from core.graph import KnowledgeGraph
+from core.journal import StatusJournal
+from core.knowledge import KnowledgeStates
+from services.utilities import knowledge_state
+
+@pytest.fixture
+def graph(tmp_path) -> KnowledgeGraph:
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps({"concepts": {cid: {"label": cid, "prerequisites": []} for cid in ["A.1", "A.2", "B.1"]}}))
+    return KnowledgeGraph(str(path))
+
+def _states(tmp_path, graph: KnowledgeGraph, **kwargs) -> KnowledgeStates:
+    journal = StatusJournal(str(tmp_path / "status.journal"), str(tmp_path / "status.snapshot"), fsync=False)
+    return KnowledgeStates(graph, journal, **kwargs)
+
+def test_new_learners_start_empty_and_changes_persist(tmp_path, graph):
+    states = _states(tmp_path, graph)
+    assert states.statuses("u1") == {}
+    assert states.set_status("u1", "A.1", "awareness") == "undefined"
+    assert states.set_status("u1", "A.1", "mastery") == "awareness"
+    assert states.status("u1", "A.1") == "mastery"
+    assert states.statuses("u2") == {}
+    assert _states(tmp_path, graph).statuses("u1") == {"A.1": "mastery"}
+
+def test_unknown_concepts_are_rejected(tmp_path, graph):
+    with pytest.raises(KeyError):
+        _states(tmp_path, graph).set_status("u1", "Z.9", "mastery")
+
+def test_version_changes_only_with_the_statuses(tmp_path, graph):
+    states = _states(tmp_path, graph)
+    version = states.version("u1")
+    assert states.version("u1") == version
+    states.set_status("u1", "A.1", "mastery")
+    assert states.version("u1") != version
+    version = states.version("u1")
+    states.set_status("u1", "A.1", "mastery")  # unchanged
+    assert states.version("u1") == version
+
+def test_idle_tables_are_evicted_without_reusing_versions(tmp_path, graph):
+    states = _states(tmp_path, graph, max_tables=2)
+    states.set_status("u1", "A.1", "mastery")
+    seen = {states.version("u1")}
+    for user_id in ["u2", "u3"]:
+        seen.add(states.version(user_id))
+    assert list(states._tables) == ["u2", "u3"]
+    assert states.statuses("u1") == {"A.1": "mastery"}  # rebuilt from the journal
+    assert states.version("u1") not in seen
+
+def test_changes_of_another_process_are_picked_up(tmp_path, graph):
+    first, second = _states(tmp_path, graph), _states(tmp_path, graph)
+    assert second.statuses("u1") == {}
+    version = second.version("u1")
+    first.set_status("u1", "B.1", "awareness")
+    assert second.statuses("u1") == {"B.1": "awareness"}
+    assert second.version("u1") != version
+
+def test_prompt_section_follows_status_changes(tmp_path, graph, monkeypatch):
+    states = _states(tmp_path, graph)
+    monkeypatch.setitem(cfg._instances, "graph", graph)
+    monkeypatch.setitem(cfg._instances, "knowledge", states)
+    config = {"configurable": {"user_id": "prompt-user"}}
+
+    assert asyncio.run(knowledge_state(config)) == "No concepts with a non-empty status found."
+    states.set_status("prompt-user", "A.1", "mastery")
+    assert "A.1" in asyncio.run(knowledge_state(config))
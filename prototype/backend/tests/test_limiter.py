@@ -0,0 +1,56 @@
+import asyncio
+from typing import List
+from core.limiter import FairSemaphore
+
+async def _hold(semaphore: FairSemaphore, user: str, granted: List[str]) -> None:
+    await semaphore.acquire(user)
+    granted.append(user)
+    await asyncio.sleep(0)
+    semaphore.release()
+
+def test_slots_rotate_between_waiting_users():
+    async def scenario() -> List[str]:
+        semaphore, granted = FairSemaphore(1), []
+        await semaphore.acquire("holder")
+        tasks = [asyncio.create_task(_hold(semaphore, user, granted)) for user in ["a", "a", "a", "b", "c"]]
+        await asyncio.sleep(0)
+        assert semaphore.waiting == 5
+        semaphore.release()
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        assert semaphore.active == 0 and semaphore.waiting == 0
+        return granted
+
+    assert asyncio.run(scenario()) == ["a", "b", "c", "a", "a"]
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario() -> List[str]:
+        semaphore, granted = FairSemaphore(1), []
+        await semaphore.acquire("holder")
+        cancelled = asyncio.create_task(_hold(semaphore, "a", granted))
+        waiting = asyncio.create_task(_hold(semaphore, "b", granted))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert semaphore.waiting == 1
+        semaphore.release()
+        await asyncio.wait_for(waiting, 1)
+        assert semaphore.active == 0
+        return granted
+
+    assert asyncio.run(scenario()) == ["b"]
+
+def test_slot_granted_to_a_cancelled_waiter_is_passed_on():
+    async def scenario() -> List[str]:
+        semaphore, granted = FairSemaphore(1), []
+        await semaphore.acquire("holder")
+        cancelled = asyncio.create_task(_hold(semaphore, "a", granted))
+        waiting = asyncio.create_task(_hold(semaphore, "b", granted))
+        await asyncio.sleep(0)
+        semaphore.release()  # grants "a" ...
+        cancelled.cancel()   # ... which is cancelled before it resumes
+        await asyncio.gather(cancelled, return_exceptions=True)
+        await asyncio.wait_for(waiting, 1)
+        assert semaphore.active == 0 and semaphore.waiting == 0
+        return granted
+
+    assert asyncio.run(scenario()) == ["b"]
@@ -0,0 +1,81 @@
+import asyncio
+from typing import List
+import pytest
+from langchain_core.embeddings import Embeddings
+from langgraph.store.memory import InMemoryStore
+import core.config as cfg
+from tools.memory import store_memory, retrieve_memory, delete_memory, profile_version
+
+CONFIG = {"configurable": {"user_id": "u1"}}
+
+class WordEmbeddings(Embeddings):
+    """Bag-of-words vectors over a tiny vocabulary; texts with the same words are identical."""
+
+    VOCABULARY = ["sets", "groups", "music", "likes", "loves", "visual"]
+
+    def embed_query(self, text: str) -> List[float]:
+        words = text.lower().replace(".", "").split()
+        return [float(words.count(term)) + (0.01 if i == 0 else 0.0) for i, term in enumerate(self.VOCABULARY)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+@pytest.fixture
+def store(monkeypatch) -> InMemoryStore:
+    embeddings = WordEmbeddings()
+    monkeypatch.setitem(cfg._instances, "embeddings", embeddings)
+    return InMemoryStore(index={"dims": len(WordEmbeddings.VOCABULARY), "embed": embeddings, "fields": ["memory"]})
+
+def _store(store: InMemoryStore, content: str, profile_type: str = "interests") -> str:
+    return asyncio.run(store_memory.ainvoke({"content": content, "profile_type": profile_type, "store": store}, CONFIG))
+
+def _items(store: InMemoryStore) -> List:
+    return store.search(("u1", "profile"), limit=100)
+
+def test_near_duplicate_is_merged_into_the_stored_memory(store):
+    first = _store(store, "likes sets")
+    second = _store(store, "Likes sets.")
+    assert second.startswith("Updated existing information: 'likes sets' -> 'Likes sets.'")
+    assert first.split("ID: ")[1] == second.split("ID: ")[1]
+    [item] = _items(store)
+    assert item.value == {"memory": "Likes sets.", "type": "interests", "count": 2}
+
+def test_different_memories_and_types_are_kept_apart(store):
+    _store(store, "likes sets")
+    _store(store, "loves music")
+    _store(store, "likes sets", profile_type="goals")
+    assert sorted((item.value["type"], item.value["memory"]) for item in _items(store)) == [
+        ("goals", "likes sets"), ("interests", "likes sets"), ("interests", "loves music")
+    ]
+
+def test_concurrent_duplicates_are_merged_against_queued_writes(store):
+    async def scenario() -> None:
+        await asyncio.gather(*[
+            store_memory.ainvoke({"content": "likes sets", "profile_type": "interests", "store": store}, CONFIG)
+            for _ in range(4)
+        ])
+
+    asyncio.run(scenario())
+    [item] = _items(store)
+    assert item.value["count"] == 4
+
+def test_reinforced_memories_rank_first(store):
+    _store(store, "loves music")
+    _store(store, "likes sets")
+    _store(store, "likes sets")
+    ranked = asyncio.run(retrieve_memory.ainvoke({"profile_type": "interests", "store": store}, CONFIG))
+    assert [entry["content"] for entry in ranked] == ["likes sets", "loves music"]
+
+def test_changes_rewrite_the_profile_stamp(store):
+    assert asyncio.run(profile_version("u1", store)) == ""
+    memory_id = _store(store, "likes sets").split("ID: ")[1]
+    stored = asyncio.run(profile_version("u1", store))
+    assert stored
+    assert asyncio.run(delete_memory.ainvoke({"key": memory_id, "store": store}, CONFIG)).endswith("successfully deleted.")
+    assert asyncio.run(profile_version("u1", store)) not in ("", stored)
+    assert _items(store) == []
+
+def test_deleting_an_unknown_memory_reports_an_error(store):
+    result = asyncio.run(delete_memory.ainvoke({"key": "missing", "store": store}, CONFIG))
+    assert result == "Error: No profile entry found with ID missing."
+    assert asyncio.run(profile_version("u1", store)) == ""
@@ -0,0 +1,29 @@
+from services.orchestration import _remaining
+
+PLAN = ["warm up", "sets", "groups"]
+
+def test_remaining_drops_the_completed_first_step():
+    assert _remaining(PLAN, ["warm up"]) == ["sets", "groups"]
+    assert _remaining(PLAN[1:], ["warm up", "sets"]) == ["groups"]
+
+def test_remaining_is_empty_once_the_plan_is_done():
+    assert _remaining(["groups"], ["warm up", "sets", "groups"]) == []
+
+def test_remaining_skips_steps_already_covered():
+    assert _remaining(["sets", "warm up", "groups"], ["warm up", "sets"]) == ["groups"]
+
+def test_remaining_is_unknown_when_the_lists_do_not_line_up():
+    assert _remaining(PLAN, ["sets"]) is None
+    assert _remaining(PLAN, []) is None
+    assert _remaining([], ["warm up"]) is None
+
+def test_remaining_compares_items_by_text():
+    class Step:
+        def __init__(self, title: str):
+            self.title = title
+
+        def __str__(self) -> str:
+            return self.title
+
+    plan = [Step("warm up"), Step("sets")]
+    assert [str(step) for step in _remaining(plan, ["warm up"])] == ["sets"]
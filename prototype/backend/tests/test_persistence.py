@@ -0,0 +1,93 @@
+import asyncio
+import operator
+import threading
+import pytest
+from typing import Annotated, List, Tuple, TypedDict
+from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.memory import MemorySaver
+from core.persistence import build_backends, prune_checkpoints
+
+class Counter(TypedDict):
+    total: Annotated[int, operator.add]
+    last: str
+
+def _graph(checkpointer: MemorySaver):
+    builder = StateGraph(Counter)
+    builder.add_node("step", lambda state: {"total": 1, "last": f"turn {state['total']}"})
+    builder.add_edge(START, "step")
+    builder.add_edge("step", END)
+    return builder.compile(checkpointer=checkpointer)
+
+def _run(thread_id: str, turns: int, keep: int) -> Tuple[MemorySaver, List[str]]:
+    """Runs a thread for some turns, then prunes it; also returns the checkpoint ids before pruning."""
+    checkpointer = MemorySaver()
+    graph = _graph(checkpointer)
+    config = {"configurable": {"thread_id": thread_id}}
+
+    async def scenario() -> List[str]:
+        for _ in range(turns):
+            await graph.ainvoke({"total": 0}, config)
+        before = sorted(checkpointer.storage[thread_id][""])
+        await prune_checkpoints(checkpointer, thread_id, keep)
+        return before
+
+    return checkpointer, asyncio.run(scenario())
+
+def test_prune_keeps_the_newest_checkpoints_and_state():
+    checkpointer, before = _run("t", turns=5, keep=2)
+    assert [sorted(checkpoints) for checkpoints in checkpointer.storage["t"].values()] == [before[-2:]]
+    assert all(key[0] != "t" or key[2] in checkpointer.storage["t"][key[1]] for key in checkpointer.writes)
+
+    state = _graph(checkpointer).get_state({"configurable": {"thread_id": "t"}})
+    assert state.values == {"total": 5, "last": "turn 4"}
+
+def test_prune_drops_unreferenced_blobs():
+    checkpointer, _ = _run("t", turns=5, keep=1)
+    (checkpoint_id, (checkpoint, _, _)), = checkpointer.storage["t"][""].items()
+    versions = checkpointer.serde.loads_typed(checkpoint)["channel_versions"]
+    referenced = {("t", "", channel, version) for channel, version in versions.items()}
+    assert {key for key in checkpointer.blobs if key[0] == "t"} == referenced
+
+def test_prune_is_a_no_op_without_a_limit():
+    checkpointer, before = _run("t", turns=3, keep=0)
+    assert sorted(checkpointer.storage["t"][""]) == before
+
+def test_sqlite_backend_round_trip(tmp_path):
+    async def scenario() -> None:
+        config = {"configurable": {"thread_id": "t"}}
+        backends = build_backends("sqlite", str(tmp_path / "app.db"))
+        await backends.open()
+        try:
+            graph = _graph(backends.checkpointer)
+            for _ in range(3):
+                await graph.ainvoke({"total": 0}, config)
+            await backends.store.aput(("u", "profile"), "k", {"memory": "likes sets"})
+            await prune_checkpoints(backends.checkpointer, "t", 2)
+        finally:
+            await backends.close()
+
+        backends = build_backends("sqlite", str(tmp_path / "app.db"))
+        await backends.open()
+        try:
+            assert (await _graph(backends.checkpointer).aget_state(config)).values == {"total": 3, "last": "turn 2"}
+            assert len([c async for c in backends.checkpointer.alist(config)]) == 2
+            assert (await backends.store.aget(("u", "profile"), "k")).value == {"memory": "likes sets"}
+        finally:
+            await backends.close()
+
+    asyncio.run(scenario())
+
+def test_failed_open_closes_the_connections(tmp_path):
+    path = tmp_path / "app.db"
+    path.write_bytes(b"not a database" * 100)
+
+    async def scenario() -> None:
+        backends = build_backends("sqlite", str(path))
+        with pytest.raises(Exception):
+            await backends.open()
+
+    before = set(threading.enumerate())
+    asyncio.run(scenario())
+    for thread in set(threading.enumerate()) - before:
+        thread.join(timeout=5)
+        assert not thread.is_alive()  # a connection thread left running would keep the process alive
@@ -0,0 +1,69 @@
+import time
+import asyncio
+import sqlite3
+from typing import Any, Dict, List
+from pydantic import BaseModel
+from langchain_core.runnables import RunnableLambda
+from core.response_cache import ResponseCache
+
+class Lesson(BaseModel):
+    title: str
+
+class WordEmbeddings:
+    """Bag-of-words vectors over a tiny vocabulary; prompts sharing the words are similar."""
+
+    VOCABULARY = ["sets", "groups", "explain", "lesson"]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        words = text.split()
+        return [float(sum(word.startswith(term) for word in words)) for term in self.VOCABULARY]
+
+def _chain(cache: ResponseCache, calls: List[str], personalized: bool = False):
+    def generate(inputs: Dict[str, Any]) -> Lesson:
+        calls.append(inputs["messages"][0][1])
+        return Lesson(title=f"lesson {len(calls)}")
+    return cache.wrap("learning_object", RunnableLambda(generate), Lesson, personalized=personalized)
+
+def _ask(chain, prompt: str, user_id: str = "u1") -> Lesson:
+    return asyncio.run(chain.ainvoke({"messages": [("user", prompt)]}, {"configurable": {"user_id": user_id}}))
+
+def test_exact_prompt_is_served_from_the_cache():
+    cache, calls = ResponseCache(), []
+    chain = _chain(cache, calls)
+    assert _ask(chain, "Explain A.1 sets") == _ask(chain, "  explain A.1   SETS ") == Lesson(title="lesson 1")
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+def test_similar_prompt_hits_only_with_the_same_concepts():
+    cache, calls = ResponseCache(embeddings=WordEmbeddings(), similarity=0.9), []
+    chain = _chain(cache, calls)
+    _ask(chain, "explain A.1 sets lesson")
+    assert _ask(chain, "please explain A.1 sets lesson").title == "lesson 1"   # similar enough
+    assert _ask(chain, "explain A.2 sets lesson").title == "lesson 2"          # other concept
+    assert _ask(chain, "explain A.1 groups").title == "lesson 3"               # not similar
+    assert len(calls) == 3
+
+def test_personalized_chains_keep_entries_per_learner():
+    cache, calls = ResponseCache(), []
+    personalized, shared = _chain(cache, calls, personalized=True), _chain(cache, [], personalized=False)
+    _ask(personalized, "Explain A.1", user_id="u1")
+    assert _ask(personalized, "Explain A.1", user_id="u1").title == "lesson 1"
+    assert _ask(personalized, "Explain A.1", user_id="u2").title == "lesson 2"
+    assert len(calls) == 2
+    assert _ask(shared, "Explain A.1", user_id="u1").title == "lesson 1"  # unpersonalized chains share entries
+    assert _ask(shared, "Explain A.1", user_id="u2").title == "lesson 1"
+
+def test_entries_persist_expire_and_are_bounded(tmp_path):
+    path, calls = str(tmp_path / "responses.db"), []
+    chain = _chain(ResponseCache(path=path, max_entries=2), calls)
+    for prompt in ["Explain A.1", "Explain A.2", "Explain A.3"]:
+        _ask(chain, prompt)
+
+    reloaded = _chain(ResponseCache(path=path, max_entries=2), calls)
+    assert _ask(reloaded, "Explain A.3").title == "lesson 3"
+    assert _ask(reloaded, "Explain A.1").title == "lesson 4"  # evicted as least recently used
+    expiring = ResponseCache(path=path, ttl=0.5)
+    asyncio.run(expiring.aget("learning_object", Lesson, "Explain A.3"))  # loads the entries while fresh
+    time.sleep(0.5)
+    assert asyncio.run(expiring.aget("learning_object", Lesson, "Explain A.3"))[0] is None
+    keys = [key for key, in sqlite3.connect(path).execute("SELECT key FROM responses")]
+    assert ResponseCache.key("learning_object", "Explain A.3")[0] not in keys  # deleted from the file as well
@@ -0,0 +1,48 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from langchain_core.messages import AIMessageChunk
+from services.utilities import stream_llm
+
+LESSON = json.dumps({"title": "Sets", "content": "A set is a collection.", "references": []})
+PLAN = json.dumps({"steps": [{"title": "Sets"}]})
+
+def _pieces(text: str, size: int = 5) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class StubGraph:
+    """Replays chat model chunks of the given nodes through `astream`."""
+
+    def __init__(self, chunks: List[tuple]):
+        self.chunks = chunks
+
+    async def aget_state(self, config: Dict[str, Any]) -> Any:
+        return SimpleNamespace(next=(), tasks=(), values={})
+
+    async def astream(self, *args: Any, **kwargs: Any):
+        for node, message in self.chunks:
+            yield (f"session:{node}",), "messages", (message, {"langgraph_node": node})
+
+def _tokens(chunks: List[tuple]) -> List[Dict[str, Any]]:
+    async def collect() -> List[Dict[str, Any]]:
+        return [event async for event in stream_llm("hi", StubGraph(chunks), {"configurable": {}})]
+    return [event for event in asyncio.run(collect()) if event["type"] == "token"]
+
+def test_json_schema_output_streams_only_the_lesson_content():
+    chunks = [("planner", AIMessageChunk(content=piece, id="p")) for piece in _pieces(PLAN)]
+    chunks += [("learning_object", AIMessageChunk(content=piece, id="l")) for piece in _pieces(LESSON)]
+    tokens = _tokens(chunks)
+    assert {event["node"] for event in tokens} == {"learning_object"}
+    assert "".join(event["content"] for event in tokens) == "A set is a collection."
+
+def test_tool_call_output_streams_only_the_lesson_content():
+    chunks = [
+        ("learning_object", AIMessageChunk(content="", id="l", tool_call_chunks=[{"name": None, "args": piece, "id": None, "index": 0}]))
+        for piece in _pieces(LESSON)
+    ]
+    assert "".join(event["content"] for event in _tokens(chunks)) == "A set is a collection."
+
+def test_agent_text_is_streamed_as_is():
+    chunks = [("agent", AIMessageChunk(content=piece, id="a")) for piece in ["Hel", "lo"]]
+    assert [event["content"] for event in _tokens(chunks)] == ["Hel", "lo"]
@@ -1,15 +1,107 @@
 import uuid
-from typing import List, Dict
+import math
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Annotated, Any, List, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary, WeakValueDictionary
+import numpy as np
 from langchain_core.tools import tool
-from core.config import store, CONFIG
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import InjectedStore
+import core.config as cfg
+from core.config import MEMORY_DEDUP_THRESHOLD, MEMORY_HALF_LIFE_DAYS
+from core.cache import prompt_cache
+from core.persistence import StoreWriteBatcher
+from schemas.profile import PROFILE_LABELS, ProfileEntry, ProfileSnapshot
 
-VALID_PROFILE_TYPES = frozenset({"name", "interests", "preferences", "goals"})
+logger = logging.getLogger(__name__)
 
-def _get_user_namespace(config=CONFIG) -> tuple:
+VALID_PROFILE_TYPES = frozenset(PROFILE_LABELS)
+PROFILE_PAGE_SIZE = 500
+
+_batchers: "WeakKeyDictionary[Any, StoreWriteBatcher]" = WeakKeyDictionary()
+_write_locks: "WeakValueDictionary[tuple, asyncio.Lock]" = WeakValueDictionary()
+
+def _batcher(store: Any) -> StoreWriteBatcher:
+    """Returns the write batcher of a store."""
+    if store not in _batchers:
+        _batchers[store] = StoreWriteBatcher(store)
+    return _batchers[store]
+
+def _write_lock(namespace: tuple) -> asyncio.Lock:
+    """Lock serializing the duplicate check and enqueueing of writes to one profile."""
+    lock = _write_locks.get(namespace)
+    if lock is None:
+        lock = _write_locks[namespace] = asyncio.Lock()
+    return lock
+
+async def _scan(store: Any, namespace: tuple, filter: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """Reads every item of a namespace, one page at a time."""
+    items: List[Any] = []
+    while True:
+        page = await store.asearch(namespace, filter=filter, limit=PROFILE_PAGE_SIZE, offset=len(items))
+        items.extend(page)
+        if len(page) < PROFILE_PAGE_SIZE:
+            return items
+
+def _stamp_namespace(user_id: str) -> tuple:
+    return (user_id, "profile_stamp")
+
+async def profile_version(user_id: str, store: Any = None) -> str:
+    """Returns the user's profile stamp, which every profile change rewrites.
+
+    Cached profile sections are keyed on it, so a change made by another
+    worker process is noticed on the next read.
+
+    Args:
+        user_id: The user's ID
+        store: Data storage instance; defaults to the shared store
+
+    Returns:
+        The current stamp ('' if the profile was never changed)
+    """
+    store = store or cfg.store
+    item = await store.aget(_stamp_namespace(user_id), "version")
+    return item.value.get("stamp", "") if item else ""
+
+def _rank(item: Any, now: datetime) -> float:
+    """Recency-weighted importance of a memory: reinforcements, halved every MEMORY_HALF_LIFE_DAYS."""
+    age_days = max((now - item.updated_at).total_seconds(), 0) / 86400
+    return (1 + math.log(item.value.get("count", 1))) * 0.5 ** (age_days / MEMORY_HALF_LIFE_DAYS)
+
+async def _find_duplicate(namespace: tuple, content: str, profile_type: str, store: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Returns the key and value of the stored memory of the same type most similar to `content`, if it is a near-duplicate."""
+    try:
+        results = await store.asearch(namespace, query=content, filter={"type": profile_type}, limit=1)
+    except Exception as e:
+        logger.warning(f"Memory deduplication search failed: {e}")
+        return None
+    if results and results[0].score is not None and results[0].score >= MEMORY_DEDUP_THRESHOLD:
+        return results[0].key, results[0].value
+    return None
+
+async def _find_queued_duplicate(namespace: tuple, content: str, profile_type: str, store: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Like `_find_duplicate`, for writes still queued in the store's write batcher."""
+    queued = [op for op in _batcher(store).pending(namespace) if op.value and op.value.get("type") == profile_type]
+    if not queued:
+        return None
+    try:
+        vectors = np.asarray(await cfg.embeddings.aembed_documents([content] + [op.value["memory"] for op in queued]))
+    except Exception as e:
+        logger.warning(f"Memory deduplication embedding failed: {e}")
+        matches = [op for op in queued if op.value["memory"].strip().lower() == content.strip().lower()]
+        return (matches[-1].key, matches[-1].value) if matches else None
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = vectors[1:] @ vectors[0]
+    best = int(np.argmax(scores))
+    return (queued[best].key, queued[best].value) if scores[best] >= MEMORY_DEDUP_THRESHOLD else None
+
+def _get_user_namespace(config: RunnableConfig) -> tuple:
     """Helper function to get user namespace for storage operations.
     
     Args:
-        config: Application configuration
+        config: Runtime configuration carrying the session's user ID
         
     Returns:
         Tuple containing the user namespace
@@ -37,15 +129,19 @@ def _validate_profile_type(profile_type: str) -> None:
         )
 
 @tool
-def store_memory(content: str, profile_type: str, config=CONFIG, store=store) -> str:
+async def store_memory(content: str, profile_type: str, config: RunnableConfig, store: Annotated[Any, InjectedStore()] = None) -> str:
     """Stores a user profile attribute in the database.
+
+    A near-duplicate of an existing attribute of the same type, stored or
+    still queued for writing, is merged into it instead of being stored
+    again.
     
     Args:
         content: The value of the profile attribute to store
         profile_type: The category or type of the profile attribute.
                       Valid types include: "name", "interests", "preferences", "goals".
-        config: Application configuration
-        store: Data storage instance
+        config: Runtime configuration carrying the session's user ID
+        store: Data storage instance, injected from the graph (never from the model); defaults to the shared store
 
     Returns:
         A confirmation message with stored content and its UUID
@@ -53,27 +149,45 @@ def store_memory(content: str, profile_type: str, config=CONFIG, store=store) ->
     Raises:
         ValueError: If an invalid profile type is provided or user ID not found
     """
+    store = store or cfg.store
     _validate_profile_type(profile_type)
     namespace = _get_user_namespace(config)
-    memory_id = str(uuid.uuid4())
-    
-    store.put(
-        namespace,
-        key=memory_id,
-        value={"memory": content, "type": profile_type},
-        index=False
-    )
-    
+    batcher = _batcher(store)
+
+    async with _write_lock(namespace):
+        duplicate = (
+            await _find_duplicate(namespace, content, profile_type, store)
+            or await _find_queued_duplicate(namespace, content, profile_type, store)
+        )
+        if duplicate is not None:
+            memory_id, previous = duplicate
+            queued = [op.value for op in batcher.pending(namespace) if op.key == memory_id]
+            previous = queued[-1] if queued else previous
+            value = {"memory": content, "type": profile_type, "count": previous.get("count", 1) + 1}
+        else:
+            memory_id = str(uuid.uuid4())
+            value = {"memory": content, "type": profile_type, "count": 1}
+        written = [
+            batcher.enqueue(namespace, memory_id, value, index=["memory"]),
+            batcher.enqueue(_stamp_namespace(namespace[0]), "version", {"stamp": uuid.uuid4().hex}, index=False)
+        ]
+
+    await asyncio.gather(*written)
+    prompt_cache.invalidate(namespace[0], "profile")
+
+    if duplicate is not None:
+        return f"Updated existing information: '{previous.get('memory', '')}' -> '{content}' | ID: {memory_id}"
     return f"Stored information: '{content}' | ID: {memory_id}"
 
 @tool
-def retrieve_memory(profile_type: str, config=CONFIG, store=store) -> List[Dict[str, str]]:
+async def retrieve_memory(profile_type: str, config: RunnableConfig, query: Optional[str] = None, store: Annotated[Any, InjectedStore()] = None) -> List[Dict[str, str]]:
     """Retrieves user profile information of a specified type.
 
     Args:
         profile_type: The type of information to retrieve
-        config: Application configuration
-        store: Data storage instance
+        config: Runtime configuration carrying the session's user ID
+        query: Optional text to rank the entries by relevance to
+        store: Data storage instance; defaults to the shared store
 
     Returns:
         A list of dictionaries, each with 'content' and 'id'
@@ -81,9 +195,17 @@ def retrieve_memory(profile_type: str, config=CONFIG, store=store) -> List[Dict[
     Raises:
         ValueError: For invalid profile type or missing user ID
     """
+    store = store or cfg.store
     _validate_profile_type(profile_type)
     namespace = _get_user_namespace(config)
-    results = store.search(namespace, filter={"type": profile_type})
+    if query:
+        results = await store.asearch(namespace, query=query, filter={"type": profile_type}, limit=10)
+    else:
+        now = datetime.now(timezone.utc)
+        results = sorted(
+            await _scan(store, namespace, filter={"type": profile_type}),
+            key=lambda item: _rank(item, now), reverse=True
+        )
     
     return [
         {"content": item.value.get("memory", ""), "id": item.key}
@@ -91,26 +213,57 @@ def retrieve_memory(profile_type: str, config=CONFIG, store=store) -> List[Dict[
     ]
 
 @tool
-def delete_memory(key: str, config=CONFIG, store=store) -> str:
+async def delete_memory(key: str, config: RunnableConfig, store: Annotated[Any, InjectedStore()] = None) -> str:
     """Deletes a specific user profile entry by its ID.
 
     Args:
         key: The unique ID of the profile entry to delete
-        config: Application configuration
-        store: Data storage instance
+        config: Runtime configuration carrying the session's user ID
+        store: Data storage instance; defaults to the shared store
 
     Returns:
         A confirmation message if deleted or an error message if not found
     """
+    store = store or cfg.store
     try:
         namespace = _get_user_namespace(config)
-        success = store.delete(namespace, key)
-        
-        if success:
-            return f"Profile entry with ID {key} has been successfully deleted."
-        else:
+        if await store.aget(namespace, key) is None:  # `adelete` does not report whether the item existed
             return f"Error: No profile entry found with ID {key}."
+        await store.adelete(namespace, key)
+        await store.aput(_stamp_namespace(namespace[0]), "version", {"stamp": uuid.uuid4().hex}, index=False)
+        
+        prompt_cache.invalidate(namespace[0], "profile")
+        
+        return f"Profile entry with ID {key} has been successfully deleted."
     except ValueError as e:
         return f"Configuration error: {str(e)}"
     except Exception as e:
-        return f"An error occurred while deleting the profile entry: {str(e)}"
\ No newline at end of file
+        return f"An error occurred while deleting the profile entry: {str(e)}"
+
+async def get_profile_snapshot(user_id: str, store: Any = None, per_type: int = 5) -> ProfileSnapshot:
+    """Fetches every profile category of a user in a single store operation.
+
+    The snapshot is cached per user until the profile stamp changes.
+
+    Args:
+        user_id: The user's ID
+        store: Data storage instance; defaults to the shared store
+        per_type: Maximum entries kept per profile type, highest recency-weighted rank first
+
+    Returns:
+        The user's profile snapshot
+    """
+    store = store or cfg.store
+
+    async def build() -> ProfileSnapshot:
+        items = await _scan(store, (user_id, "profile"))
+        snapshot = ProfileSnapshot(user_id=user_id)
+        now = datetime.now(timezone.utc)
+        for item in sorted(items, key=lambda i: _rank(i, now), reverse=True):
+            entries = snapshot.entries.get(item.value.get("type"))
+            if entries is not None and len(entries) < per_type:
+                entries.append(ProfileEntry(id=item.key, content=item.value.get("memory", "")))
+        return snapshot
+
+    version = (await profile_version(user_id, store), per_type)
+    return await prompt_cache.aget(user_id, "profile_snapshot", build, version=version)
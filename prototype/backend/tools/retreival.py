@@ -1,55 +1,45 @@
-import os
 import re
-import json
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+from typing import Annotated, List, Dict, Any, Optional, Union
 from langchain_core.tools import tool
-from core.config import GRAPH_PATH, graph_data
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt import InjectedState
+import core.config as cfg
 
 ALLOWED_STATUSES = frozenset({"mastery", "unlearned", "awareness"})
 CONCEPT_ID_PATTERN = re.compile(r'^[A-Z]\.\d+$')
 
-def _validate_data(data: Dict[str, Any]) -> Optional[str]:
-    """Validates the graph data structure.
+def _validate_graph() -> Optional[str]:
+    """Validates that the shared knowledge graph is loaded.
     
-    Args:
-        data: Graph data dictionary
-        
     Returns:
-        Error message if invalid, None if valid
+        Error message if unavailable, None if valid
     """
-    if data is None:
-        return "Error: 'data' dictionary not provided."
-    if "concepts" not in data:
-        return "Error: 'concepts' key not found in the data dictionary."
-    return None
+    return cfg.graph.error if cfg.graph.data is None else None
 
-def _load_graph_data(path: str) -> Union[Dict[str, Any], str]:
-    """Loads graph data from file with error handling.
+def _get_user_id(config: RunnableConfig) -> str:
+    """Helper function to get the user whose knowledge state is being tracked.
     
     Args:
-        path: Path to the graph JSON file
+        config: Runtime configuration carrying the session's user ID
         
     Returns:
-        Graph data dictionary or error message string
+        The user ID
+        
+    Raises:
+        ValueError: If user ID is not found in config
     """
-    if not os.path.exists(path):
-        return f"Error: File '{path}' does not exist."
-    
-    try:
-        with open(path, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError as jde:
-        return f"Error reading JSON from '{path}': {jde}"
-    except Exception as e:
-        return f"Error opening '{path}': {e}"
+    user_id = config.get("configurable", {}).get("user_id")
+    if not user_id:
+        raise ValueError("User ID not found in configuration.")
+    return user_id
 
 @tool
-def retrieve_sections(section_letter: str, data: dict = graph_data) -> Union[List[Dict[str, str]], str]:
+async def retrieve_sections(section_letter: str) -> Union[List[Dict[str, str]], str]:
     """Retrieves a list of concepts belonging to a specific section.
 
     Args:
         section_letter: The letter of the section to retrieve concepts from (e.g., "A", "B").
-        data: The dictionary containing concept data.
 
     Returns:
         A list of dictionaries, where each dictionary represents a concept and contains:
@@ -58,7 +48,7 @@ def retrieve_sections(section_letter: str, data: dict = graph_data) -> Union[Lis
         Returns an empty list if no concepts are found for the given section.
         Returns an error message if input is invalid.
     """
-    error = _validate_data(data)
+    error = _validate_graph()
     if error:
         return error
         
@@ -66,43 +56,119 @@ def retrieve_sections(section_letter: str, data: dict = graph_data) -> Union[Lis
         return "Error: Invalid section letter. Must be a single alphabet character."
     
     results = [
-        {"id": concept_id, "label": concept_info["label"]}
-        for concept_id, concept_info in data["concepts"].items()
-        if concept_info.get("section") == section_letter.upper()
+        {"id": concept_id, "label": cfg.graph.get(concept_id)["label"]}
+        for concept_id in cfg.graph.section(section_letter.upper())
     ]
     
     return results
 
+def _summary(text: str, limit: int = 200) -> str:
+    """Shortens concept content to its first sentence, capped at `limit` characters."""
+    text = " ".join(text.split())
+    sentence = re.split(r'(?<=[.!?])\s', text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rsplit(" ", 1)[0] + "..."
+
+@tool
+async def search_concepts(query: str, limit: int = 5) -> Union[List[Dict[str, Any]], str]:
+    """Finds the concepts that best match a free-text question or topic.
+
+    Args:
+        query: The user's question or topic in natural language.
+        limit: Maximum number of concepts to return.
+
+    Returns:
+        A list of dictionaries, best match first, each with the concept's "id",
+        "label", "section" and relevance "score". Returns an error message on failure.
+    """
+    error = _validate_graph()
+    if error:
+        return error
+
+    if not isinstance(query, str) or not query.strip():
+        return "Error: Invalid query. Must be a non-empty string."
+
+    try:
+        matches = (await cfg.concept_index.search([query], k=max(1, min(limit, 20))))[0]
+    except Exception as e:
+        return f"Error searching concepts: {e}"
+
+    return [
+        {"id": cid, "label": cfg.graph.get(cid).get("label"), "section": cfg.graph.get(cid).get("section"), "score": round(score, 3)}
+        for cid, score in matches
+    ]
+
 @tool
-def retrieve_node(concept_id: str, data: dict = graph_data) -> Union[Dict[str, Any], str, None]:
+async def retrieve_node(concept_id: str, config: RunnableConfig, include_content: bool = False) -> Union[Dict[str, Any], str, None]:
     """Retrieves a concept by its unique ID.
 
     Args:
         concept_id: The ID of the concept to retrieve.
-        data: The dictionary containing concept data.
+        config: Runtime configuration carrying the session's user ID
+        include_content: Whether to include the full concept text instead of only a one-sentence summary.
 
     Returns:
-        A dictionary containing the concept's information if found, otherwise returns None.  
-        The concept dictionary, if found, will typically contain keys like "label", "section", and other relevant details.
-        Returns an error message if input is invalid.
+        A dictionary with the concept's "id", "label", "section", the user's "status",
+        a short "summary" and its "prerequisites" IDs (plus "content" if requested),
+        otherwise returns None. Returns an error message if input is invalid.
     """
-    error = _validate_data(data)
+    error = _validate_graph()
     if error:
         return error
         
     if not isinstance(concept_id, str):
         return "Error: Invalid concept ID. Must be a string."
     
-    return data["concepts"].get(concept_id)
+    concept = cfg.graph.get(concept_id)
+    if concept is None:
+        return None
+
+    try:
+        status = await asyncio.to_thread(cfg.knowledge.status, _get_user_id(config), concept_id)
+    except ValueError as e:
+        return f"Configuration error: {str(e)}"
+
+    result = {
+        "id": concept_id,
+        "label": concept.get("label"),
+        "section": concept.get("section"),
+        "status": status,
+        "summary": _summary(concept.get("content", "")),
+        "prerequisites": cfg.graph.prerequisites(concept_id)
+    }
+    if include_content:
+        result["content"] = concept.get("content", "")
+    return result
+
+@tool
+async def get_lesson(lesson_id: str, state: Annotated[Dict[str, Any], InjectedState]) -> Union[Dict[str, Any], str]:
+    """Retrieves the full text of a lesson taught earlier in this conversation.
+
+    Learning session results only reference their lesson by ID; use this
+    tool to quote or revisit the lesson itself.
+
+    Args:
+        lesson_id: The lesson's ID, as given in the learning session result (e.g., "L1").
+        state: Conversation state holding the thread's lessons
+
+    Returns:
+        A dictionary with the lesson's "id", "concept", "title", "steps" and "content",
+        or an error message if no lesson has that ID.
+    """
+    lessons = state.get("lessons") or {}
+    lesson = lessons.get(lesson_id)
+    if lesson is None:
+        known = ", ".join(lessons) or "none yet"
+        return f"Error: No lesson found with ID '{lesson_id}'. Known lessons: {known}."
+    return {"id": lesson_id, **{key: lesson[key] for key in ("concept", "title", "steps", "content")}}
 
 @tool
-def update_status(concept_id: str, new_status: str, path: str = GRAPH_PATH) -> str:
-    """Updates a concept's status in a JSON file and saves the changes.
+async def update_status(concept_id: str, new_status: str, config: RunnableConfig) -> str:
+    """Updates the user's status for a concept and saves the changes.
 
     Args:
         concept_id: The ID of the concept to update. Must follow the format 'Letter.Number' (e.g., 'A.1').
         new_status: The new status for the concept. Must be one of "mastery", "unlearned", or "awareness".
-        path: Path to the graph JSON file.
+        config: Runtime configuration carrying the session's user ID
 
     Returns:
         A message indicating success or failure, including details of any errors.
@@ -121,38 +187,31 @@ def update_status(concept_id: str, new_status: str, path: str = GRAPH_PATH) -> s
         allowed = ", ".join(sorted(ALLOWED_STATUSES))
         return f"Error: Invalid status '{new_status}'. Allowed statuses are: {allowed}."
     
-    data = _load_graph_data(path)
-    if isinstance(data, str):
-        return data
-        
-    if "concepts" not in data:
-        return "Error: 'concepts' key not found in the JSON data."
-        
-    if concept_id in data["concepts"]:
-        current_status = data["concepts"][concept_id].get("status", "undefined")
-        
-        if current_status == new_status:
-            return f"No update needed: Concept '{concept_id}' is already set to '{new_status}'."
-            
-        data["concepts"][concept_id]["status"] = new_status
+    error = _validate_graph()
+    if error:
+        return error
         
-        try:
-            with open(path, "w") as f:
-                json.dump(data, f, indent=4)
-            return (f"Success: Status of concept '{concept_id}' updated from "
-                    f"'{current_status}' to '{new_status}'.")
-        except Exception as e:
-            return f"Error saving changes to '{path}': {e}"
-    else:
+    try:
+        current_status = await asyncio.to_thread(cfg.knowledge.set_status, _get_user_id(config), concept_id, new_status)
+    except KeyError:
         return f"Error: Concept with ID '{concept_id}' not found."
+    except ValueError as e:
+        return f"Configuration error: {str(e)}"
+    except Exception as e:
+        return f"Error saving changes to '{cfg.knowledge.journal.path}': {e}"
+
+    if current_status == new_status:
+        return f"No update needed: Concept '{concept_id}' is already set to '{new_status}'."
+
+    return (f"Success: Status of concept '{concept_id}' updated from "
+            f"'{current_status}' to '{new_status}'.")
     
 @tool
-def retrieve_prerequisites(concept_id: str, path: str = GRAPH_PATH) -> str:
+async def retrieve_prerequisites(concept_id: str) -> str:
     """Retrieves all prerequisites for a given concept ID, including their IDs and labels.
 
     Args:
         concept_id: The ID of the concept whose prerequisites are to be retrieved.
-        path: Path to the graph JSON file.
 
     Returns:
         A formatted string of prerequisites or an error message.
@@ -161,17 +220,14 @@ def retrieve_prerequisites(concept_id: str, path: str = GRAPH_PATH) -> str:
         return (f"Error: Invalid concept ID format '{concept_id}'. "
                 "The correct format should be a letter followed by a dot and number, e.g., 'A.1'.")
     
-    data = _load_graph_data(path)
-    if isinstance(data, str):
-        return data
-        
-    if "concepts" not in data:
-        return "Error: 'concepts' key not found in the JSON data."
+    error = _validate_graph()
+    if error:
+        return error
         
-    if concept_id not in data["concepts"]:
+    if cfg.graph.get(concept_id) is None:
         return f"Error: Concept with ID '{concept_id}' not found."
     
-    prerequisites_ids = data["concepts"][concept_id].get("prerequisites", [])
+    prerequisites_ids = cfg.graph.prerequisites(concept_id)
     
     if not prerequisites_ids:
         return f"Concept '{concept_id}' has no prerequisites."
@@ -180,7 +236,7 @@ def retrieve_prerequisites(concept_id: str, path: str = GRAPH_PATH) -> str:
     missing_prereqs = []
     
     for pid in prerequisites_ids:
-        prereq = data["concepts"].get(pid)
+        prereq = cfg.graph.get(pid)
         if prereq:
             prerequisites.append({"ID": pid, "Label": prereq.get("label", "N/A")})
         else:
@@ -196,4 +252,59 @@ def retrieve_prerequisites(concept_id: str, path: str = GRAPH_PATH) -> str:
         for pid in missing_prereqs:
             output_lines.append(f" - {pid}")
     
-    return "\n".join(output_lines)
\ No newline at end of file
+    return "\n".join(output_lines)
+
+@tool
+async def plan_learning_path(concept_id: str, config: RunnableConfig, limit: int = 15) -> str:
+    """Plans the route to a concept: its full prerequisite closure in learning order and what the user can learn next.
+
+    Args:
+        concept_id: The ID of the target concept (e.g., 'A.1').
+        config: Runtime configuration carrying the session's user ID
+        limit: Maximum number of path steps to list.
+
+    Returns:
+        A formatted string with the ordered concepts still to be mastered and the
+        concepts on that path whose prerequisites are already mastered, or an error message.
+    """
+    if not isinstance(concept_id, str) or not CONCEPT_ID_PATTERN.match(concept_id):
+        return (f"Error: Invalid concept ID format '{concept_id}'. "
+                "The correct format should be a letter followed by a dot and number, e.g., 'A.1'.")
+
+    error = _validate_graph()
+    if error:
+        return error
+
+    target = cfg.graph.get(concept_id)
+    if target is None:
+        return f"Error: Concept with ID '{concept_id}' not found."
+
+    try:
+        user_id = _get_user_id(config)
+    except ValueError as e:
+        return f"Configuration error: {str(e)}"
+
+    statuses = await asyncio.to_thread(cfg.knowledge.statuses, user_id)
+    mastered = {cid for cid, status in statuses.items() if status == "mastery"}
+    closure = cfg.graph.ancestors(concept_id)
+    path = cfg.graph.learning_path(concept_id, known=mastered)
+
+    if not path:
+        return f"Concept '{concept_id}' ({target['label']}) and all of its prerequisites are already mastered."
+
+    output_lines = [
+        f"Learning path to Concept '{concept_id}' ({target['label']}): "
+        f"{len(closure)} prerequisites in total, {len(path)} concepts not yet mastered.",
+        "Study in this order:"
+    ]
+    for i, cid in enumerate(path[:limit], 1):
+        output_lines.append(f" {i}. {cid}: {cfg.graph.get(cid)['label']} [{statuses.get(cid) or 'not started'}]")
+    if len(path) > limit:
+        output_lines.append(f" ... {len(path) - limit} more")
+
+    frontier = cfg.graph.frontier(mastered, within=path)
+    output_lines.append("\nLearnable now (all outside prerequisites mastered):")
+    for cid in frontier[:limit]:
+        output_lines.append(f" - {cid}: {cfg.graph.get(cid)['label']}")
+
+    return "\n".join(output_lines)
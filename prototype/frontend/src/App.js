@@ -10,15 +10,15 @@ import './App.css';
 
 // API endpoints centralized
 const API_ENDPOINTS = {
-  SESSION_STATE: 'http://localhost:8000/session-state',
-  PROFILE: 'http://localhost:8000/profile',
-  PLAN: 'http://localhost:8000/plan',
-  ASSESSMENT: 'http://localhost:8000/assessment',
+  DASHBOARD: 'http://localhost:8000/dashboard',
   CHAT: 'http://localhost:8000/chat',
 };
 
 const USER_ID = 'my_user_id';
 
+// Identify the learner on every request so the backend routes to their session
+axios.defaults.headers.common['X-User-Id'] = USER_ID;
+
 function App() {
   const [messages, setMessages] = useState([]);
   const [userInput, setUserInput] = useState('');
@@ -45,62 +45,18 @@ function App() {
     }
   }, [messages]);
 
-  // Fetch all data from server
-  const fetchAllData = async () => {
+  // Fetch all panel data from server in a single request.
+  // The browser revalidates with the dashboard ETag, so unchanged panels come back as 304.
+  const fetchAllData = useCallback(async () => {
     try {
-      const [sessionResponse, profileResponse, planResponse, evaluationResponse] = await Promise.all([
-        axios.get(API_ENDPOINTS.SESSION_STATE),
-        axios.get(API_ENDPOINTS.PROFILE, { params: { user_id: USER_ID } }),
-        axios.get(API_ENDPOINTS.PLAN),
-        axios.get(API_ENDPOINTS.ASSESSMENT),
-      ]);
-
-      setSessionState(sessionResponse.data.next || '');
-      setUserProfile(profileResponse.data.profile || 'No profile data found.');
-      setUserPlan(planResponse.data.plan || []);
-      setEvaluationPlan(evaluationResponse.data.plan || []);
-    } catch (error) {
-      console.error('Error fetching data:', error);
-    }
-  };
+      const response = await axios.get(API_ENDPOINTS.DASHBOARD);
 
-  // Individual data fetching functions
-  const fetchSessionState = useCallback(async () => {
-    try {
-      const response = await axios.get(API_ENDPOINTS.SESSION_STATE);
       setSessionState(response.data.next || '');
+      setUserProfile(response.data.profile || 'No profile data found.');
+      setUserPlan(response.data.plan || []);
+      setEvaluationPlan(response.data.evaluations || []);
     } catch (error) {
-      console.error('Error fetching session state:', error);
-    }
-  }, []);
-
-  const fetchUserProfile = useCallback(async () => {
-    try {
-      const res = await axios.get(API_ENDPOINTS.PROFILE, {
-        params: { user_id: USER_ID },
-      });
-      setUserProfile(res.data.profile || 'No profile data found.');
-    } catch (err) {
-      console.error('Error fetching profile:', err);
-      setUserProfile('Failed to load user profile.');
-    }
-  }, []);
-
-  const fetchUserPlan = useCallback(async () => {
-    try {
-      const res = await axios.get(API_ENDPOINTS.PLAN);
-      setUserPlan(res.data.plan || []);
-    } catch (err) {
-      console.error('Error fetching plan:', err);
-    }
-  }, []);
-
-  const fetchEvaluationPlan = useCallback(async () => {
-    try {
-      const res = await axios.get(API_ENDPOINTS.ASSESSMENT);
-      setEvaluationPlan(res.data.plan || []);
-    } catch (err) {
-      console.error('Error fetching evaluation plan:', err);
+      console.error('Error fetching data:', error);
     }
   }, []);
 
@@ -132,12 +88,7 @@ function App() {
       setMessages(prev => [...prev, botReply]);
 
       // Refresh data after chat interaction
-      await Promise.all([
-        fetchSessionState(), 
-        fetchUserProfile(), 
-        fetchUserPlan(), 
-        fetchEvaluationPlan()
-      ]);
+      await fetchAllData();
     } catch (error) {
       console.error('Error:', error);
       const errorMsg = {
@@ -148,7 +99,7 @@ function App() {
     } finally {
       setChatLoading(false);
     }
-  }, [fetchSessionState, fetchUserProfile, fetchUserPlan, fetchEvaluationPlan]);
+  }, [fetchAllData]);
 
   const handleKeyDown = (e) => {
     if (e.key === 'Enter' && !e.shiftKey) {